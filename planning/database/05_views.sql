@@ -233,25 +233,14 @@ ORDER BY total_journey_time;
 -- MATERIALIZED VIEWS FOR PERFORMANCE
 -- ============================================
 
--- Cache expensive aggregations (refresh periodically)
-CREATE MATERIALIZED VIEW IF NOT EXISTS mv_daily_stats AS
-SELECT
-    DATE(timestamp) AS date,
-    COUNT(DISTINCT session_id) AS unique_sessions,
-    COUNT(*) AS total_searches,
-    COUNT(DISTINCT postal_code) AS unique_postal_codes
-FROM user_searches
-WHERE timestamp > NOW() - INTERVAL '90 days'
-GROUP BY DATE(timestamp)
-WITH DATA;
-
--- Create index on materialized view
-CREATE INDEX idx_mv_daily_stats_date ON mv_daily_stats(date DESC);
+-- mv_daily_stats is a plain view over daily_search_stats, which
+-- daily_stats_rollup.py maintains incrementally (09_daily_stats_rollup.sql)
 
 -- Refresh function for materialized views
 CREATE OR REPLACE FUNCTION refresh_materialized_views()
 RETURNS void AS $$
 BEGIN
-    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_daily_stats;
+    -- mv_daily_stats is now a plain view (09_daily_stats_rollup.sql); no views left to refresh
+    NULL;
 END;
 $$ LANGUAGE plpgsql;
\ No newline at end of file
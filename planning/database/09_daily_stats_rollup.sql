@@ -0,0 +1,100 @@
+-- ============================================
+-- SUPABASE ENERGY ANALYSIS DATABASE
+-- File: 09_daily_stats_rollup.sql
+-- Purpose: Incrementally maintained daily search statistics
+-- ============================================
+
+-- ============================================
+-- INGESTION TIMESTAMP
+-- user_searches.timestamp is the client-side event time and can arrive late,
+-- so the rollup job tracks progress on the server-side insert time instead.
+-- clock_timestamp() is taken at insert, not commit: a transaction that
+-- commits after a rollup run has read its watermark is only picked up by
+-- the job's overlap rescan (daily_stats_rollup.py --overlap-minutes)
+-- ============================================
+
+ALTER TABLE user_searches
+    ADD COLUMN IF NOT EXISTS ingested_at TIMESTAMP DEFAULT clock_timestamp();
+
+CREATE INDEX IF NOT EXISTS idx_user_searches_ingested_at
+    ON user_searches(ingested_at);
+
+-- ============================================
+-- RETENTION WINDOW
+-- First day kept in daily_search_stats. The window is whole days, the
+-- oldest being p_retention_days - 1 days before today; the backfill, the
+-- incremental job, pruning and daily_stats_90d all use this one cutoff
+-- ============================================
+
+CREATE OR REPLACE FUNCTION daily_stats_window_start(p_retention_days INTEGER DEFAULT 90)
+RETURNS DATE AS $$
+    SELECT CURRENT_DATE - (p_retention_days - 1);
+$$ LANGUAGE sql STABLE;
+
+-- ============================================
+-- DAILY ROLLUP TABLE
+-- Same shape as mv_daily_stats, maintained by daily_stats_rollup.py
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS daily_search_stats (
+    date DATE PRIMARY KEY,
+    unique_sessions INTEGER NOT NULL,
+    total_searches INTEGER NOT NULL,
+    unique_postal_codes INTEGER NOT NULL,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_daily_search_stats_date
+    ON daily_search_stats(date DESC);
+
+-- ============================================
+-- ROLLUP WATERMARKS
+-- One row per maintenance job: everything ingested up to the
+-- watermark has been folded into the rollup table
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    job_name TEXT PRIMARY KEY,
+    watermark TIMESTAMP,
+    rows_processed BIGINT DEFAULT 0,
+    days_recomputed INTEGER DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- ============================================
+-- ACCESS
+-- No policies: only the service role (which bypasses RLS) reads or writes
+-- ============================================
+
+ALTER TABLE daily_search_stats ENABLE ROW LEVEL SECURITY;
+ALTER TABLE rollup_watermarks ENABLE ROW LEVEL SECURITY;
+
+-- ============================================
+-- COMPATIBILITY VIEWS
+-- daily_stats_90d replaces reads against mv_daily_stats; mv_daily_stats
+-- itself becomes a plain view over the rollup so existing readers keep
+-- getting current data instead of a snapshot nobody refreshes
+-- ============================================
+
+CREATE OR REPLACE VIEW daily_stats_90d AS
+SELECT
+    date,
+    unique_sessions,
+    total_searches,
+    unique_postal_codes
+FROM daily_search_stats
+WHERE date >= daily_stats_window_start(90)
+ORDER BY date DESC;
+
+-- Only drop the old materialized view; a rerun finds the plain view
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_matviews
+               WHERE matviewname = 'mv_daily_stats' AND schemaname = current_schema()) THEN
+        DROP MATERIALIZED VIEW mv_daily_stats;
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE VIEW mv_daily_stats AS
+SELECT * FROM daily_stats_90d;
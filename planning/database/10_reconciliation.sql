@@ -0,0 +1,137 @@
+-- ============================================
+-- SUPABASE ENERGY ANALYSIS DATABASE
+-- File: 10_reconciliation.sql
+-- Purpose: Partitioned checksums for verifying energy_certificates migrations
+-- ============================================
+
+-- ============================================
+-- ROW HASH AND PARTITIONING
+-- Must stay in sync with reconciliation.py (DIGEST_FIELDS, row_hash, bucket_of)
+-- ============================================
+
+-- FLOAT columns are hashed in a fixed format: float8::TEXT switches to
+-- exponent form ('1e+15') where Python's repr does not. Must match
+-- format_float() in reconciliation.py (FLOAT_DECIMALS)
+CREATE OR REPLACE FUNCTION certificate_float_text(p_value FLOAT)
+RETURNS TEXT AS $$
+    SELECT round(p_value::NUMERIC, 6)::TEXT;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- 64-bit content hash of one certificate row
+-- Fields are joined with the unit separator (\x1f); NULL becomes ''
+CREATE OR REPLACE FUNCTION certificate_row_hash(ec energy_certificates)
+RETURNS BIGINT AS $$
+    SELECT ('x' || substr(md5(
+        COALESCE(ec.certificate_id, '') || E'\x1f' ||
+        COALESCE(ec.knr::TEXT, '') || E'\x1f' ||
+        COALESCE(ec.gnr::TEXT, '') || E'\x1f' ||
+        COALESCE(ec.bnr::TEXT, '') || E'\x1f' ||
+        COALESCE(ec.snr::TEXT, '') || E'\x1f' ||
+        COALESCE(ec.fnr::TEXT, '') || E'\x1f' ||
+        COALESCE(ec.building_number, '') || E'\x1f' ||
+        COALESCE(ec.address, '') || E'\x1f' ||
+        COALESCE(ec.postal_code, '') || E'\x1f' ||
+        COALESCE(ec.city, '') || E'\x1f' ||
+        COALESCE(ec.building_category, '') || E'\x1f' ||
+        COALESCE(ec.construction_year::TEXT, '') || E'\x1f' ||
+        COALESCE(ec.energy_class, '') || E'\x1f' ||
+        COALESCE(ec.heating_class, '') || E'\x1f' ||
+        COALESCE(certificate_float_text(ec.energy_consumption), '') || E'\x1f' ||
+        COALESCE(certificate_float_text(ec.fossil_percentage), '')
+    ), 1, 16))::BIT(64)::BIGINT;
+$$ LANGUAGE sql STABLE;
+
+-- Top-level partition: municipality number or postal code prefix
+CREATE OR REPLACE FUNCTION certificate_partition_key(
+    ec energy_certificates,
+    p_partition TEXT,
+    p_prefix_length INTEGER
+)
+RETURNS TEXT AS $$
+    SELECT CASE p_partition
+        WHEN 'knr' THEN COALESCE(ec.knr::TEXT, '')
+        ELSE COALESCE(LEFT(ec.postal_code, p_prefix_length), '')
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Second-level bucket within a partition, from the certificate id
+CREATE OR REPLACE FUNCTION certificate_bucket(certificate_id TEXT, p_buckets INTEGER)
+RETURNS INTEGER AS $$
+    SELECT (('x' || lpad(substr(md5(COALESCE(certificate_id, '')), 1, 8), 16, '0'))::BIT(64)::BIGINT
+        % p_buckets)::INTEGER;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- ============================================
+-- DIGEST QUERIES
+-- Digests are sums of row hashes mod 2^64: order-independent, and unlike XOR
+-- a duplicated row changes the digest
+-- ============================================
+
+-- Level 1: one row per partition
+CREATE OR REPLACE FUNCTION reconcile_partition_digests(
+    p_partition TEXT DEFAULT 'knr',
+    p_prefix_length INTEGER DEFAULT 2
+)
+RETURNS TABLE (
+    partition_key TEXT,
+    row_count BIGINT,
+    digest TEXT
+) AS $$
+    SELECT
+        certificate_partition_key(ec, p_partition, p_prefix_length) AS partition_key,
+        COUNT(*) AS row_count,
+        (((SUM(certificate_row_hash(ec)::NUMERIC) % 18446744073709551616)
+            + 18446744073709551616) % 18446744073709551616)::TEXT AS digest
+    FROM energy_certificates ec
+    GROUP BY 1
+    ORDER BY 1;
+$$ LANGUAGE sql STABLE;
+
+-- Level 2: buckets inside one partition
+CREATE OR REPLACE FUNCTION reconcile_bucket_digests(
+    p_partition TEXT,
+    p_prefix_length INTEGER,
+    p_partition_key TEXT,
+    p_buckets INTEGER DEFAULT 64
+)
+RETURNS TABLE (
+    bucket INTEGER,
+    row_count BIGINT,
+    digest TEXT
+) AS $$
+    SELECT
+        certificate_bucket(ec.certificate_id, p_buckets) AS bucket,
+        COUNT(*) AS row_count,
+        (((SUM(certificate_row_hash(ec)::NUMERIC) % 18446744073709551616)
+            + 18446744073709551616) % 18446744073709551616)::TEXT AS digest
+    FROM energy_certificates ec
+    WHERE certificate_partition_key(ec, p_partition, p_prefix_length) = p_partition_key
+    GROUP BY 1
+    ORDER BY 1;
+$$ LANGUAGE sql STABLE;
+
+-- Level 3: row hashes of the given buckets inside one partition
+CREATE OR REPLACE FUNCTION reconcile_bucket_rows(
+    p_partition TEXT,
+    p_prefix_length INTEGER,
+    p_partition_key TEXT,
+    p_buckets INTEGER,
+    p_bucket_list INTEGER[]
+)
+RETURNS TABLE (
+    certificate_id TEXT,
+    row_hash BIGINT
+) AS $$
+    SELECT
+        ec.certificate_id,
+        certificate_row_hash(ec) AS row_hash
+    FROM energy_certificates ec
+    WHERE certificate_partition_key(ec, p_partition, p_prefix_length) = p_partition_key
+        AND certificate_bucket(ec.certificate_id, p_buckets) = ANY(p_bucket_list)
+    ORDER BY ec.certificate_id, row_hash;
+$$ LANGUAGE sql STABLE;
+
+-- Verification only needs the service role
+REVOKE EXECUTE ON FUNCTION reconcile_partition_digests(TEXT, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION reconcile_bucket_digests(TEXT, INTEGER, TEXT, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION reconcile_bucket_rows(TEXT, INTEGER, TEXT, INTEGER, INTEGER[]) FROM PUBLIC, anon, authenticated;
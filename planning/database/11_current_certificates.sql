@@ -0,0 +1,104 @@
+-- ============================================
+-- SUPABASE ENERGY ANALYSIS DATABASE
+-- File: 11_current_certificates.sql
+-- Purpose: Latest certificate per building and per address, precomputed
+-- ============================================
+
+-- ============================================
+-- CURRENT CERTIFICATES
+-- One row per building_number and per address + postal code, holding the
+-- latest certificate (by issue_date). Maintained by current_certificates.py
+-- during migration; energy_certificates keeps the full history.
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS current_certificates (
+    lookup_type TEXT NOT NULL CHECK (lookup_type IN ('building', 'address')),
+    lookup_key TEXT NOT NULL,              -- building_number, or current_certificate_address_key()
+    certificate_id TEXT NOT NULL,
+    issue_date TIMESTAMP,
+    energy_class TEXT,
+    heating_class TEXT,
+    energy_consumption FLOAT,
+    fossil_percentage FLOAT,
+    building_category TEXT,
+    construction_year INTEGER,
+    address TEXT,
+    postal_code TEXT,
+    city TEXT,
+    building_number TEXT,
+    knr INTEGER,
+    gnr INTEGER,
+    bnr INTEGER,
+    certificate_count INTEGER NOT NULL DEFAULT 1,  -- certificates in history for this key
+    run_id TEXT,                           -- publish run that last wrote the row; older runs are pruned
+    refreshed_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (lookup_type, lookup_key)
+);
+
+-- Tables created before run_id existed
+ALTER TABLE current_certificates ADD COLUMN IF NOT EXISTS run_id TEXT;
+
+-- refreshed_at is database time on insert and on upsert
+CREATE OR REPLACE FUNCTION set_current_certificates_refreshed_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.refreshed_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS set_current_certificates_refreshed_at ON current_certificates;
+CREATE TRIGGER set_current_certificates_refreshed_at
+    BEFORE INSERT OR UPDATE ON current_certificates
+    FOR EACH ROW
+    EXECUTE FUNCTION set_current_certificates_refreshed_at();
+
+CREATE INDEX IF NOT EXISTS idx_current_certificates_certificate_id
+    ON current_certificates(certificate_id);
+
+-- Must stay in sync with address_key() in current_certificates.py
+CREATE OR REPLACE FUNCTION current_certificate_address_key(p_address TEXT, p_postal_code TEXT)
+RETURNS TEXT AS $$
+    SELECT COALESCE(p_postal_code, '') || '|' ||
+        UPPER(BTRIM(REGEXP_REPLACE(COALESCE(p_address, ''), '\s+', ' ', 'g')));
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Point read: building number first, then address + postal code
+CREATE OR REPLACE FUNCTION get_current_certificate(
+    p_building_number TEXT DEFAULT NULL,
+    p_address TEXT DEFAULT NULL,
+    p_postal_code TEXT DEFAULT NULL
+)
+RETURNS SETOF current_certificates AS $$
+    SELECT * FROM (
+        SELECT * FROM current_certificates
+        WHERE lookup_type = 'building' AND lookup_key = p_building_number
+        UNION ALL
+        SELECT * FROM current_certificates
+        WHERE lookup_type = 'address'
+            AND lookup_key = current_certificate_address_key(p_address, p_postal_code)
+            AND p_address IS NOT NULL
+    ) matches
+    ORDER BY lookup_type = 'building' DESC
+    LIMIT 1;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================
+-- ROW LEVEL SECURITY
+-- Same access as energy_certificates: public read, service role writes
+-- ============================================
+
+ALTER TABLE current_certificates ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "current_certificates_public_read"
+    ON current_certificates
+    FOR SELECT
+    USING (true);
+
+CREATE POLICY "current_certificates_service_write"
+    ON current_certificates
+    FOR ALL
+    USING (auth.role() = 'service_role')
+    WITH CHECK (auth.role() = 'service_role');
+
+GRANT SELECT ON current_certificates TO anon;
@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Local SQLite Address Search Index
+Serves address autocomplete from a read-only SQLite file beside the app
+instead of search_addresses / search_by_postal_code (04_functions.sql) in
+Postgres, which are our highest-QPS calls.
+
+The index (enova_address_index.db next to enova_fast_lookup.db) holds one row
+per certificate with the columns those functions return, plus the address
+normalized the way they normalize it (LOWER(unaccent(...))), and three ways in:
+
+    idx_addresses_search    B-tree on the normalized address: "starts with" prefixes
+    address_prefixes        FTS5 unicode61 with prefix indexes: every word a prefix,
+                            over address, postal code and city ("storg 12 osl")
+    address_trigrams        FTS5 trigram over distinct normalized addresses
+                            (search_terms), with per-trigram document counts
+                            (trigram_stats): candidates for fuzzy search
+
+search_addresses() ranks candidates with the same trigram similarity as
+pg_trgm, the same threshold (the % operator's 0.3 and min_similarity) and the
+same order (score, then address), so results match the Postgres function;
+unlike Postgres it only scores a bounded candidate set (addresses sharing the
+query's rarest trigrams) instead of the whole table.
+
+The index records the CSV's fingerprint (csv_reader.fingerprint, shared with
+the columnar cache) and is rebuilt when it changes.
+
+Usage:
+    python address_index.py --data-path /path/to/production_data --build
+    python address_index.py --search "storgata 1" --prefix "storg 1 osl" --postal 0150
+    python address_index.py --benchmark 1000 --remote-queries 50   # vs Postgres with SUPABASE_* set
+"""
+
+import os
+import re
+import json
+import time
+import random
+import sqlite3
+import argparse
+import statistics
+import unicodedata
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Optional, Set, Union
+import logging
+
+from csv_reader import fingerprint
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+INDEX_FILE_NAME = 'enova_address_index.db'
+
+# Candidates scored per query by search_addresses(), found through the rarest query trigrams
+CANDIDATE_LIMIT = 200
+RARE_TRIGRAMS = 4
+# pg_trgm.similarity_threshold, applied by the % operator in search_addresses()
+PG_TRGM_SIMILARITY_THRESHOLD = 0.3
+BUILD_BATCH_SIZE = 10000
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024  # bytes
+
+# search_addresses() result columns
+SEARCH_COLUMNS = ['address', 'postal_code', 'city', 'building_number', 'energy_class',
+                  'energy_consumption', 'certificate_id']
+# search_by_postal_code() result columns
+POSTAL_COLUMNS = ['address', 'city', 'building_number', 'building_category', 'energy_class',
+                  'energy_consumption']
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE addresses (
+    id INTEGER PRIMARY KEY,
+    address TEXT NOT NULL,
+    postal_code TEXT,
+    city TEXT,
+    building_number TEXT,
+    building_category TEXT,
+    energy_class TEXT,
+    energy_consumption REAL,
+    certificate_id TEXT,
+    search_text TEXT NOT NULL,   -- normalize(address)
+    search_city TEXT,            -- normalize(city)
+    term_id INTEGER NOT NULL     -- search_terms.id of search_text
+);
+CREATE TABLE search_terms (id INTEGER PRIMARY KEY, search_text TEXT NOT NULL);
+CREATE TABLE trigram_stats (trigram TEXT PRIMARY KEY, documents INTEGER NOT NULL) WITHOUT ROWID;
+CREATE VIRTUAL TABLE address_prefixes USING fts5(
+    search_text, postal_code, search_city,
+    content='addresses', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='1 2 3 4'
+);
+CREATE VIRTUAL TABLE address_trigrams USING fts5(
+    search_text,
+    content='search_terms', content_rowid='id',
+    tokenize='trigram'
+);
+"""
+
+# Created after loading, which is faster than maintaining them per insert
+POST_LOAD = """
+CREATE INDEX idx_addresses_search ON addresses(search_text);
+CREATE INDEX idx_addresses_postal ON addresses(postal_code, address);
+CREATE INDEX idx_addresses_term ON addresses(term_id, address);
+INSERT INTO address_prefixes(address_prefixes) VALUES ('rebuild');
+INSERT INTO address_prefixes(address_prefixes) VALUES ('optimize');
+INSERT INTO address_trigrams(address_trigrams) VALUES ('rebuild');
+INSERT INTO address_trigrams(address_trigrams) VALUES ('optimize');
+CREATE VIRTUAL TABLE temp.trigram_vocab USING fts5vocab(main, address_trigrams, 'row');
+INSERT INTO trigram_stats SELECT term, doc FROM temp.trigram_vocab;
+ANALYZE;
+"""
+
+# unaccent rules for letters that do not decompose to a base letter + accent
+UNACCENT = str.maketrans({
+    'æ': 'ae', 'Æ': 'AE', 'ø': 'o', 'Ø': 'O', 'đ': 'd', 'Đ': 'D',
+    'ł': 'l', 'Ł': 'L', 'ß': 'ss', 'œ': 'oe', 'Œ': 'OE', 'þ': 'th', 'Þ': 'TH',
+})
+# pg_trgm words: runs of letters and digits
+_WORD = re.compile(r'[^\W_]+')
+
+
+def normalize(text: Optional[str]) -> str:
+    """LOWER(unaccent(TRIM(text))) as search_addresses applies it"""
+    text = unicodedata.normalize('NFKD', (text or '').strip().translate(UNACCENT))
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def trigrams(text: str) -> Set[str]:
+    """pg_trgm trigram set: each word padded with two leading and one trailing space"""
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: str, b: str) -> float:
+    """pg_trgm similarity(): shared trigrams over all distinct trigrams"""
+    return _similarity(trigrams(a), trigrams(b))
+
+
+def _similarity(grams_a: Set[str], grams_b: Set[str]) -> float:
+    if not grams_a or not grams_b:
+        return 0.0
+    common = len(grams_a & grams_b)
+    return common / (len(grams_a) + len(grams_b) - common)
+
+
+def _quote(term: str) -> str:
+    """FTS5 string literal"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+class AddressIndex:
+    """Read-only query side of the address index"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        uri = f"{self.path.resolve().as_uri()}?mode=ro&immutable=1"
+        self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self.conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        self.conn.execute("PRAGMA query_only = ON")
+        self.conn.row_factory = sqlite3.Row
+        self.meta: Dict[str, Any] = {key: json.loads(value) for key, value
+                                     in self.conn.execute("SELECT key, value FROM meta")}
+
+    def __len__(self) -> int:
+        return self.meta['rows']
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def default_path(data_path: Union[str, Path]) -> Path:
+        return Path(data_path) / INDEX_FILE_NAME
+
+    @staticmethod
+    def source_signature(csv_file: Union[str, Path]) -> Dict[str, Any]:
+        """Size, mtime and sampled content hash of the source CSV"""
+        return fingerprint(csv_file)
+
+    @classmethod
+    def is_current(cls, path: Union[str, Path], csv_file: Union[str, Path]) -> bool:
+        """True if path holds a complete index built from the current csv_file"""
+        if not Path(path).exists():
+            return False
+        try:
+            index = cls(path)
+        except sqlite3.Error:
+            return False
+        try:
+            return (index.meta.get('format_version') == INDEX_FORMAT_VERSION
+                    and index.meta.get('source') == cls.source_signature(csv_file))
+        finally:
+            index.close()
+
+    @classmethod
+    def build(cls, records: Iterable[Dict[str, Any]], path: Union[str, Path],
+              source: Optional[Dict[str, Any]] = None) -> 'AddressIndex':
+        """
+        Write the index from transformed energy_certificates records
+
+        Records without an address are skipped. The file is written next to
+        path and swapped in at the end, so readers never see a partial index.
+
+        Raises:
+            RuntimeError: If this SQLite build lacks FTS5 or the trigram tokenizer (3.34+)
+        """
+        path = Path(path)
+        started = time.perf_counter()
+        temp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        temp_path.unlink(missing_ok=True)
+
+        conn = sqlite3.connect(temp_path)
+        try:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            try:
+                conn.executescript(SCHEMA)
+            except sqlite3.OperationalError as e:
+                raise RuntimeError(f"SQLite {sqlite3.sqlite_version} cannot build the address index "
+                                   f"(needs FTS5 with the trigram tokenizer, 3.34+): {e}") from e
+
+            row_count = 0
+            batch = []
+            term_ids: Dict[str, int] = {}
+            insert = ("INSERT INTO addresses (address, postal_code, city, building_number, building_category, "
+                      "energy_class, energy_consumption, certificate_id, search_text, search_city, term_id) "
+                      "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+            for record in records:
+                address = record.get('address')
+                if not address:
+                    continue
+                search_text = normalize(address)
+                term_id = term_ids.setdefault(search_text, len(term_ids) + 1)
+                batch.append((
+                    address, record.get('postal_code'), record.get('city'), record.get('building_number'),
+                    record.get('building_category'), record.get('energy_class'),
+                    record.get('energy_consumption'), record.get('certificate_id'),
+                    search_text, normalize(record.get('city')), term_id,
+                ))
+                if len(batch) >= BUILD_BATCH_SIZE:
+                    conn.executemany(insert, batch)
+                    row_count += len(batch)
+                    batch = []
+            if batch:
+                conn.executemany(insert, batch)
+                row_count += len(batch)
+            conn.executemany("INSERT INTO search_terms (id, search_text) VALUES (?, ?)",
+                             ((term_id, text) for text, term_id in term_ids.items()))
+
+            conn.executescript(POST_LOAD)
+            meta = {
+                'format_version': INDEX_FORMAT_VERSION,
+                'source': source,
+                'rows': row_count,
+                'distinct_addresses': len(term_ids),
+                'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+            conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                             [(key, json.dumps(value)) for key, value in meta.items()])
+            conn.commit()
+        except BaseException:
+            conn.close()
+            temp_path.unlink(missing_ok=True)
+            raise
+        conn.close()
+        os.replace(temp_path, path)
+
+        logger.info(f"Built address index {path} with {row_count} addresses "
+                    f"in {time.perf_counter() - started:.1f}s ({path.stat().st_size / 1024 / 1024:.0f} MiB)")
+        return cls(path)
+
+    def _fetch(self, sql: str, params: tuple) -> List[sqlite3.Row]:
+        return self.conn.execute(sql, params).fetchall()
+
+    def search_addresses(self, query_text: str, limit_count: int = 10,
+                         min_similarity: float = 0.3) -> List[Dict[str, Any]]:
+        """
+        Fuzzy address search, same arguments, columns and ranking as search_addresses()
+
+        Candidates are the CANDIDATE_LIMIT distinct addresses with the best
+        BM25 score for the query's RARE_TRIGRAMS least common trigrams (OR-ing
+        every trigram costs 10x more for the same top results). Like the
+        Postgres function, a match needs a similarity of at least 0.3 (the %
+        operator) and at least min_similarity. Certificates are ordered by
+        similarity, then address (Python string order, as the C collation).
+        Queries need at least 3 characters.
+        """
+        query = normalize(query_text)
+        query_grams = trigrams(query)
+        windows = sorted({query[i:i + 3] for i in range(len(query) - 2)} - {'   '})
+        if not query_grams or not windows:
+            return []
+
+        documents = dict(self._fetch(
+            f"SELECT trigram, documents FROM trigram_stats WHERE trigram IN ({', '.join('?' * len(windows))})",
+            tuple(windows)
+        ))
+        rare = sorted((count, window) for window, count in documents.items())[:RARE_TRIGRAMS]
+        if not rare:
+            return []
+        candidates = self._fetch(
+            "SELECT rowid, search_text FROM address_trigrams WHERE address_trigrams MATCH ? ORDER BY rank LIMIT ?",
+            (' OR '.join(_quote(window) for _, window in rare), CANDIDATE_LIMIT)
+        )
+
+        threshold = max(min_similarity, PG_TRGM_SIMILARITY_THRESHOLD)
+        scored = []
+        for term_id, search_text in candidates:
+            value = _similarity(trigrams(search_text), query_grams)
+            if value >= threshold:
+                scored.append((value, term_id))
+        scored.sort(reverse=True)
+
+        # Terms tied with the last one needed may hold addresses that sort first
+        columns = ', '.join(SEARCH_COLUMNS)
+        results: List[Dict[str, Any]] = []
+        for value, term_id in scored:
+            if len(results) >= limit_count and value < results[-1]['similarity_score']:
+                break
+            rows = self._fetch(f"SELECT {columns} FROM addresses WHERE term_id = ? ORDER BY address LIMIT ?",
+                               (term_id, limit_count))
+            results.extend(dict(row, similarity_score=value) for row in rows)
+        results.sort(key=lambda row: (-row['similarity_score'], row['address']))
+        return results[:limit_count]
+
+    def autocomplete(self, prefix: str, limit_count: int = 10) -> List[Dict[str, Any]]:
+        """
+        Ranked prefix search for type-ahead
+
+        Addresses starting with the typed text come first, alphabetically
+        (a B-tree range scan). The rest are filled with addresses where every
+        typed word is a prefix of a word in the address, postal code or city,
+        best BM25 first.
+        """
+        query = normalize(prefix)
+        if not query:
+            return []
+        columns = ', '.join(SEARCH_COLUMNS)
+        rows = self._fetch(
+            f"SELECT id, {columns} FROM addresses WHERE search_text >= ? AND search_text < ? "
+            f"ORDER BY search_text, address LIMIT ?",
+            (query, query + '\U0010ffff', limit_count)
+        )
+        results = [{name: row[name] for name in SEARCH_COLUMNS} for row in rows]
+
+        words = _WORD.findall(query)
+        if len(results) < limit_count and words:
+            seen = [row['id'] for row in rows]
+            match = ' '.join(f"{_quote(word)}*" for word in words)
+            more = self._fetch(
+                f"SELECT a.{', a.'.join(SEARCH_COLUMNS)} FROM address_prefixes p JOIN addresses a ON a.id = p.rowid "
+                f"WHERE address_prefixes MATCH ? AND a.id NOT IN ({', '.join('?' * len(seen))}) "
+                f"ORDER BY p.rank LIMIT ?",
+                (match, *seen, limit_count - len(results))
+            )
+            results.extend({name: row[name] for name in SEARCH_COLUMNS} for row in more)
+        return results
+
+    def search_by_postal_code(self, postal: str, limit_count: int = 100) -> List[Dict[str, Any]]:
+        """Addresses in a postal code, same columns and order as search_by_postal_code()"""
+        columns = ', '.join(POSTAL_COLUMNS)
+        rows = self._fetch(f"SELECT {columns} FROM addresses WHERE postal_code = ? ORDER BY address LIMIT ?",
+                           (postal, limit_count))
+        return [dict(row) for row in rows]
+
+    def sample_queries(self, count: int, seed: int = 0) -> List[str]:
+        """Typed-prefix style queries cut from random indexed addresses"""
+        rng = random.Random(seed)
+        queries = []
+        for _ in range(count):
+            row_id = rng.randint(1, len(self))
+            (address,) = self.conn.execute("SELECT address FROM addresses WHERE id = ?", (row_id,)).fetchone()
+            queries.append(address[:rng.randint(min(4, len(address)), max(4, len(address)))])
+        return queries
+
+
+def _latency_summary(timings: List[float]) -> Dict[str, float]:
+    timings = sorted(timings)
+    return {
+        'queries': len(timings),
+        'p50_ms': round(statistics.median(timings) * 1000, 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 3),
+        'max_ms': round(timings[-1] * 1000, 3),
+    }
+
+
+def benchmark(index: AddressIndex, queries: List[str], supabase=None,
+              remote_queries: int = 0) -> Dict[str, Any]:
+    """
+    Time the local index, and the Postgres function when a client is given
+
+    For the remote sample, overlap is the share of Postgres' certificate_ids
+    that the local search also returned.
+    """
+    report: Dict[str, Any] = {}
+    for name, method in (('search_addresses', index.search_addresses), ('autocomplete', index.autocomplete)):
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            method(query)
+            timings.append(time.perf_counter() - started)
+        report[f"local_{name}"] = _latency_summary(timings)
+
+    if supabase is not None and remote_queries:
+        timings, overlaps = [], []
+        for query in queries[:remote_queries]:
+            started = time.perf_counter()
+            remote = supabase.rpc('search_addresses', {'query_text': query, 'limit_count': 10}).execute().data or []
+            timings.append(time.perf_counter() - started)
+            remote_ids = {row['certificate_id'] for row in remote}
+            if remote_ids:
+                local_ids = {row['certificate_id'] for row in index.search_addresses(query)}
+                overlaps.append(len(remote_ids & local_ids) / len(remote_ids))
+        report['remote_search_addresses'] = _latency_summary(timings)
+        report['remote_overlap'] = round(statistics.mean(overlaps), 3) if overlaps else None
+    return report
+
+
+def main():
+    """Build, query or benchmark the local address index"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='Local SQLite address search index')
+    parser.add_argument('--data-path', help='Path to production_data folder (or set PRODUCTION_DATA_PATH env var)')
+    parser.add_argument('--build', action='store_true', help='Rebuild even if the index is current')
+    parser.add_argument('--search', action='append', default=[], help='Fuzzy search like search_addresses()')
+    parser.add_argument('--prefix', action='append', default=[], help='Ranked prefix (autocomplete) search')
+    parser.add_argument('--postal', action='append', default=[], help='List addresses like search_by_postal_code()')
+    parser.add_argument('--limit', type=int, default=10, help='Results per query')
+    parser.add_argument('--benchmark', type=int, default=0, help='Time N sampled queries')
+    parser.add_argument('--remote-queries', type=int, default=0,
+                        help='Also time this many against the Postgres function (needs Supabase credentials)')
+    parser.add_argument('--supabase-url', help='Supabase project URL (or set SUPABASE_URL env var)')
+    parser.add_argument('--supabase-key', help='Supabase key (or set SUPABASE_KEY env var)')
+
+    args = parser.parse_args()
+
+    from migration_script import EnovaDataMigrator
+
+    data_path = Path(args.data_path or os.getenv('PRODUCTION_DATA_PATH', '../../landingsside-energi/production_data'))
+    csv_file = data_path / 'enova_energimerker_2024.csv'
+    path = AddressIndex.default_path(data_path)
+
+    if args.build or not AddressIndex.is_current(path, csv_file):
+        index = AddressIndex.build(EnovaDataMigrator.iter_csv_records(csv_file), path,
+                                   source=AddressIndex.source_signature(csv_file))
+    else:
+        index = AddressIndex(path)
+    logger.info(f"Address index: {len(index)} addresses ({path})")
+
+    for query in args.search:
+        results = index.search_addresses(query, limit_count=args.limit)
+        print(f"search {query!r}: {len(results)} results")
+        for row in results:
+            print(f"  {row['similarity_score']:.3f} {row['address']}, {row['postal_code']} {row['city']} "
+                  f"({row['certificate_id']})")
+
+    for query in args.prefix:
+        results = index.autocomplete(query, limit_count=args.limit)
+        print(f"prefix {query!r}: {len(results)} results")
+        for row in results:
+            print(f"  {row['address']}, {row['postal_code']} {row['city']} ({row['certificate_id']})")
+
+    for postal in args.postal:
+        results = index.search_by_postal_code(postal, limit_count=args.limit)
+        print(f"postal {postal}: {len(results)} results")
+        for row in results:
+            print(f"  {row['address']}, {row['city']} {row['energy_class'] or '-'}")
+
+    if args.benchmark and len(index):
+        supabase = None
+        if args.remote_queries:
+            supabase_url = args.supabase_url or os.getenv('SUPABASE_URL')
+            supabase_key = args.supabase_key or os.getenv('SUPABASE_KEY')
+            if supabase_url and supabase_key:
+                from supabase_transport import create_supabase_client
+                supabase, _ = create_supabase_client(supabase_url, supabase_key)
+            else:
+                logger.warning("No Supabase credentials, skipping the Postgres comparison")
+
+        report = benchmark(index, index.sample_queries(args.benchmark), supabase, args.remote_queries)
+        for name, values in report.items():
+            logger.info(f"{name}: {values}")
+
+
+if __name__ == "__main__":
+    main()
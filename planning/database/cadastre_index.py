@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Sorted Cadastre Index over the Columnar Cache
+Maps cadastral identities (knr, gnr, bnr, snr, fnr) to row offsets in the
+columnar cache, so property matching runs locally instead of one Postgres
+round trip per lookup through idx_energy_certificates_cadastre.
+
+Each identity is packed into one uint64, most significant field first:
+
+    knr 13 bits | gnr 16 bits | bnr 16 bits | snr 10 bits | fnr 9 bits
+
+so numeric key order equals (knr, gnr, bnr, snr, fnr) order and every prefix
+(a municipality, a gnr, a gnr/bnr) is one contiguous key range. NULL is 0,
+as in the cache. Rows without knr or with a field too large for its bits
+(snr above 1023, fnr above 511, ...) are left out; the manifest counts them
+per field and the build logs a warning.
+
+Files (inside the cache directory, written by ColumnarCache.build):
+    cadastre.keys.npy   sorted uint64 keys
+    cadastre.rows.npy   uint32 cache row offset for each key
+    cadastre.json       layout, entry and per-field skip counts
+
+Usage:
+    index = CadastreIndex.open(cache)
+    rows = index.units(301, 12, 345)                 # every unit on gnr 12 / bnr 345
+    ids = index.certificate_ids(cache, rows)
+    python cadastre_index.py --lookup 301:12:345 --lookup 301:12:345:4
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Tuple, Union
+import logging
+
+# Try to import required packages
+try:
+    import numpy as np
+except ImportError:
+    print("Please install numpy: pip install numpy")
+    sys.exit(1)
+
+logger = logging.getLogger(__name__)
+
+# (field, bits) from most to least significant; widths sum to 64
+KEY_LAYOUT: List[Tuple[str, int]] = [('knr', 13), ('gnr', 16), ('bnr', 16), ('snr', 10), ('fnr', 9)]
+KEY_FIELDS = [name for name, _ in KEY_LAYOUT]
+KEY_SHIFTS = {}
+_shift = 64
+for _name, _bits in KEY_LAYOUT:
+    _shift -= _bits
+    KEY_SHIFTS[_name] = _shift
+KEY_LIMITS = {name: (1 << bits) - 1 for name, bits in KEY_LAYOUT}
+
+INDEX_FORMAT_VERSION = 2
+
+
+def pack_key(*components: Optional[int]) -> int:
+    """
+    Pack (knr, gnr, bnr, snr, fnr) into one key; missing trailing fields and None are 0
+
+    Raises:
+        ValueError: If a component is negative or does not fit its bits
+    """
+    if len(components) > len(KEY_LAYOUT):
+        raise ValueError(f"At most {len(KEY_LAYOUT)} key components, got {len(components)}")
+    key = 0
+    for (name, _), value in zip(KEY_LAYOUT, components):
+        value = value or 0
+        if not 0 <= value <= KEY_LIMITS[name]:
+            raise ValueError(f"{name}={value} outside 0..{KEY_LIMITS[name]}")
+        key |= value << KEY_SHIFTS[name]
+    return key
+
+
+def unpack_key(key: int) -> Tuple[int, ...]:
+    """Inverse of pack_key: (knr, gnr, bnr, snr, fnr) with 0 for NULL"""
+    return tuple((int(key) >> KEY_SHIFTS[name]) & KEY_LIMITS[name] for name in KEY_FIELDS)
+
+
+def prefix_bounds(*components: Optional[int]) -> Tuple[int, int]:
+    """Inclusive key range of every identity starting with the given components"""
+    low = pack_key(*components)
+    free_bits = KEY_SHIFTS[KEY_FIELDS[len(components) - 1]] if components else 64
+    return low, low | ((1 << free_bits) - 1)
+
+
+class CadastreIndex:
+    """Read side of the cadastre index; keys and rows are memory-mapped"""
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        with open(self.directory / 'cadastre.json', 'r', encoding='utf-8') as file:
+            self.manifest: Dict[str, Any] = json.load(file)
+        self.keys: np.ndarray = np.load(self.directory / 'cadastre.keys.npy', mmap_mode='r')
+        self.rows: np.ndarray = np.load(self.directory / 'cadastre.rows.npy', mmap_mode='r')
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def build(cls, cache, directory: Optional[Union[str, Path]] = None) -> 'CadastreIndex':
+        """
+        Build the index from a ColumnarCache's integer cadastre columns
+
+        A stable sort keeps rows with the same identity in file order.
+        """
+        directory = Path(directory) if directory else cache.directory
+        started = time.perf_counter()
+
+        columns = {name: np.asarray(cache.column(name), dtype=np.int64) for name in KEY_FIELDS}
+        indexable = columns['knr'] > 0
+        for name in KEY_FIELDS:
+            indexable &= (columns[name] >= 0) & (columns[name] <= KEY_LIMITS[name])
+
+        row_offsets = np.flatnonzero(indexable).astype(np.uint32)
+        keys = np.zeros(len(row_offsets), dtype=np.uint64)
+        for name in KEY_FIELDS:
+            keys |= columns[name][indexable].astype(np.uint64) << np.uint64(KEY_SHIFTS[name])
+
+        order = np.argsort(keys, kind='stable')
+        np.save(directory / 'cadastre.keys.npy', keys[order])
+        np.save(directory / 'cadastre.rows.npy', row_offsets[order])
+
+        has_knr = columns['knr'] > 0
+        # A row can be out of range in several fields, so these may sum to more than the total
+        out_of_range = {}
+        for name in KEY_FIELDS:
+            outside = (columns[name] < 0) | (columns[name] > KEY_LIMITS[name])
+            out_of_range[name] = int(np.count_nonzero(has_knr & outside))
+        manifest = {
+            'format_version': INDEX_FORMAT_VERSION,
+            'source': cache.manifest.get('source'),
+            'layout': KEY_LAYOUT,
+            'entries': int(len(keys)),
+            'skipped_no_knr': int(np.count_nonzero(~has_knr)),
+            'skipped_out_of_range': int(np.count_nonzero(has_knr) - len(keys)),
+            'out_of_range_by_field': {name: count for name, count in out_of_range.items() if count},
+        }
+        with open(directory / 'cadastre.json', 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, indent=2)
+
+        if manifest['skipped_out_of_range']:
+            fields = ', '.join(f"{name} (max {KEY_LIMITS[name]}): {count}"
+                               for name, count in manifest['out_of_range_by_field'].items())
+            logger.warning(f"{manifest['skipped_out_of_range']} rows have cadastre numbers outside the "
+                           f"key layout and are not indexed ({fields})")
+        logger.info(f"Built cadastre index with {len(keys)} keys in {time.perf_counter() - started:.2f}s")
+        return cls(directory)
+
+    @classmethod
+    def open(cls, cache) -> 'CadastreIndex':
+        """Open the index of a ColumnarCache, building it if missing or stale"""
+        manifest_file = cache.directory / 'cadastre.json'
+        if manifest_file.exists():
+            index = cls(cache.directory)
+            if (index.manifest.get('format_version') == INDEX_FORMAT_VERSION
+                    and index.manifest.get('source') == cache.manifest.get('source')):
+                return index
+        return cls.build(cache)
+
+    def _slice(self, low: int, high: int) -> Tuple[int, int]:
+        start = int(np.searchsorted(self.keys, np.uint64(low), side='left'))
+        stop = int(np.searchsorted(self.keys, np.uint64(high), side='right'))
+        return start, stop
+
+    def entries(self, low: int, high: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Stored keys and cache rows for the inclusive key range low..high"""
+        start, stop = self._slice(low, high)
+        return self.keys[start:stop], self.rows[start:stop]
+
+    def lookup(self, knr: int, gnr: int, bnr: int,
+               snr: Optional[int] = None, fnr: Optional[int] = None) -> np.ndarray:
+        """Cache rows with exactly this identity (None/0 snr and fnr match NULL)"""
+        key = pack_key(knr, gnr, bnr, snr, fnr)
+        start, stop = self._slice(key, key)
+        return self.rows[start:stop]
+
+    def range(self, *components: Optional[int]) -> np.ndarray:
+        """Cache rows whose identity starts with the given components, in key order"""
+        start, stop = self._slice(*prefix_bounds(*components))
+        return self.rows[start:stop]
+
+    def units(self, knr: int, gnr: int, bnr: int) -> np.ndarray:
+        """Every section and leasehold (snr/fnr) on one gnr/bnr"""
+        return self.range(knr, gnr, bnr)
+
+    def lookup_many(self, identities: Sequence[Sequence[Optional[int]]]) -> List[np.ndarray]:
+        """
+        Exact lookups for many identities with two vectorized binary searches
+
+        Identities that cannot be packed (out of range) get an empty result.
+        """
+        keys = np.zeros(len(identities), dtype=np.uint64)
+        valid = np.ones(len(identities), dtype=bool)
+        for i, identity in enumerate(identities):
+            try:
+                keys[i] = pack_key(*identity)
+            except ValueError:
+                valid[i] = False
+        starts = np.searchsorted(self.keys, keys, side='left')
+        stops = np.searchsorted(self.keys, keys, side='right')
+        empty = self.rows[0:0]
+        return [self.rows[start:stop] if ok else empty
+                for start, stop, ok in zip(starts.tolist(), stops.tolist(), valid.tolist())]
+
+    @staticmethod
+    def certificate_ids(cache, rows: Iterable[int]) -> List[Optional[str]]:
+        """Resolve cache row offsets to certificate ids"""
+        column = cache.column('certificate_id')
+        return column.decode(column.codes[np.asarray(rows, dtype=np.int64)].tolist())
+
+
+def parse_identity(text: str) -> Tuple[int, ...]:
+    """Parse 'knr:gnr:bnr[:snr[:fnr]]' (index field order)"""
+    return tuple(int(part) for part in text.split(':'))
+
+
+def main():
+    """Look up identities or benchmark the cadastre index"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='Query the cadastre index of the columnar cache')
+    parser.add_argument('--data-path', help='Path to production_data folder (or set PRODUCTION_DATA_PATH env var)')
+    parser.add_argument('--lookup', action='append', default=[],
+                        help="knr:gnr:bnr lists every unit; knr:gnr:bnr:snr[:fnr] is an exact match")
+    parser.add_argument('--benchmark', type=int, default=0, help='Time N random exact lookups')
+
+    args = parser.parse_args()
+
+    from columnar_cache import ColumnarCache
+    from migration_script import EnovaDataMigrator
+
+    data_path = Path(args.data_path or os.getenv('PRODUCTION_DATA_PATH', '../../landingsside-energi/production_data'))
+    cache = ColumnarCache.load_or_build(data_path / 'enova_energimerker_2024.csv',
+                                        EnovaDataMigrator.record_transformer())
+    index = CadastreIndex.open(cache)
+    logger.info(f"Cadastre index: {len(index)} keys ({index.manifest['skipped_no_knr']} rows without knr, "
+                f"{index.manifest['skipped_out_of_range']} outside the key layout "
+                f"{index.manifest['out_of_range_by_field']})")
+
+    for text in args.lookup:
+        identity = parse_identity(text)
+        try:
+            # knr:gnr:bnr is a prefix; a missing fnr matches NULL, as in lookup()
+            low, high = prefix_bounds(*identity) if len(identity) == 3 else (pack_key(*identity),) * 2
+        except ValueError as e:
+            print(f"{text}: not indexable ({e})")
+            continue
+        keys, rows = index.entries(low, high)
+        print(f"{text}: {len(rows)} certificates")
+        for key, row, certificate_id in zip(keys.tolist(), rows.tolist(), index.certificate_ids(cache, rows)):
+            print(f"  row {row}: {certificate_id} {unpack_key(key)}")
+
+    if args.benchmark and len(index):
+        sample = np.random.default_rng(0).choice(np.asarray(index.keys), size=args.benchmark)
+        identities = [unpack_key(key) for key in sample.tolist()]
+        started = time.perf_counter()
+        results = index.lookup_many(identities)
+        elapsed = time.perf_counter() - started
+        logger.info(f"{args.benchmark} lookups ({sum(len(rows) for rows in results)} rows) "
+                    f"in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
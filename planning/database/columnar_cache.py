@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Binary Columnar Cache of the Parsed Enova Dataset
+Converts enova_energimerker_2024.csv once into typed, memory-mappable NumPy
+arrays so later migrate/verify runs skip text parsing entirely.
+
+Layout of the cache directory (next to the CSV by default):
+    manifest.json             source fingerprint, row count, column types
+    <column>.npy              numeric columns (int64 with 0 = NULL, float64 with NaN = NULL, bool)
+    <column>.codes.npy        dictionary-encoded strings: int32 codes, -1 = NULL
+    <column>.offsets.npy      int64 offsets into the dictionary blob
+    <column>.values.npy       uint8 UTF-8 dictionary blob
+    cadastre.*                sorted cadastre index (cadastre_index.py)
+
+The cache stores transformed records (energy_certificates columns), and is
+rebuilt automatically when the CSV's fingerprint changes.
+
+Usage:
+    python columnar_cache.py --data-path /path/to/production_data
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Union
+import logging
+
+# Try to import required packages
+try:
+    import numpy as np
+except ImportError:
+    print("Please install numpy: pip install numpy")
+    sys.exit(1)
+
+from csv_reader import CSVSource, fingerprint
+from parallel_csv import parse_parallel
+from cadastre_index import CadastreIndex
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT_VERSION = 3
+
+# energy_certificates columns by storage type; anything else is a dictionary-encoded string
+INT_FIELDS = ['knr', 'gnr', 'bnr', 'snr', 'fnr', 'construction_year']
+FLOAT_FIELDS = ['energy_consumption', 'fossil_percentage']
+BOOL_FIELDS = ['has_energy_evaluation']
+
+
+class DictionaryColumn:
+    """Dictionary-encoded string column backed by memory-mapped arrays"""
+
+    def __init__(self, codes: np.ndarray, offsets: np.ndarray, blob: np.ndarray):
+        self.codes = codes
+        self._offsets = offsets
+        self._blob = memoryview(blob)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def decode(self, codes: Iterable[int]) -> List[Optional[str]]:
+        """
+        Decode dictionary codes to strings (None for NULL)
+
+        Only the entries referenced by codes are decoded, so near-unique
+        columns such as certificate_id never materialize the whole dictionary.
+        """
+        codes = list(codes)
+        used = sorted({code for code in codes if code >= 0})
+        positions = np.asarray(used, dtype=np.int64)
+        starts = self._offsets[positions].tolist()
+        ends = self._offsets[positions + 1].tolist()
+        blob = self._blob
+        strings = {code: str(blob[start:end], 'utf-8') for code, start, end in zip(used, starts, ends)}
+        return [strings[code] if code >= 0 else None for code in codes]
+
+    def tolist(self, start: int = 0, stop: Optional[int] = None) -> List[Optional[str]]:
+        """Decode a slice of the column to Python strings (None for NULL)"""
+        return self.decode(self.codes[start:stop].tolist())
+
+
+class ColumnarCacheWriter:
+    """Accumulates transformed records column by column"""
+
+    def __init__(self, fields: List[str]):
+        self.fields = fields
+        self.row_count = 0
+        # Integers outside int64, stored as NULL
+        self.overflow_count = 0
+        self._numeric = {}
+        self._codes = {}
+        self._dictionaries = {}
+        for name in fields:
+            if name in INT_FIELDS:
+                self._numeric[name] = array('q')
+            elif name in FLOAT_FIELDS:
+                self._numeric[name] = array('d')
+            elif name in BOOL_FIELDS:
+                self._numeric[name] = array('b')
+            else:
+                self._codes[name] = array('i')
+                self._dictionaries[name] = {}
+
+    def append(self, record: Dict[str, Any]):
+        """Append one transformed record"""
+        for name, column in self._numeric.items():
+            value = record.get(name)
+            if name in FLOAT_FIELDS:
+                column.append(float('nan') if value is None else value)
+            elif value is None:
+                column.append(0)
+            else:
+                try:
+                    column.append(int(value))
+                except OverflowError:
+                    self.overflow_count += 1
+                    column.append(0)
+        for name, codes in self._codes.items():
+            value = record.get(name)
+            if value is None:
+                codes.append(-1)
+            else:
+                dictionary = self._dictionaries[name]
+                code = dictionary.get(value)
+                if code is None:
+                    code = dictionary[value] = len(dictionary)
+                codes.append(code)
+        self.row_count += 1
+
+    def write(self, directory: Path, manifest: Dict[str, Any]):
+        """Write all column files and the manifest into directory"""
+        directory.mkdir(parents=True, exist_ok=True)
+        types = {}
+
+        for name, column in self._numeric.items():
+            if name in FLOAT_FIELDS:
+                types[name] = 'float64'
+                data = np.frombuffer(column, dtype=np.float64)
+            elif name in BOOL_FIELDS:
+                types[name] = 'bool'
+                data = np.frombuffer(column, dtype=np.int8).astype(bool)
+            else:
+                types[name] = 'int64'
+                data = np.frombuffer(column, dtype=np.int64)
+            np.save(directory / f"{name}.npy", data)
+
+        for name, codes in self._codes.items():
+            types[name] = 'dictionary'
+            encoded = [value.encode('utf-8') for value in self._dictionaries[name]]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(value) for value in encoded], out=offsets[1:])
+            np.save(directory / f"{name}.codes.npy", np.frombuffer(codes, dtype=np.int32))
+            np.save(directory / f"{name}.offsets.npy", offsets)
+            np.save(directory / f"{name}.values.npy", np.frombuffer(b''.join(encoded), dtype=np.uint8))
+
+        manifest = dict(manifest, row_count=self.row_count, fields=self.fields, types=types,
+                        format_version=CACHE_FORMAT_VERSION)
+        with open(directory / 'manifest.json', 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, indent=2)
+
+
+class ColumnarCache:
+    """Read side of the columnar cache; columns are memory-mapped on demand"""
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        with open(self.directory / 'manifest.json', 'r', encoding='utf-8') as file:
+            self.manifest = json.load(file)
+        self.row_count: int = self.manifest['row_count']
+        # Records in the source CSV, including rows that failed to transform
+        self.source_row_count: int = self.row_count + self.manifest.get('error_count', 0)
+        self.fields: List[str] = self.manifest['fields']
+        self._columns: Dict[str, Any] = {}
+
+    @staticmethod
+    def default_directory(csv_path: Union[str, Path]) -> Path:
+        path = Path(csv_path)
+        return path.with_name(f"{path.stem}.cache")
+
+    @classmethod
+    def is_valid(cls, directory: Union[str, Path], csv_path: Union[str, Path]) -> bool:
+        """True if directory holds a complete cache built from the current csv_path"""
+        manifest_file = Path(directory) / 'manifest.json'
+        if not manifest_file.exists():
+            return False
+        try:
+            with open(manifest_file, 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return False
+        return (manifest.get('format_version') == CACHE_FORMAT_VERSION
+                and manifest.get('source') == fingerprint(csv_path))
+
+    @classmethod
+    def open_if_valid(cls, csv_path: Union[str, Path],
+                      directory: Optional[Union[str, Path]] = None) -> Optional['ColumnarCache']:
+        """Open the cache for csv_path, or return None if it is missing or stale"""
+        directory = Path(directory) if directory else cls.default_directory(csv_path)
+        return cls(directory) if cls.is_valid(directory, csv_path) else None
+
+    @classmethod
+    def build(cls, csv_path: Union[str, Path],
+              transform: Callable[[List[str], Dict[str, int]], Dict[str, Any]],
+              directory: Optional[Union[str, Path]] = None,
+              workers: int = 1) -> 'ColumnarCache':
+        """
+        Parse and transform the CSV once and write the cache
+
+        Rows that fail to transform are skipped and counted in the manifest.
+        The cache is written to a temporary directory and swapped in at the end,
+        so an interrupted build never leaves a half-written cache behind.
+        """
+        directory = Path(directory) if directory else cls.default_directory(csv_path)
+        started = time.perf_counter()
+        source_fingerprint = fingerprint(csv_path)
+        writer = None
+        error_count = 0
+
+        if workers > 1:
+            for _, records, errors in parse_parallel(csv_path, transform, workers=workers):
+                error_count += len(errors)
+                for record in records:
+                    if writer is None:
+                        writer = ColumnarCacheWriter(list(record))
+                    writer.append(record)
+        else:
+            with CSVSource(csv_path) as source:
+                columns = source.columns
+                for row in source.rows():
+                    try:
+                        record = transform(row, columns)
+                    except Exception:
+                        error_count += 1
+                        continue
+                    if writer is None:
+                        writer = ColumnarCacheWriter(list(record))
+                    writer.append(record)
+
+        if writer is None:
+            raise ValueError(f"No records could be read from {csv_path}")
+        if writer.overflow_count:
+            logger.warning(f"{writer.overflow_count} integer values outside the int64 range were stored as NULL")
+
+        temp_directory = directory.with_name(f"{directory.name}.tmp-{os.getpid()}")
+        shutil.rmtree(temp_directory, ignore_errors=True)
+        writer.write(temp_directory, {'source': source_fingerprint, 'error_count': error_count})
+        CadastreIndex.build(cls(temp_directory))
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(temp_directory, directory)
+
+        logger.info(
+            f"Built columnar cache {directory} with {writer.row_count} rows "
+            f"({error_count} skipped) in {time.perf_counter() - started:.1f}s"
+        )
+        return cls(directory)
+
+    @classmethod
+    def load_or_build(cls, csv_path: Union[str, Path],
+                      transform: Callable[[List[str], Dict[str, int]], Dict[str, Any]],
+                      directory: Optional[Union[str, Path]] = None,
+                      workers: int = 1) -> 'ColumnarCache':
+        """Open a valid cache for csv_path, rebuilding it first if the CSV changed"""
+        cache = cls.open_if_valid(csv_path, directory)
+        if cache is not None:
+            return cache
+        logger.info(f"Columnar cache for {Path(csv_path).name} missing or stale, rebuilding")
+        return cls.build(csv_path, transform, directory, workers)
+
+    def column(self, name: str) -> Union[np.ndarray, DictionaryColumn]:
+        """Memory-map one column (numeric array or DictionaryColumn)"""
+        if name not in self._columns:
+            if self.manifest['types'][name] == 'dictionary':
+                self._columns[name] = DictionaryColumn(
+                    np.load(self.directory / f"{name}.codes.npy", mmap_mode='r'),
+                    np.load(self.directory / f"{name}.offsets.npy", mmap_mode='r'),
+                    np.load(self.directory / f"{name}.values.npy", mmap_mode='r'),
+                )
+            else:
+                self._columns[name] = np.load(self.directory / f"{name}.npy", mmap_mode='r')
+        return self._columns[name]
+
+    def _python_values(self, name: str, start: int, stop: int) -> List[Any]:
+        """Slice a column back into Python values with NULL sentinels as None"""
+        column = self.column(name)
+        kind = self.manifest['types'][name]
+        if kind == 'dictionary':
+            return column.tolist(start, stop)
+        values = column[start:stop].tolist()
+        if kind == 'int64':
+            return [value if value != 0 else None for value in values]
+        if kind == 'float64':
+            return [value if value == value else None for value in values]
+        return values
+
+    def value_counts(self, *names: str) -> Counter:
+        """
+        Count distinct value combinations of dictionary columns
+
+        Works on the integer codes, so only the distinct combinations are
+        decoded. NULL values appear as None.
+        """
+        columns = [self.column(name) for name in names]
+        combos, counts = np.unique(np.stack([column.codes for column in columns], axis=1),
+                                   axis=0, return_counts=True)
+        decoded = [column.decode(codes) for column, codes in zip(columns, combos.T.tolist())]
+        return Counter(dict(zip(zip(*decoded), counts.tolist())))
+
+    def iter_records(self, batch_size: int = 1000,
+                     limit: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Yield batches of records shaped like EnovaDataMigrator.transform_csv_row output"""
+        total = min(self.row_count, limit) if limit else self.row_count
+        for start in range(0, total, batch_size):
+            stop = min(start + batch_size, total)
+            columns = [self._python_values(name, start, stop) for name in self.fields]
+            yield [dict(zip(self.fields, values)) for values in zip(*columns)]
+
+
+def main():
+    """Build or check the columnar cache"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description='Build the columnar cache of the Enova CSV')
+    parser.add_argument('--data-path', help='Path to production_data folder (or set PRODUCTION_DATA_PATH env var)')
+    parser.add_argument('--workers', type=int, default=1, help='Parallel CSV parse processes')
+    parser.add_argument('--force', action='store_true', help='Rebuild even if the cache is current')
+
+    args = parser.parse_args()
+
+    data_path = Path(args.data_path or os.getenv('PRODUCTION_DATA_PATH', '../../landingsside-energi/production_data'))
+    csv_path = data_path / 'enova_energimerker_2024.csv'
+
+    # Reuse the migrator's transform so cached records match a CSV migration exactly
+    from migration_script import EnovaDataMigrator
+    transform = EnovaDataMigrator.record_transformer()
+
+    cache = None if args.force else ColumnarCache.open_if_valid(csv_path)
+    if cache is not None:
+        logger.info(f"Columnar cache is current: {cache.row_count} rows in {cache.directory}")
+        return
+
+    ColumnarCache.build(csv_path, transform, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Shared CSV Reader for the Import Scripts
+Memory-maps a CSV export and detects BOM, encoding and dialect once, so the
+importers can stream rows as plain lists (or column chunks) with a single
+header -> index map instead of building a dict per row.
+
+Norwegian exports come in several flavours: Enova/NVE files are UTF-8 with BOM
+and comma separated, SSB tables are Latin-1 and semicolon separated.
+
+Usage:
+    with CSVSource('data.csv') as source:
+        knr = source.columns['Knr']
+        for row_num, row in enumerate(source.rows(), 1):
+            print(row[knr])
+"""
+
+import re
+import csv
+import codecs
+import mmap
+import hashlib
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Byte order marks, longest first so UTF-32 is not mistaken for UTF-16
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+]
+
+FALLBACK_ENCODING = 'latin1'
+# Encodings where b'\n' and the quote byte never occur inside a multi-byte character
+ASCII_COMPATIBLE_ENCODINGS = {'utf-8', 'latin1', 'cp1252', 'ascii'}
+CANDIDATE_DELIMITERS = ',;\t|'
+SAMPLE_SIZE = 1024 * 1024
+SNIFF_SIZE = 64 * 1024
+READ_BLOCK_SIZE = 4 * 1024 * 1024
+FINGERPRINT_SAMPLE_BYTES = 1024 * 1024
+
+
+def get_field(row: List[str], columns: Dict[str, int], name: str,
+              default: Optional[str] = None) -> Optional[str]:
+    """
+    Look up a field by column name in a list row
+
+    Mirrors csv.DictReader semantics: unknown columns and short rows give the default.
+    """
+    index = columns.get(name)
+    if index is None or index >= len(row):
+        return default
+    return row[index]
+
+
+def detect_encoding(sample: bytes) -> Tuple[str, int]:
+    """
+    Detect the text encoding of a file from its first bytes
+
+    Args:
+        sample: Leading bytes of the file
+
+    Returns:
+        Tuple of (encoding name, BOM length in bytes)
+    """
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding, len(bom)
+
+    # No BOM: accept UTF-8 if the sample decodes (a trailing partial character is fine)
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8', 0
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING, 0
+
+
+def detect_dialect(sample_text: str) -> type:
+    """
+    Detect the CSV delimiter from a text sample
+
+    Only the delimiter is taken from csv.Sniffer; quoting stays as in
+    csv.excel (quotechar '"', doublequote=True). The sniffer often guesses
+    doublequote=False, which turns escaped "" quotes into field breaks.
+    Falls back to counting candidate delimiters in the first non-empty line
+    when csv.Sniffer cannot decide.
+    """
+    try:
+        delimiter = csv.Sniffer().sniff(sample_text[:SNIFF_SIZE], delimiters=CANDIDATE_DELIMITERS).delimiter
+    except csv.Error:
+        first_line = next((line for line in sample_text.splitlines() if line.strip()), '')
+        delimiter = max(CANDIDATE_DELIMITERS, key=first_line.count)
+        if not first_line.count(delimiter):
+            delimiter = ','
+
+    class SniffedDialect(csv.excel):
+        pass
+
+    SniffedDialect.delimiter = delimiter
+    return SniffedDialect
+
+
+def fingerprint(csv_path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Fingerprint a source file without reading all of it
+
+    Size and mtime catch normal edits; hashing the first and last MiB catches
+    files replaced by a copy that kept the old mtime. Derived files (the
+    columnar cache, the address index) store it to detect a changed source.
+    """
+    path = Path(csv_path)
+    stat = path.stat()
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        digest.update(file.read(FINGERPRINT_SAMPLE_BYTES))
+        if stat.st_size > FINGERPRINT_SAMPLE_BYTES:
+            file.seek(max(stat.st_size - FINGERPRINT_SAMPLE_BYTES, FINGERPRINT_SAMPLE_BYTES))
+            digest.update(file.read())
+    return {
+        'name': path.name,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sample_hash': digest.hexdigest(),
+    }
+
+
+class CSVSource:
+    """Memory-mapped CSV file with encoding, dialect and header detected up front"""
+
+    def __init__(self, path: Union[str, Path], encoding: Optional[str] = None,
+                 delimiter: Optional[str] = None, sample_size: int = SAMPLE_SIZE):
+        """
+        Open and memory-map a CSV file and read its header
+
+        Args:
+            path: Path to CSV file
+            encoding: Force an encoding instead of detecting it
+            delimiter: Force a delimiter instead of sniffing it
+            sample_size: Bytes inspected for encoding and dialect detection
+        """
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"CSV file not found: {self.path}")
+
+        self._file = open(self.path, 'rb')
+        self.size = self.path.stat().st_size
+        # mmap cannot map empty files
+        self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+
+        sample = bytes(self.data[:sample_size])
+        detected_encoding, self.bom_length = detect_encoding(sample)
+        self.encoding = encoding or detected_encoding
+
+        sample_text = codecs.getincrementaldecoder(self.encoding)(errors='replace').decode(
+            sample[self.bom_length:], final=False)
+        self.dialect = detect_dialect(sample_text)
+        if delimiter:
+            self.dialect.delimiter = delimiter
+
+        self.header: List[str] = []
+        self.data_offset = self.bom_length
+        self._read_header()
+        self.columns: Dict[str, int] = {name: i for i, name in enumerate(self.header)}
+
+        logger.info(
+            f"Opened {self.path.name}: encoding={self.encoding}, "
+            f"delimiter={self.dialect.delimiter!r}, {len(self.header)} columns"
+        )
+
+    def _read_header(self):
+        """Parse the header record and remember where the data records start"""
+        pending = ''
+        # iter_lines decodes incrementally, so UTF-16/32 newlines are found
+        # after decoding rather than by searching for a b'\n' byte
+        for line in self.iter_lines(self.bom_length, block_size=SNIFF_SIZE):
+            pending += line
+            # A header with a quoted newline is only complete once quotes balance
+            if pending.count(self.dialect.quotechar) % 2 == 0:
+                break
+        self.data_offset = self.bom_length + len(pending.encode(self.encoding))
+        if pending.strip():
+            self.header = next(csv.reader([pending], self.dialect))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Release the memory map and file handle"""
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self._file.close()
+
+    def iter_lines(self, start: Optional[int] = None, end: Optional[int] = None,
+                   block_size: int = READ_BLOCK_SIZE) -> Iterator[str]:
+        """
+        Decode a byte range of the file into lines, keeping line endings
+
+        Args:
+            start: First byte (defaults to the first data record)
+            end: Byte after the last one (defaults to end of file)
+            block_size: Bytes decoded at a time
+        """
+        start = self.data_offset if start is None else start
+        end = self.size if end is None else end
+        decoder = codecs.getincrementaldecoder(self.encoding)()
+        partial = ''
+
+        for block_start in range(start, end, block_size):
+            block_end = min(block_start + block_size, end)
+            text = partial + decoder.decode(self.data[block_start:block_end], final=block_end == end)
+            # Split on '\n' only: str.splitlines() would also break on characters
+            # such as '\x0c' or '\u2028' that may legitimately appear inside fields
+            lines = text.split('\n')
+            # Hold back the unterminated last line until the next block arrives
+            partial = lines.pop()
+            for line in lines:
+                yield line + '\n'
+
+        if partial:
+            yield partial
+
+    def rows(self, start: Optional[int] = None, end: Optional[int] = None) -> Iterator[List[str]]:
+        """
+        Yield data records as lists of strings (header excluded)
+
+        Blank lines are skipped, as csv.DictReader does. Index into each row
+        with self.columns or get_field().
+        """
+        return filter(None, csv.reader(self.iter_lines(start, end), self.dialect))
+
+    def column_chunks(self, chunk_size: int = 10000,
+                      columns: Optional[List[str]] = None) -> Iterator[Tuple[int, Dict[str, Tuple[str, ...]]]]:
+        """
+        Yield the file as column-oriented chunks
+
+        Args:
+            chunk_size: Records per chunk
+            columns: Column names to include (defaults to all)
+
+        Yields:
+            Tuple of (row number of the chunk's first record, {column name: values})
+        """
+        names = columns or self.header
+        width = len(self.header)
+        first_row = 1
+        chunk: List[List[str]] = []
+
+        for row in self.rows():
+            # Pad short rows so the transpose keeps every column aligned
+            if len(row) < width:
+                row = row + [''] * (width - len(row))
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield first_row, self._transpose(chunk, names)
+                first_row += len(chunk)
+                chunk = []
+
+        if chunk:
+            yield first_row, self._transpose(chunk, names)
+
+    def _transpose(self, chunk: List[List[str]], names: List[str]) -> Dict[str, Tuple[str, ...]]:
+        """Turn a list of rows into a {column name: values} mapping"""
+        transposed = list(zip(*chunk))
+        return {name: transposed[self.columns[name]] for name in names if name in self.columns}
+
+    def _quote_patterns(self) -> Tuple['re.Pattern', 're.Pattern']:
+        """
+        Bytes regexes that follow quoting the way the csv module reads it
+
+        A quote only opens a quoted field at the start of a field (after a
+        delimiter or line break); inside it, "" is an escaped quote and the
+        next lone quote closes it. Any other quote (5,Rør 12" stål,x) is a
+        literal character. Both patterns are written as unrolled loops, so
+        they run in linear time.
+
+        Returns:
+            (skip, record_end): skip consumes text outside and through
+            complete quoted fields, stopping before a quoted field it cannot
+            close; record_end consumes through the next newline outside quotes.
+        """
+        delimiter = re.escape(self.dialect.delimiter.encode(self.encoding))
+        quote = re.escape(self.dialect.quotechar.encode(self.encoding))
+        field_start = b'[' + delimiter + b'\r\n]'
+        quoted = b'(?<=' + field_start + b')' + quote + b'[^' + quote + b']*(?:' + quote * 2 + b'[^' + quote + b']*)*' + quote
+        literal = b'(?<!' + field_start + b')' + quote
+        token = b'(?:' + quoted + b'|' + literal + b')'
+        skip = re.compile(b'[^' + quote + b']*(?:' + token + b'[^' + quote + b']*)*')
+        record_end = re.compile(b'[^' + quote + b'\n]*(?:' + token + b'[^' + quote + b'\n]*)*\n')
+        return skip, record_end
+
+    def split_ranges(self, chunk_bytes: int) -> List[Tuple[int, int]]:
+        """
+        Split the data records into byte ranges that start and end on record boundaries
+
+        The file is scanned with _quote_patterns(), so a newline inside a
+        quoted multi-line field never ends a range and a stray quote in an
+        unquoted field does not flip the quoted state for the rest of the file.
+
+        Args:
+            chunk_bytes: Target size of each range
+
+        Returns:
+            List of (start, end) byte offsets covering all data records
+        """
+        if codecs.lookup(self.encoding).name not in {codecs.lookup(e).name for e in ASCII_COMPATIBLE_ENCODINGS}:
+            raise ValueError(f"Byte-range splitting is not supported for {self.encoding} files")
+
+        skip, record_end = self._quote_patterns()
+        boundaries = [self.data_offset]
+        position = self.data_offset
+
+        while boundaries[-1] + chunk_bytes < self.size:
+            target = max(position, boundaries[-1] + chunk_bytes)
+            # Outside quotes up to target (or just before a quoted field crossing it)
+            position = skip.match(self.data, position, target).end()
+            match = record_end.match(self.data, position)
+            # No match: last record without a trailing newline, or an unterminated quote
+            position = match.end() if match else self.size
+
+            if position >= self.size:
+                break
+            boundaries.append(position)
+
+        boundaries.append(self.size)
+        return list(zip(boundaries, boundaries[1:]))
+
+    def count_rows(self) -> int:
+        """Count data records (quoted newlines are handled by the csv parser)"""
+        return sum(1 for _ in self.rows())
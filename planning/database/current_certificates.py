@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Latest Certificate per Building and per Address
+Resolves the current certificate for every building_number and every
+address + postal code in one streaming pass over the migrated records, keeping
+only the best candidate per key in a hash map, and publishes the result to
+current_certificates (11_current_certificates.sql).
+
+Landing page lookups then become a primary-key point read instead of sorting
+a building's certificate history by issue_date. energy_certificates keeps
+the full history.
+
+"Latest" means the greatest issue_date, compared as a date whether it came
+as ISO or Norwegian dd.mm.yyyy; certificates with a missing or unparseable
+date lose to any dated one, and ties go to the greater certificate_id so
+reruns pick the same row.
+
+Each publish tags its rows with a fresh run id and prunes rows from other
+runs, so pruning does not depend on the client clock.
+
+Usage:
+    resolver = CurrentCertificateResolver()
+    for batch in batches:
+        resolver.add_batch(batch)
+    publish_current_certificates(supabase, resolver)
+"""
+
+import re
+import uuid
+from datetime import date, datetime, timezone
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'current_certificates'
+
+# Copied from the winning energy_certificates record
+CARRIED_FIELDS = [
+    'certificate_id', 'issue_date', 'energy_class', 'heating_class', 'energy_consumption',
+    'fossil_percentage', 'building_category', 'construction_year', 'address', 'postal_code',
+    'city', 'building_number', 'knr', 'gnr', 'bnr',
+]
+
+# Postgres \s in REGEXP_REPLACE
+_WHITESPACE = re.compile(r'[ \t\n\r\f\v]+')
+
+# Tried after ISO 8601
+NORWEGIAN_DATE_FORMATS = ['%d.%m.%Y', '%d.%m.%Y %H:%M', '%d.%m.%Y %H:%M:%S']
+
+
+def address_key(address: Optional[str], postal_code: Optional[str]) -> str:
+    """Lookup key for an address, equal to current_certificate_address_key()"""
+    return f"{postal_code or ''}|{_WHITESPACE.sub(' ', address or '').strip(' ').upper()}"
+
+
+def parse_issue_date(value: Any) -> Optional[datetime]:
+    """
+    Parse an issue_date (ISO 8601 or dd.mm.yyyy) to a naive UTC datetime
+
+    Returns:
+        The datetime, or None if the value is missing or not a date
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, date):
+        parsed = datetime(value.year, value.month, value.day)
+    elif isinstance(value, str) and value.strip():
+        text = value.strip()
+        try:
+            parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            for date_format in NORWEGIAN_DATE_FORMATS:
+                try:
+                    parsed = datetime.strptime(text, date_format)
+                    break
+                except ValueError:
+                    continue
+            else:
+                return None
+    else:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class CurrentCertificateResolver:
+    """Streaming latest-certificate selection keyed by building and by address"""
+
+    def __init__(self):
+        # key -> [rank, record subset, certificate_count]
+        self.by_building: Dict[str, list] = {}
+        self.by_address: Dict[str, list] = {}
+        self.records_seen = 0
+
+    @staticmethod
+    def _rank(record: Dict[str, Any]) -> Tuple[bool, datetime, str]:
+        issue_date = parse_issue_date(record.get('issue_date'))
+        return issue_date is not None, issue_date or datetime.min, record.get('certificate_id') or ''
+
+    @staticmethod
+    def _carried(rank: Tuple, record: Dict[str, Any]) -> Dict[str, Any]:
+        carried = {name: record.get(name) for name in CARRIED_FIELDS}
+        # The parsed date, so the TIMESTAMP column never gets an ambiguous or invalid string
+        carried['issue_date'] = rank[1].isoformat() if rank[0] else None
+        return carried
+
+    @classmethod
+    def _offer(cls, entries: Dict[str, list], key: str, rank: Tuple, record: Dict[str, Any]):
+        entry = entries.get(key)
+        if entry is None:
+            entries[key] = [rank, cls._carried(rank, record), 1]
+            return
+        entry[2] += 1
+        if rank > entry[0]:
+            entry[0] = rank
+            entry[1] = cls._carried(rank, record)
+
+    def add(self, record: Dict[str, Any]):
+        """Consider one transformed energy_certificates record"""
+        if not record.get('certificate_id'):
+            return
+        self.records_seen += 1
+        rank = self._rank(record)
+        if record.get('building_number'):
+            self._offer(self.by_building, record['building_number'], rank, record)
+        if record.get('address') and record.get('postal_code'):
+            self._offer(self.by_address, address_key(record['address'], record['postal_code']), rank, record)
+
+    def add_batch(self, records: Iterable[Dict[str, Any]]):
+        for record in records:
+            self.add(record)
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """current_certificates rows for every resolved key"""
+        for lookup_type, entries in (('building', self.by_building), ('address', self.by_address)):
+            for key, (_, record, count) in entries.items():
+                yield dict(record, lookup_type=lookup_type, lookup_key=key, certificate_count=count)
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            'records_seen': self.records_seen,
+            'buildings': len(self.by_building),
+            'addresses': len(self.by_address),
+            'buildings_with_history': sum(1 for entry in self.by_building.values() if entry[2] > 1),
+            'addresses_with_history': sum(1 for entry in self.by_address.values() if entry[2] > 1),
+        }
+
+
+def publish_current_certificates(supabase, resolver: CurrentCertificateResolver,
+                                 batch_size: int = 1000, prune: bool = True) -> Dict[str, int]:
+    """
+    Upsert the resolved rows into current_certificates
+
+    Args:
+        supabase: Supabase client with service role access
+        resolver: Resolver that has seen the records
+        batch_size: Rows per upsert request
+        prune: Delete rows not written by this run (only safe when the
+            resolver saw the complete source)
+
+    Returns:
+        Dictionary with rows published and pruned
+    """
+    # refreshed_at is set by the database; the run id decides what is stale
+    run_id = uuid.uuid4().hex
+    published = 0
+    batch: List[Dict[str, Any]] = []
+
+    def flush():
+        nonlocal published, batch
+        supabase.table(TABLE).upsert(batch, on_conflict='lookup_type,lookup_key').execute()
+        published += len(batch)
+        batch = []
+
+    for row in resolver.rows():
+        row['run_id'] = run_id
+        batch.append({name: value for name, value in row.items() if value is not None and value != ''})
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    pruned = 0
+    if prune and not published:
+        logger.warning("No current certificates resolved, keeping existing rows")
+    elif prune:
+        result = supabase.table(TABLE).delete(count='exact').or_(f'run_id.is.null,run_id.neq.{run_id}').execute()
+        pruned = result.count or 0
+
+    logger.info(f"Published {published} current certificates ({pruned} stale rows removed)")
+    return {'published': published, 'pruned': pruned}
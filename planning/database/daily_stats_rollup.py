@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Daily Search Statistics Rollup Job
+Incrementally maintains daily_search_stats from user_searches, replacing the
+full REFRESH of mv_daily_stats (see 09_daily_stats_rollup.sql)
+
+Each run only looks at searches ingested since the last watermark and
+recomputes the days those searches fall on, so late-arriving rows for old
+days are corrected without rescanning the whole 90-day window.
+
+Usage:
+    python daily_stats_rollup.py --database-url postgresql://...
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+import logging
+from pathlib import Path
+
+# Try to import required packages
+try:
+    import psycopg2
+except ImportError:
+    print("Please install psycopg2: pip install psycopg2-binary")
+    sys.exit(1)
+
+try:
+    from dotenv import load_dotenv
+    # Load .env file from same directory
+    load_dotenv(Path(__file__).parent / '.env')
+except ImportError:
+    print("Please install python-dotenv: pip install python-dotenv")
+    sys.exit(1)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+JOB_NAME = 'daily_search_stats'
+RETENTION_DAYS = 90
+OVERLAP_MINUTES = 5
+
+
+class DailyStatsRollup:
+    """Keeps daily_search_stats up to date from newly ingested user_searches"""
+
+    def __init__(self, database_url: str, job_name: str = JOB_NAME,
+                 overlap_minutes: int = OVERLAP_MINUTES, retention_days: int = RETENTION_DAYS):
+        """
+        Initialize rollup job with a direct Postgres connection
+
+        Args:
+            database_url: Postgres connection string (Supabase "direct connection")
+            job_name: Key of this job's row in rollup_watermarks
+            overlap_minutes: How far behind the watermark to rescan, to catch
+                transactions that committed after a previous run had started
+            retention_days: Size of the rolling window kept in the rollup table
+        """
+        self.conn = psycopg2.connect(database_url)
+        self.job_name = job_name
+        self.overlap_minutes = overlap_minutes
+        self.retention_days = retention_days
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+    def _lock_watermark(self, cursor) -> Optional[datetime]:
+        """
+        Fetch and row-lock this job's watermark, creating it if missing
+
+        The row lock serializes concurrent runs of the same job.
+        """
+        cursor.execute(
+            "INSERT INTO rollup_watermarks (job_name, watermark) VALUES (%s, NULL) "
+            "ON CONFLICT (job_name) DO NOTHING",
+            (self.job_name,)
+        )
+        cursor.execute(
+            "SELECT watermark FROM rollup_watermarks WHERE job_name = %s FOR UPDATE",
+            (self.job_name,)
+        )
+        return cursor.fetchone()[0]
+
+    def _find_affected_days(self, cursor, low: Optional[datetime],
+                            high: datetime) -> tuple[List[Any], int]:
+        """
+        Find the event days touched by rows ingested in (low, high]
+
+        Returns:
+            Tuple of (sorted list of dates, number of new rows seen)
+        """
+        if low is None:
+            # First run: backfill the whole retention window
+            cursor.execute(
+                """
+                SELECT DATE(timestamp) AS day, COUNT(*)
+                FROM user_searches
+                WHERE DATE(timestamp) >= daily_stats_window_start(%s)
+                    AND ingested_at <= %s
+                GROUP BY 1
+                """,
+                (self.retention_days, high)
+            )
+        else:
+            cursor.execute(
+                """
+                SELECT DATE(timestamp) AS day, COUNT(*)
+                FROM user_searches
+                WHERE ingested_at > %s - make_interval(mins => %s)
+                    AND ingested_at <= %s
+                    AND DATE(timestamp) >= daily_stats_window_start(%s)
+                GROUP BY 1
+                """,
+                (low, self.overlap_minutes, high, self.retention_days)
+            )
+        rows = cursor.fetchall()
+        return sorted(day for day, _ in rows), sum(count for _, count in rows)
+
+    def _recompute_days(self, cursor, days: List[Any]):
+        """Recompute the rollup rows for the given days from user_searches"""
+        if not days:
+            return
+        # DATE(timestamp) = ANY(...) is served by idx_user_searches_daily
+        cursor.execute(
+            """
+            INSERT INTO daily_search_stats
+                (date, unique_sessions, total_searches, unique_postal_codes, updated_at)
+            SELECT
+                DATE(timestamp) AS date,
+                COUNT(DISTINCT session_id) AS unique_sessions,
+                COUNT(*) AS total_searches,
+                COUNT(DISTINCT postal_code) AS unique_postal_codes,
+                NOW()
+            FROM user_searches
+            WHERE DATE(timestamp) = ANY(%s)
+            GROUP BY DATE(timestamp)
+            ON CONFLICT (date) DO UPDATE SET
+                unique_sessions = EXCLUDED.unique_sessions,
+                total_searches = EXCLUDED.total_searches,
+                unique_postal_codes = EXCLUDED.unique_postal_codes,
+                updated_at = EXCLUDED.updated_at
+            """,
+            (days,)
+        )
+
+    def _prune_expired(self, cursor) -> int:
+        """Drop rollup rows that have fallen out of the retention window"""
+        cursor.execute(
+            "DELETE FROM daily_search_stats "
+            "WHERE date < daily_stats_window_start(%s)",
+            (self.retention_days,)
+        )
+        return cursor.rowcount
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run one incremental rollup pass in a single transaction
+
+        Returns:
+            Dictionary with run statistics
+        """
+        started = time.perf_counter()
+
+        try:
+            with self.conn.cursor() as cursor:
+                low = self._lock_watermark(cursor)
+                cursor.execute("SELECT clock_timestamp()::TIMESTAMP")
+                high = cursor.fetchone()[0]
+
+                days, new_rows = self._find_affected_days(cursor, low, high)
+                self._recompute_days(cursor, days)
+                pruned = self._prune_expired(cursor)
+
+                cursor.execute(
+                    """
+                    UPDATE rollup_watermarks
+                    SET watermark = %s,
+                        rows_processed = rows_processed + %s,
+                        days_recomputed = %s,
+                        updated_at = NOW()
+                    WHERE job_name = %s
+                    """,
+                    (high, new_rows, len(days), self.job_name)
+                )
+            self.conn.commit()
+
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        summary = {
+            'previous_watermark': low.isoformat() if low else None,
+            'watermark': high.isoformat(),
+            'new_rows': new_rows,
+            'days_recomputed': len(days),
+            'rows_pruned': pruned,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+        logger.info(
+            f"Rollup complete: {new_rows} new rows, {len(days)} days recomputed, "
+            f"{pruned} expired days pruned in {summary['elapsed_ms']} ms"
+        )
+        return summary
+
+    def reset(self):
+        """Forget the watermark so the next run rebuilds the whole window"""
+        with self.conn.cursor() as cursor:
+            cursor.execute("DELETE FROM rollup_watermarks WHERE job_name = %s", (self.job_name,))
+            cursor.execute("TRUNCATE daily_search_stats")
+        self.conn.commit()
+        logger.info(f"Reset rollup job '{self.job_name}'")
+
+
+def main():
+    """Main rollup function"""
+    parser = argparse.ArgumentParser(description='Incrementally roll up daily search statistics')
+    parser.add_argument('--database-url', help='Postgres connection string (or set DATABASE_URL env var)')
+    parser.add_argument('--overlap-minutes', type=int, default=OVERLAP_MINUTES,
+                       help='Rescan margin behind the watermark for late commits')
+    parser.add_argument('--retention-days', type=int, default=RETENTION_DAYS,
+                       help='Days kept in daily_search_stats')
+    parser.add_argument('--reset', action='store_true',
+                       help='Drop the watermark and rebuild the whole window')
+
+    args = parser.parse_args()
+
+    database_url = args.database_url or os.getenv('DATABASE_URL')
+
+    if not database_url:
+        print("Error: Database URL required. Set DATABASE_URL env var or use --database-url")
+        sys.exit(1)
+
+    try:
+        rollup = DailyStatsRollup(
+            database_url=database_url,
+            overlap_minutes=args.overlap_minutes,
+            retention_days=args.retention_days
+        )
+
+        if args.reset:
+            rollup.reset()
+
+        summary = rollup.run()
+        for key, value in summary.items():
+            logger.info(f"  {key}: {value}")
+
+        rollup.close()
+
+    except Exception as e:
+        logger.error(f"Rollup failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Local Postgres Harness for the Daily Stats Rollup
+Runs daily_stats_rollup.py against a throwaway schema on a local Postgres and
+checks the incremental result against a full recompute (the mv_daily_stats query)
+
+Usage:
+    createdb rollup_harness
+    python daily_stats_rollup_harness.py --database-url postgresql://localhost/rollup_harness
+"""
+
+import os
+import sys
+import random
+import argparse
+from datetime import datetime, timedelta
+from typing import List
+import logging
+from pathlib import Path
+
+from daily_stats_rollup import DailyStatsRollup, OVERLAP_MINUTES, psycopg2
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SCHEMA = 'rollup_harness'
+
+# Minimal copy of user_searches from setup_all.sql (gen_random_uuid is core since PG13)
+BASE_SCHEMA_SQL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+SET search_path TO {SCHEMA};
+
+CREATE TABLE user_searches (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    search_query TEXT NOT NULL,
+    selected_address TEXT,
+    postal_code TEXT,
+    results_count INTEGER,
+    search_source TEXT DEFAULT 'kartverket',
+    timestamp TIMESTAMP DEFAULT NOW(),
+    user_agent TEXT,
+    ip_hash TEXT
+);
+
+CREATE INDEX idx_user_searches_daily ON user_searches(DATE(timestamp));
+"""
+
+FULL_RECOMPUTE_SQL = """
+SELECT
+    DATE(timestamp) AS date,
+    COUNT(DISTINCT session_id) AS unique_sessions,
+    COUNT(*) AS total_searches,
+    COUNT(DISTINCT postal_code) AS unique_postal_codes
+FROM user_searches
+WHERE DATE(timestamp) >= daily_stats_window_start(90)
+GROUP BY DATE(timestamp)
+ORDER BY 1
+"""
+
+
+class RollupHarness:
+    """Drives DailyStatsRollup through backfill, incremental, late-row and late-commit scenarios"""
+
+    def __init__(self, database_url: str, seed: int = 42):
+        self.database_url = f"{database_url}{'&' if '?' in database_url else '?'}options=-csearch_path%3D{SCHEMA}"
+        self.admin = psycopg2.connect(database_url)
+        self.rng = random.Random(seed)
+        self.failures: List[str] = []
+
+    def setup(self):
+        """Create the scratch schema and apply 09_daily_stats_rollup.sql"""
+        rollup_sql = (Path(__file__).parent / '09_daily_stats_rollup.sql').read_text(encoding='utf-8')
+        with self.admin.cursor() as cursor:
+            cursor.execute(BASE_SCHEMA_SQL)
+            cursor.execute(rollup_sql)
+        self.admin.commit()
+
+    def teardown(self):
+        with self.admin.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        self.admin.commit()
+        self.admin.close()
+
+    def insert_searches(self, count: int, days_back_min: int, days_back_max: int,
+                        ingested_minutes_ago: int = 0, conn=None):
+        """
+        Insert synthetic searches with event times spread over a day range
+
+        Args:
+            ingested_minutes_ago: Backdate ingested_at, as for history loaded
+                before the job was first run
+            conn: Insert on this connection without committing (late commits)
+        """
+        now = datetime.now()
+        rows = []
+        for _ in range(count):
+            offset = timedelta(days=self.rng.uniform(days_back_min, days_back_max))
+            rows.append((
+                f"session_{self.rng.randint(1, count // 3 + 1)}",
+                'Testveien 1',
+                f"{self.rng.randint(1, 50) * 100:04d}",
+                now - offset,
+                ingested_minutes_ago,
+            ))
+        with (conn or self.admin).cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SCHEMA}.user_searches (session_id, search_query, postal_code, timestamp, ingested_at) "
+                "VALUES (%s, %s, %s, %s, clock_timestamp() - make_interval(mins => %s))",
+                rows
+            )
+        if conn is None:
+            self.admin.commit()
+
+    def compare(self, label: str):
+        """Compare the rollup table with a full recompute"""
+        with self.admin.cursor() as cursor:
+            cursor.execute(f"SET search_path TO {SCHEMA}")
+            cursor.execute(FULL_RECOMPUTE_SQL)
+            expected = cursor.fetchall()
+            cursor.execute(
+                "SELECT date, unique_sessions, total_searches, unique_postal_codes "
+                "FROM daily_search_stats ORDER BY date"
+            )
+            actual = cursor.fetchall()
+        self.admin.rollback()
+
+        if expected == actual:
+            logger.info(f"PASS {label}: {len(actual)} days match full recompute")
+        else:
+            missing = set(expected) - set(actual)
+            extra = set(actual) - set(expected)
+            self.failures.append(label)
+            logger.error(f"FAIL {label}: {len(missing)} missing/wrong, {len(extra)} unexpected rows")
+
+    def expect(self, label: str, condition: bool, detail: str):
+        if condition:
+            logger.info(f"PASS {label}: {detail}")
+        else:
+            self.failures.append(label)
+            logger.error(f"FAIL {label}: {detail}")
+
+    def run(self, rows: int) -> bool:
+        """Run all scenarios, returning True if every check passed"""
+        self.setup()
+        rollup = DailyStatsRollup(self.database_url, overlap_minutes=OVERLAP_MINUTES)
+        late = psycopg2.connect(self.database_url)
+
+        try:
+            # 1. Initial backfill over history ingested before the job existed;
+            # the window edges (day 89 and 90 back) straddle the cutoff
+            self.insert_searches(rows, 0, 91, ingested_minutes_ago=OVERLAP_MINUTES * 4)
+            summary = rollup.run()
+            self.compare('backfill')
+
+            # 2. Idle run touches nothing
+            summary = rollup.run()
+            self.expect('idle', summary['days_recomputed'] == 0,
+                        f"{summary['days_recomputed']} days recomputed")
+
+            # 3. Fresh traffic only recomputes recent days
+            self.insert_searches(rows // 10, 0, 1)
+            summary = rollup.run()
+            self.expect('incremental', summary['days_recomputed'] <= 2,
+                        f"{summary['new_rows']} new rows, {summary['days_recomputed']} days recomputed")
+            self.compare('incremental')
+
+            # 4. Late-arriving rows for old days are corrected (the overlap
+            # also rescans step 3's rows, which are still inside it)
+            self.insert_searches(20, 30, 60)
+            summary = rollup.run()
+            self.expect('late_rows', summary['new_rows'] == 20 + rows // 10,
+                        f"{summary['new_rows']} rescanned rows over {summary['days_recomputed']} days")
+            self.compare('late_rows')
+
+            # 5. A transaction that inserts before a run and commits after it:
+            # its ingested_at is older than that run's watermark
+            self.insert_searches(15, 40, 50, conn=late)
+            rollup.run()
+            late.commit()
+            rollup.run()
+            self.compare('late_commit')
+
+        finally:
+            late.close()
+            rollup.close()
+            self.teardown()
+
+        return not self.failures
+
+
+def main():
+    """Main harness function"""
+    parser = argparse.ArgumentParser(description='Check the daily stats rollup against a local Postgres')
+    parser.add_argument('--database-url', help='Local Postgres connection string (or set HARNESS_DATABASE_URL env var)')
+    parser.add_argument('--rows', type=int, default=5000, help='Synthetic searches for the backfill')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for synthetic data')
+
+    args = parser.parse_args()
+
+    database_url = args.database_url or os.getenv('HARNESS_DATABASE_URL')
+    if not database_url:
+        print("Error: Database URL required. Set HARNESS_DATABASE_URL env var or use --database-url")
+        sys.exit(1)
+
+    harness = RollupHarness(database_url, seed=args.seed)
+    if harness.run(args.rows):
+        logger.info("All rollup checks passed")
+    else:
+        logger.error(f"Rollup checks failed: {', '.join(harness.failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
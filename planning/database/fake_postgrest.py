@@ -0,0 +1,597 @@
+#!/usr/bin/env python3
+"""
+Local PostgREST Stand-in for Load Testing the Importers
+Serves the subset of the PostgREST API that migration_script.py and
+nve_pricing_import.py use, backed by SQLite:
+
+    POST /rest/v1/<table>                        insert (single row or batch)
+    POST /rest/v1/<table>?on_conflict=a,b        upsert (Prefer: resolution=...)
+    GET|HEAD /rest/v1/<table>?select=...         select with eq/gte/lte/... filters,
+                                                 order, limit/Range and count=exact
+
+for energy_certificates and electricity_prices_nve, with the same unique,
+NOT NULL and CHECK constraints and PostgREST-style error responses.
+
+Faults are injected per request, drawn from a seeded RNG in arrival order:
+
+    latency_ms / jitter_ms / per_row_latency_ms   simulated network and write time
+    error_rate        error_status (default 503) returned before anything is written
+    lost_response_rate  the write is applied but the client gets a 504
+    rate_limit/burst  token bucket; excess requests get 429 with Retry-After
+    max_payload_bytes larger request bodies get 413
+
+Use it in-process through FakePostgRESTTransport (see fake_postgrest_harness.py)
+or over HTTP:
+
+    python fake_postgrest.py --port 54321 --latency-ms 40 --error-rate 0.02
+    python migration_script.py --supabase-url http://127.0.0.1:54321 --supabase-key fake ...
+"""
+
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl
+import logging
+
+# Try to import required packages
+try:
+    import httpx
+except ImportError:
+    print("Please install httpx: pip install httpx")
+    sys.exit(1)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+REST_PREFIX = '/rest/v1/'
+
+# SQLite versions of the tables in setup_all.sql and 07_nve_electricity_pricing.sql
+TABLES: Dict[str, Dict[str, Any]] = {
+    'energy_certificates': {
+        'columns': {
+            'id': "TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16))))",
+            'knr': 'INTEGER',
+            'gnr': 'INTEGER',
+            'bnr': 'INTEGER',
+            'snr': 'INTEGER',
+            'fnr': 'INTEGER',
+            'andelsnummer': 'TEXT',
+            'building_number': 'TEXT',
+            'address': 'TEXT NOT NULL',
+            'postal_code': 'TEXT NOT NULL',
+            'city': 'TEXT NOT NULL',
+            'unit_number': 'TEXT',
+            'organization_number': 'TEXT',
+            'building_category': 'TEXT',
+            'construction_year': 'INTEGER',
+            'energy_class': 'TEXT',
+            'heating_class': 'TEXT',
+            'issue_date': 'TEXT',
+            'certificate_type': 'TEXT',
+            'certificate_id': 'TEXT UNIQUE',
+            'energy_consumption': 'REAL',
+            'fossil_percentage': 'REAL',
+            'material_type': 'TEXT',
+            'has_energy_evaluation': 'BOOLEAN',
+            'energy_evaluation_date': 'TEXT',
+            'created_at': 'TEXT DEFAULT CURRENT_TIMESTAMP',
+            'updated_at': 'TEXT DEFAULT CURRENT_TIMESTAMP',
+        },
+        'constraints': [],
+    },
+    'electricity_prices_nve': {
+        'columns': {
+            'id': "TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16))))",
+            'week': 'TEXT NOT NULL',
+            'year': 'INTEGER NOT NULL',
+            'week_number': 'INTEGER NOT NULL',
+            'zone': "TEXT NOT NULL CHECK (zone IN ('NO1', 'NO2', 'NO3', 'NO4', 'NO5'))",
+            'spot_price_ore_kwh': 'REAL NOT NULL',
+            'spot_price_kr_kwh': 'REAL GENERATED ALWAYS AS (spot_price_ore_kwh / 100) STORED',
+            'data_source': "TEXT DEFAULT 'NVE'",
+            'source_url': 'TEXT',
+            'created_at': 'TEXT DEFAULT CURRENT_TIMESTAMP',
+            'updated_at': 'TEXT DEFAULT CURRENT_TIMESTAMP',
+        },
+        'constraints': ['UNIQUE (week, zone)'],
+    },
+}
+
+# Query parameters that are not column filters
+RESERVED_PARAMS = {'select', 'order', 'limit', 'offset', 'columns', 'on_conflict'}
+
+FILTER_OPERATORS = {
+    'eq': '=', 'neq': '<>', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<=',
+    'like': 'LIKE', 'ilike': 'LIKE',
+}
+
+# (status, headers, body)
+Response = Tuple[int, Dict[str, str], bytes]
+
+
+class PostgRESTError(Exception):
+    """An error response in PostgREST's JSON shape"""
+
+    def __init__(self, status: int, code: str, message: str, details: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+        self.details = details
+
+    def response(self) -> Response:
+        body = {'code': self.code, 'details': self.details, 'hint': None, 'message': self.message}
+        return self.status, {'Content-Type': 'application/json'}, json.dumps(body).encode('utf-8')
+
+
+def integrity_error(error: sqlite3.IntegrityError, table: str) -> PostgRESTError:
+    """Map a SQLite constraint failure to the status and SQLSTATE Postgres would give"""
+    message = str(error)
+    if message.startswith('UNIQUE'):
+        return PostgRESTError(409, '23505', f'duplicate key value violates unique constraint on "{table}"', message)
+    if message.startswith('NOT NULL'):
+        column = message.rsplit('.', 1)[-1]
+        return PostgRESTError(400, '23502', f'null value in column "{column}" of relation "{table}" '
+                                            'violates not-null constraint', message)
+    if message.startswith('CHECK'):
+        return PostgRESTError(400, '23514', f'new row for relation "{table}" violates check constraint', message)
+    return PostgRESTError(400, '23000', message)
+
+
+class FakePostgREST:
+    """SQLite-backed PostgREST subset with latency, error, throttling and payload faults"""
+
+    def __init__(self, database: str = ':memory:',
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, per_row_latency_ms: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503, lost_response_rate: float = 0.0,
+                 rate_limit: Optional[float] = None, burst: Optional[float] = None,
+                 max_payload_bytes: Optional[int] = None, max_rows: int = 1000, seed: int = 0):
+        """
+        Args:
+            database: SQLite path (':memory:' for a throwaway store)
+            latency_ms: Fixed delay added to every request
+            jitter_ms: Extra uniform random delay, 0..jitter_ms
+            per_row_latency_ms: Delay per row written or read
+            error_rate: Fraction of requests rejected with error_status before any write
+            error_status: Status for injected errors (503 by default)
+            lost_response_rate: Fraction of writes that are applied but answered with 504
+            rate_limit: Requests per second before 429s (None = unlimited)
+            burst: Token bucket capacity (defaults to one second of requests)
+            max_payload_bytes: Larger request bodies get 413 (None = unlimited)
+            max_rows: Cap on rows returned by a select, like PostgREST's db-max-rows
+            seed: Seed for fault and jitter draws
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.per_row_latency_ms = per_row_latency_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.lost_response_rate = lost_response_rate
+        self.rate_limit = rate_limit
+        self.burst = burst or max(rate_limit or 0, 1.0)
+        self.max_payload_bytes = max_payload_bytes
+        self.max_rows = max_rows
+
+        self.rng = random.Random(seed)
+        self.tokens = self.burst
+        self.tokens_updated = time.monotonic()
+        self.fault_lock = threading.Lock()
+
+        self.conn = sqlite3.connect(database, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.db_lock = threading.Lock()
+        for table, spec in TABLES.items():
+            definitions = [f"{name} {declaration}" for name, declaration in spec['columns'].items()]
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(definitions + spec['constraints'])})")
+
+        self.stats: Counter = Counter()
+        self.status_counts: Counter = Counter()
+        self.stats_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Fault injection
+    # ------------------------------------------------------------------
+
+    def _draw_faults(self, body_size: int) -> Tuple[Optional[str], float, float]:
+        """
+        Decide this request's fault and delay
+
+        Every draw happens for every request, in arrival order, so a given seed
+        gives the same fault sequence whatever the request mix.
+
+        Returns:
+            Tuple of (fault or None, jitter seconds, Retry-After seconds)
+        """
+        with self.fault_lock:
+            error_roll = self.rng.random()
+            lost_roll = self.rng.random()
+            jitter = self.rng.uniform(0, self.jitter_ms) / 1000
+
+            if self.max_payload_bytes is not None and body_size > self.max_payload_bytes:
+                return 'payload_rejected', jitter, 0.0
+
+            if self.rate_limit:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.tokens_updated) * self.rate_limit)
+                self.tokens_updated = now
+                if self.tokens < 1:
+                    return 'throttled', jitter, (1 - self.tokens) / self.rate_limit
+                self.tokens -= 1
+
+            if error_roll < self.error_rate:
+                return 'injected_error', jitter, 0.0
+            if lost_roll < self.lost_response_rate:
+                return 'lost_response', jitter, 0.0
+            return None, jitter, 0.0
+
+    def _sleep(self, jitter: float, rows: int = 0):
+        delay = self.latency_ms / 1000 + jitter + rows * self.per_row_latency_ms / 1000
+        if delay > 0:
+            time.sleep(delay)
+
+    # ------------------------------------------------------------------
+    # Request handling
+    # ------------------------------------------------------------------
+
+    def handle(self, method: str, path: str, params: List[Tuple[str, str]],
+               headers: Any, body: bytes) -> Response:
+        """
+        Serve one request
+
+        Args:
+            method: HTTP method
+            path: URL path, e.g. /rest/v1/energy_certificates
+            params: Query parameters in order (filters may repeat a column)
+            headers: Case-insensitive mapping with .get()
+            body: Raw request body
+
+        Returns:
+            Tuple of (status, headers, body)
+        """
+        with self.stats_lock:
+            self.stats['requests'] += 1
+            self.stats['bytes_received'] += len(body)
+
+        fault, jitter, retry_after = self._draw_faults(len(body))
+        response = self._respond(method, path, params, headers, body, fault, jitter, retry_after)
+
+        with self.stats_lock:
+            self.status_counts[response[0]] += 1
+            if fault:
+                self.stats[fault] += 1
+        return response
+
+    def _respond(self, method: str, path: str, params: List[Tuple[str, str]], headers: Any,
+                 body: bytes, fault: Optional[str], jitter: float, retry_after: float) -> Response:
+        if fault == 'payload_rejected':
+            self._sleep(jitter)
+            return PostgRESTError(413, 'PGRST413', 'Payload Too Large',
+                                  f'{len(body)} bytes > {self.max_payload_bytes}').response()
+        if fault == 'throttled':
+            self._sleep(jitter)
+            status, response_headers, content = PostgRESTError(429, 'PGRST429', 'Too Many Requests').response()
+            # Fractional seconds keep throttled runs short; ResilientTransport parses floats
+            response_headers['Retry-After'] = f"{retry_after:.3f}"
+            return status, response_headers, content
+        if fault == 'injected_error':
+            self._sleep(jitter)
+            return PostgRESTError(self.error_status, 'PGRST000', 'Injected fault').response()
+
+        try:
+            if not path.startswith(REST_PREFIX):
+                raise PostgRESTError(404, 'PGRST000', f'Unknown path {path}')
+            table = path[len(REST_PREFIX):].strip('/')
+            if table not in TABLES:
+                raise PostgRESTError(404, 'PGRST205', f"Could not find the table 'public.{table}' in the schema cache")
+
+            prefer = {}
+            for item in (headers.get('prefer') or '').split(','):
+                key, _, value = item.strip().partition('=')
+                if key:
+                    prefer[key] = value
+
+            if method == 'POST':
+                rows, response = self._insert(table, params, prefer, body)
+            elif method in ('GET', 'HEAD'):
+                rows, response = self._select(table, params, prefer, headers.get('range'))
+                if method == 'HEAD':
+                    response = (response[0], response[1], b'')
+            else:
+                raise PostgRESTError(405, 'PGRST117', f'Unsupported HTTP method: {method}')
+        except PostgRESTError as e:
+            self._sleep(jitter)
+            return e.response()
+
+        self._sleep(jitter, rows)
+        if fault == 'lost_response' and method == 'POST':
+            return PostgRESTError(504, 'PGRST000', 'Gateway Timeout (write was applied)').response()
+        return response
+
+    @staticmethod
+    def _param_dict(params: List[Tuple[str, str]]) -> Dict[str, str]:
+        return {key: value for key, value in params if key in RESERVED_PARAMS}
+
+    @staticmethod
+    def _check_columns(table: str, names: List[str], code: str = 'PGRST204'):
+        columns = TABLES[table]['columns']
+        for name in names:
+            if name not in columns:
+                if code == 'PGRST204':
+                    raise PostgRESTError(400, code, f"Could not find the '{name}' column of '{table}' in the schema cache")
+                raise PostgRESTError(400, code, f'column {table}.{name} does not exist')
+
+    @staticmethod
+    def _to_sqlite(value: Any) -> Any:
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        return value
+
+    def _insert(self, table: str, params: List[Tuple[str, str]], prefer: Dict[str, str],
+                body: bytes) -> Tuple[int, Response]:
+        """Insert or upsert a JSON object or array"""
+        try:
+            payload = json.loads(body or b'null')
+        except ValueError as e:
+            raise PostgRESTError(400, 'PGRST102', f'Invalid JSON body: {e}')
+        rows = payload if isinstance(payload, list) else [payload]
+        if not rows or not all(isinstance(row, dict) for row in rows):
+            raise PostgRESTError(400, 'PGRST102', 'Body must be a JSON object or array of objects')
+
+        query = self._param_dict(params)
+        if 'columns' in query:
+            columns = [name.strip().strip('"') for name in query['columns'].split(',') if name.strip()]
+        else:
+            columns = sorted({key for row in rows for key in row})
+        self._check_columns(table, columns)
+
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        resolution = prefer.get('resolution')
+        if resolution:
+            conflict = [name.strip() for name in query.get('on_conflict', 'id').split(',')]
+            self._check_columns(table, conflict)
+            if resolution == 'ignore-duplicates':
+                sql += f" ON CONFLICT ({', '.join(conflict)}) DO NOTHING"
+            else:
+                updates = [name for name in columns if name not in conflict]
+                assignments = ', '.join(f"{name} = excluded.{name}" for name in updates)
+                sql += f" ON CONFLICT ({', '.join(conflict)}) " + (f"DO UPDATE SET {assignments}" if updates else "DO NOTHING")
+                # Postgres refuses to update the same row twice in one statement
+                keys = [tuple(row.get(name) for name in conflict) for row in rows]
+                if len(set(keys)) != len(keys):
+                    raise PostgRESTError(500, '21000', 'ON CONFLICT DO UPDATE command cannot affect row a second time')
+
+        values = [tuple(self._to_sqlite(row.get(name)) for name in columns) for row in rows]
+        with self.db_lock:
+            try:
+                self.conn.execute("BEGIN")
+                self.conn.executemany(sql, values)
+                self.conn.execute("COMMIT")
+            except sqlite3.IntegrityError as e:
+                self.conn.execute("ROLLBACK")
+                raise integrity_error(e, table)
+            except sqlite3.Error as e:
+                self.conn.execute("ROLLBACK")
+                raise PostgRESTError(400, 'PGRST100', str(e))
+
+        with self.stats_lock:
+            self.stats['rows_written'] += len(rows)
+
+        headers = {'Content-Range': '*/*'}
+        if prefer.get('return') == 'representation':
+            headers['Content-Type'] = 'application/json'
+            content = json.dumps([{name: row.get(name) for name in columns} for row in rows]).encode('utf-8')
+            return len(rows), (201, headers, content)
+        return len(rows), (201, headers, b'')
+
+    def _where(self, table: str, params: List[Tuple[str, str]]) -> Tuple[str, List[Any]]:
+        """Build a WHERE clause from column=op.value filters"""
+        clauses = []
+        values = []
+        for column, expression in params:
+            if column in RESERVED_PARAMS:
+                continue
+            self._check_columns(table, [column], code='42703')
+            negate = expression.startswith('not.')
+            if negate:
+                expression = expression[4:]
+            operator, _, value = expression.partition('.')
+
+            if operator == 'is':
+                literal = {'null': 'NULL', 'true': '1', 'false': '0'}.get(value.lower())
+                if literal is None:
+                    raise PostgRESTError(400, 'PGRST100', f'Invalid is value: {value}')
+                clause = f"{column} IS {literal}"
+            elif operator == 'in':
+                items = [item.strip().strip('"') for item in value.strip('()').split(',') if item.strip()]
+                clause = f"{column} IN ({', '.join('?' * len(items))})" if items else '0'
+                values.extend(items)
+            elif operator in FILTER_OPERATORS:
+                if operator in ('like', 'ilike'):
+                    value = value.replace('*', '%')
+                clause = f"{column} {FILTER_OPERATORS[operator]} ?"
+                values.append(value)
+            else:
+                raise PostgRESTError(400, 'PGRST100', f'Unsupported filter operator: {operator}')
+            clauses.append(f"NOT ({clause})" if negate else clause)
+
+        return (f" WHERE {' AND '.join(clauses)}" if clauses else ''), values
+
+    def _select(self, table: str, params: List[Tuple[str, str]], prefer: Dict[str, str],
+                range_header: Optional[str]) -> Tuple[int, Response]:
+        """Select rows, a count aggregate, and/or an exact count"""
+        query = self._param_dict(params)
+        select = [name.strip() for name in query.get('select', '*').split(',') if name.strip()]
+        where, values = self._where(table, params)
+
+        offset = int(query.get('offset', 0))
+        limit = int(query['limit']) if 'limit' in query else None
+        if range_header and '-' in range_header:
+            first, _, last = range_header.partition('-')
+            offset = int(first)
+            if last:
+                limit = int(last) - offset + 1
+        limit = min(limit if limit is not None else self.max_rows, self.max_rows)
+
+        with self.db_lock:
+            total = None
+            if prefer.get('count') == 'exact' or select == ['count']:
+                total = self.conn.execute(f"SELECT COUNT(*) FROM {table}{where}", values).fetchone()[0]
+
+            if select == ['count']:
+                data = [{'count': total}]
+            else:
+                columns = list(TABLES[table]['columns']) if select == ['*'] else select
+                self._check_columns(table, columns, code='42703')
+
+                order_by = []
+                for term in filter(None, query.get('order', '').split(',')):
+                    parts = term.split('.')
+                    self._check_columns(table, [parts[0]], code='42703')
+                    direction = 'DESC' if 'desc' in parts[1:] else 'ASC'
+                    nulls = ' NULLS FIRST' if 'nullsfirst' in parts[1:] else ' NULLS LAST' if 'nullslast' in parts[1:] else ''
+                    order_by.append(f"{parts[0]} {direction}{nulls}")
+                sql = f"SELECT {', '.join(columns)} FROM {table}{where}"
+                if order_by:
+                    sql += f" ORDER BY {', '.join(order_by)}"
+                sql += " LIMIT ? OFFSET ?"
+                rows = self.conn.execute(sql, values + [limit, offset]).fetchall()
+
+                booleans = [i for i, name in enumerate(columns)
+                            if TABLES[table]['columns'][name].startswith('BOOLEAN')]
+                data = []
+                for row in rows:
+                    row = list(row)
+                    for i in booleans:
+                        if row[i] is not None:
+                            row[i] = bool(row[i])
+                    data.append(dict(zip(columns, row)))
+
+        with self.stats_lock:
+            self.stats['rows_read'] += len(data)
+
+        total_text = '*' if total is None else str(total)
+        content_range = f"{offset}-{offset + len(data) - 1}/{total_text}" if data else f"*/{total_text}"
+        headers = {'Content-Type': 'application/json', 'Content-Range': content_range}
+        return len(data), (200, headers, json.dumps(data).encode('utf-8'))
+
+    # ------------------------------------------------------------------
+    # Inspection
+    # ------------------------------------------------------------------
+
+    def row_count(self, table: str) -> int:
+        with self.db_lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def summary(self) -> Dict[str, Any]:
+        """Server-side counters: requests, statuses, injected faults, rows written/read"""
+        with self.stats_lock:
+            summary = {key: self.stats.get(key, 0) for key in (
+                'requests', 'rows_written', 'rows_read', 'bytes_received', 'throttled',
+                'injected_error', 'lost_response', 'payload_rejected')}
+            summary['status_counts'] = dict(sorted(self.status_counts.items()))
+        return summary
+
+    def close(self):
+        self.conn.close()
+
+
+class FakePostgRESTTransport(httpx.BaseTransport):
+    """httpx transport answering requests from a FakePostgREST without a socket"""
+
+    def __init__(self, backend: FakePostgREST):
+        self.backend = backend
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        status, headers, content = self.backend.handle(
+            request.method, request.url.path, list(request.url.params.multi_items()),
+            request.headers, request.read()
+        )
+        return httpx.Response(status, headers=headers, content=content, request=request)
+
+
+def serve(backend: FakePostgREST, host: str = '127.0.0.1', port: int = 54321) -> ThreadingHTTPServer:
+    """Create an HTTP/1.1 keep-alive server for the backend (call serve_forever() on it)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _handle(self):
+            url = urlsplit(self.path)
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+            status, headers, content = backend.handle(
+                self.command, url.path, parse_qsl(url.query, keep_blank_values=True), self.headers, body
+            )
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(content)
+
+        do_GET = do_HEAD = do_POST = do_PATCH = do_DELETE = _handle
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser):
+    """Fault options shared by the server CLI and the load harness (None = not set)"""
+    parser.add_argument('--latency-ms', type=float, help='Fixed latency per request')
+    parser.add_argument('--jitter-ms', type=float, help='Extra random latency per request (0..N ms)')
+    parser.add_argument('--per-row-latency-ms', type=float, help='Latency per row written or read')
+    parser.add_argument('--error-rate', type=float, help='Fraction of requests failed before writing')
+    parser.add_argument('--error-status', type=int, help='Status for injected errors (default 503)')
+    parser.add_argument('--lost-response-rate', type=float, help='Fraction of writes applied but answered with 504')
+    parser.add_argument('--rate-limit', type=float, help='Requests per second before 429s')
+    parser.add_argument('--burst', type=float, help='Token bucket capacity for --rate-limit')
+    parser.add_argument('--max-payload-bytes', type=int, help='Reject larger request bodies with 413')
+
+
+def fault_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """FakePostgREST keyword arguments for the fault options that were given"""
+    names = ['latency_ms', 'jitter_ms', 'per_row_latency_ms', 'error_rate', 'error_status',
+             'lost_response_rate', 'rate_limit', 'burst', 'max_payload_bytes']
+    return {name: getattr(args, name) for name in names if getattr(args, name) is not None}
+
+
+def main():
+    """Run the stand-in as an HTTP server"""
+    parser = argparse.ArgumentParser(description='Local PostgREST stand-in for importer load tests')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind')
+    parser.add_argument('--port', type=int, default=54321, help='Port to listen on')
+    parser.add_argument('--database', default=':memory:', help='SQLite file for the stored rows')
+    parser.add_argument('--max-rows', type=int, default=1000, help='Max rows returned per select')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for fault injection')
+    add_fault_arguments(parser)
+
+    args = parser.parse_args()
+
+    backend = FakePostgREST(args.database, max_rows=args.max_rows, seed=args.seed, **fault_options(args))
+    server = serve(backend, args.host, args.port)
+    logger.info(f"Fake PostgREST listening on http://{args.host}:{args.port} (use it as --supabase-url)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"Server summary: {backend.summary()}")
+        backend.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Load Harness for the Importers Against the Local PostgREST Stand-in
+Runs full Enova migrations and NVE imports through ResilientTransport into a
+FakePostgREST (fake_postgrest.py) for each fault scenario and batch size, then
+checks the stored row counts and reports throughput, retries and latency.
+
+Nothing leaves the machine: requests are answered in-process, so runs are
+repeatable in CI. Fault draws are seeded; only rate limiting depends on the
+wall clock.
+
+Usage:
+    python fake_postgrest_harness.py --rows 20000 --batch-sizes 250,1000 --concurrency 1,4
+    python fake_postgrest_harness.py --scenario flaky --error-rate 0.2 --json results.json
+"""
+
+import sys
+import csv
+import json
+import time
+import random
+import sqlite3
+import tempfile
+import argparse
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+import logging
+
+from fake_postgrest import FakePostgREST, FakePostgRESTTransport, add_fault_arguments, fault_options
+from migration_script import EnovaDataMigrator, SQLITE_COLUMN_MAP
+from nve_pricing_import import NVEPricingImporter
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+FAKE_URL = 'http://fake-postgrest.local'
+FAKE_KEY = 'fake-service-key'
+
+# FakePostgREST options per scenario; command line fault options override them
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    'baseline': {},
+    'latency': {'latency_ms': 40, 'jitter_ms': 20, 'per_row_latency_ms': 0.02},
+    'flaky': {'latency_ms': 5, 'error_rate': 0.05},
+    'throttled': {'latency_ms': 5, 'rate_limit': 20, 'burst': 5},
+    'lost_responses': {'latency_ms': 5, 'lost_response_rate': 0.02},
+    'payload_limit': {'max_payload_bytes': 256 * 1024},
+}
+
+ENOVA_HEADER = [
+    'Knr', 'Gnr', 'Bnr', 'Snr', 'Fnr', 'Andelsnummer', 'Bygningsnummer', 'GateAdresse',
+    'Postnummer', 'Poststed', 'BruksEnhetsNummer', 'Organisasjonsnummer', 'Bygningskategori',
+    'Byggear', 'Energikarakter', 'Oppvarmingskarakter', 'Utstedelsesdato', 'TypeRegistrering',
+    'Attestnummer', 'BeregnetLevertEnergiTotaltkWhm2', 'BeregnetFossilandel', 'Materialvalg',
+    'HarEnergiVurdering', 'EnergiVurderingDato',
+]
+NVE_HEADER = ['Uke', 'Gjennomsnitt Pris (øre/kWh)', 'Område slicer']
+ZONES = ['NO1', 'NO2', 'NO3', 'NO4', 'NO5']
+
+
+class LoadHarness:
+    """Generates synthetic sources and drives the importers against FakePostgREST"""
+
+    def __init__(self, work_dir: Path, seed: int = 42, transport_options: Optional[Dict[str, Any]] = None):
+        self.work_dir = work_dir
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.transport_options = transport_options or {}
+        self.failures: List[str] = []
+
+    def generate_enova_data(self, rows: int) -> Path:
+        """Write enova_energimerker_2024.csv and a matching enova_fast_lookup.db"""
+        data_path = self.work_dir / 'production_data'
+        data_path.mkdir(parents=True, exist_ok=True)
+        postal_codes = [(f"{code:04d}", f"Sted {code}") for code in range(100, 9900, 97)]
+
+        buildings = []
+        with open(data_path / 'enova_energimerker_2024.csv', 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(ENOVA_HEADER)
+            for i in range(rows):
+                postal_code, city = self.rng.choice(postal_codes)
+                address = f"Testveien {self.rng.randint(1, 300)}{self.rng.choice(['', 'A', 'B'])}"
+                year = self.rng.randint(1900, 2023)
+                energy_class = self.rng.choice('ABCDEFG')
+                heating_class = self.rng.choice(['Green', 'Yellow', 'Orange', 'Red'])
+                consumption = round(self.rng.uniform(50, 400), 1)
+                certificate_id = f"HARNESS-{i:08d}"
+                building_number = str(100000000 + i)
+                writer.writerow([
+                    self.rng.randint(301, 5444), self.rng.randint(1, 300), self.rng.randint(1, 2000), 0, 0, '',
+                    building_number, address, postal_code, city, f"H0{self.rng.randint(101, 405)}", '',
+                    'Småhus', year, energy_class, heating_class, '2023-05-01T12:00:00', 'Enkel',
+                    certificate_id, str(consumption).replace('.', ','), '0', '', 'False', '',
+                ])
+                buildings.append((address, postal_code, 'Småhus', consumption, energy_class, year,
+                                  heating_class, 0.0, certificate_id, None, building_number))
+
+        db_file = data_path / 'enova_fast_lookup.db'
+        db_file.unlink(missing_ok=True)
+        with sqlite3.connect(db_file) as conn:
+            conn.execute(f"CREATE TABLE buildings ({', '.join(source for source, _ in SQLITE_COLUMN_MAP)})")
+            conn.executemany(
+                f"INSERT INTO buildings VALUES ({', '.join('?' * len(SQLITE_COLUMN_MAP))})", buildings
+            )
+        conn.close()
+        return data_path
+
+    def generate_nve_csv(self, weeks: int) -> Path:
+        """Write an NVE weekly price CSV in the published format (BOM, comma separated)"""
+        csv_path = self.work_dir / 'nve_prices.csv'
+        with open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(NVE_HEADER)
+            for week in range(weeks):
+                label = f"{week % 52 + 1}-{2020 + week // 52}"
+                for zone in ZONES:
+                    writer.writerow([label, self.rng.uniform(5, 250), zone])
+        return csv_path
+
+    def expect(self, label: str, condition: bool, detail: str):
+        if condition:
+            logger.info(f"PASS {label}: {detail}")
+        else:
+            self.failures.append(label)
+            logger.error(f"FAIL {label}: {detail}")
+
+    def _result(self, label: str, backend: FakePostgREST, transport, elapsed: float,
+                rows: int, stored: int) -> Dict[str, Any]:
+        transport_stats = transport.stats.summary()
+        return {
+            'run': label,
+            'elapsed_s': round(elapsed, 2),
+            'rows_per_s': round(rows / elapsed, 1) if elapsed else None,
+            'source_rows': rows,
+            'stored_rows': stored,
+            'requests': transport_stats['requests'],
+            'attempts': transport_stats['attempts'],
+            'retries': transport_stats['retries'],
+            'failures': transport_stats['failures'],
+            'latency_ms_p50': transport_stats['latency_ms_p50'],
+            'latency_ms_p95': transport_stats['latency_ms_p95'],
+            'transport': transport_stats,
+            'server': backend.summary(),
+        }
+
+    def run_enova(self, scenario: str, faults: Dict[str, Any], data_path: Path, rows: int,
+                  batch_size: int, source: str, workers: Optional[int],
+                  concurrency: int = 1) -> Dict[str, Any]:
+        """Migrate the synthetic Enova data into a fresh store and check the row count"""
+        label = f"enova/{scenario}/batch={batch_size}/x{concurrency}"
+        backend = FakePostgREST(seed=self.seed, **faults)
+        migrator = EnovaDataMigrator(
+            FAKE_URL, FAKE_KEY, str(data_path),
+            transport_options=dict(self.transport_options, inner=FakePostgRESTTransport(backend)),
+            concurrency=concurrency
+        )
+
+        started = time.perf_counter()
+        if source == 'sqlite':
+            success, errors = migrator.migrate_from_sqlite(batch_size=batch_size, workers=workers or 4)
+        else:
+            success, errors = migrator.migrate_from_csv(batch_size=batch_size, workers=workers or 1)
+        elapsed = time.perf_counter() - started
+
+        stored = backend.row_count('energy_certificates')
+        self.expect(label, stored == rows, f"{stored}/{rows} rows stored in {elapsed:.2f}s")
+        self.expect(label, success == stored and success + errors == rows,
+                    f"reported {success} inserted, {errors} errors for {stored} stored")
+        result = self._result(label, backend, migrator.transport, elapsed, rows, stored)
+        migrator.transport.close()
+        backend.close()
+        return result
+
+    def run_nve(self, scenario: str, faults: Dict[str, Any], csv_path: Path, weeks: int,
+                batch_size: int) -> Dict[str, Any]:
+        """Import the NVE CSV twice; the upsert on (week, zone) must not duplicate rows"""
+        label = f"nve/{scenario}/batch={batch_size}"
+        expected = weeks * len(ZONES)
+        backend = FakePostgREST(seed=self.seed, **faults)
+        importer = NVEPricingImporter(
+            FAKE_URL, FAKE_KEY,
+            transport_options=dict(self.transport_options, inner=FakePostgRESTTransport(backend))
+        )
+
+        started = time.perf_counter()
+        importer.import_from_csv(str(csv_path), batch_size=batch_size)
+        importer.import_from_csv(str(csv_path), batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+
+        stored = backend.row_count('electricity_prices_nve')
+        self.expect(label, stored == expected, f"{stored}/{expected} rows after two imports")
+        result = self._result(label, backend, importer.transport, elapsed, expected * 2, stored)
+        importer.transport.close()
+        backend.close()
+        return result
+
+
+def print_results(results: List[Dict[str, Any]]):
+    """Log one line per run"""
+    logger.info(f"{'run':<44} {'rows/s':>9} {'req':>6} {'retries':>7} {'fail':>5} {'p50 ms':>7} {'p95 ms':>7}")
+    for result in results:
+        logger.info(
+            f"{result['run']:<44} {result['rows_per_s'] or 0:>9} {result['requests']:>6} "
+            f"{result['retries']:>7} {result['failures']:>5} "
+            f"{result['latency_ms_p50'] or 0:>7} {result['latency_ms_p95'] or 0:>7}"
+        )
+
+
+def main():
+    """Main harness function"""
+    parser = argparse.ArgumentParser(description='Load test the importers against a local PostgREST stand-in')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                       help='Scenario to run (repeatable, default all)')
+    parser.add_argument('--rows', type=int, default=5000, help='Synthetic Enova certificates')
+    parser.add_argument('--weeks', type=int, default=104, help='Synthetic NVE weeks (5 zones each)')
+    parser.add_argument('--batch-sizes', default='1000', help='Comma-separated Enova batch sizes to compare')
+    parser.add_argument('--concurrency', default='1', help='Comma-separated Enova upload concurrencies to compare')
+    parser.add_argument('--nve-batch-size', type=int, default=100, help='NVE batch size')
+    parser.add_argument('--source', choices=['csv', 'sqlite'], default='csv', help='Enova migration source')
+    parser.add_argument('--workers', type=int, help='Parse processes (csv) or reader threads (sqlite)')
+    parser.add_argument('--max-retries', type=int, default=5, help='ResilientTransport retries per request')
+    parser.add_argument('--backoff-base', type=float, default=0.05, help='ResilientTransport first backoff in seconds')
+    parser.add_argument('--reset-timeout', type=float, default=1.0,
+                       help='Seconds the circuit stays open before a trial request')
+    parser.add_argument('--circuit-wait', type=float, default=30.0,
+                       help='Seconds a request waits for an open circuit before failing')
+    parser.add_argument('--skip-nve', action='store_true', help='Only run the Enova migration')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for synthetic data and fault draws')
+    parser.add_argument('--json', help='Write all results to this JSON file')
+    add_fault_arguments(parser)
+
+    args = parser.parse_args()
+
+    # One line per request would drown the results
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    overrides = fault_options(args)
+    scenarios = args.scenario or list(SCENARIOS)
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',') if size.strip()]
+    concurrencies = [int(level) for level in args.concurrency.split(',') if level.strip()]
+    transport_options = {
+        'max_retries': args.max_retries,
+        'backoff_base': args.backoff_base,
+        'backoff_cap': 5.0,
+        'reset_timeout': args.reset_timeout,
+        'circuit_wait': args.circuit_wait,
+    }
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='fake_postgrest_') as work_dir:
+        harness = LoadHarness(Path(work_dir), seed=args.seed, transport_options=transport_options)
+        data_path = harness.generate_enova_data(args.rows)
+        nve_csv = harness.generate_nve_csv(args.weeks)
+
+        for scenario in scenarios:
+            faults = dict(SCENARIOS[scenario], **overrides)
+            logger.info(f"Scenario {scenario}: {faults or 'no faults'}")
+            for batch_size in batch_sizes:
+                for concurrency in concurrencies:
+                    results.append(harness.run_enova(scenario, faults, data_path, args.rows, batch_size,
+                                                     args.source, args.workers, concurrency))
+            if not args.skip_nve:
+                results.append(harness.run_nve(scenario, faults, nve_csv, args.weeks, args.nve_batch_size))
+
+    print_results(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding='utf-8')
+        logger.info(f"Results written to {args.json}")
+
+    if harness.failures:
+        logger.error(f"Load checks failed: {', '.join(harness.failures)}")
+        sys.exit(1)
+    logger.info("All load checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Host Probing and Auto-Tuning for the Importers
+Probes the ETL host (CPU, RAM, disk, Conda/Python environment) in parallel,
+caches the result, calibrates parse and upload rates, and writes recommended
+--workers / --concurrency / --batch-size settings to a tuning file that
+migration_script.py and nve_pricing_import.py read when run with --use-tuning.
+Flags given on the command line always win over the tuning file.
+
+Calibration:
+    parse   rows/s of one process transforming a sample of the Enova CSV
+            (a synthetic sample if the CSV is not available)
+    upload  client cost per row, measured against the local PostgREST stand-in,
+            plus round-trip time and per-row read cost against Supabase when
+            credentials are set (read-only queries; nothing is written)
+
+Usage:
+    python host_tuning.py --data-path /path/to/production_data
+    python host_tuning.py --offline --assume-rtt-ms 40
+    python host_tuning.py --show
+"""
+
+import os
+import json
+import math
+import time
+import shutil
+import socket
+import platform
+import argparse
+import subprocess
+import tempfile
+import importlib.metadata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TUNING_FILE = Path(__file__).parent / 'etl_tuning.json'
+PROBE_MAX_AGE = timedelta(hours=24)
+COMMAND_TIMEOUT = 60  # seconds
+
+KEY_PACKAGES = ['python', 'ifcopenshell', 'pandas', 'openpyxl', 'supabase', 'streamlit', 'fastapi',
+                'httpx', 'h2', 'numpy', 'psutil']
+
+# Recommendation bounds
+MIN_BATCH_SIZE = 100
+MAX_BATCH_SIZE = 5000
+MAX_BATCH_BYTES = 2 * 1024 * 1024   # stay well under gateway payload limits
+MAX_CONCURRENCY = 16                # below ResilientTransport's default 20 pooled connections
+REQUEST_OVERHEAD_SHARE = 0.1        # round trip should be at most 10% of a batch request
+PARSE_MEMORY_PER_WORKER = 4 * 2 * 16 * 1024 * 1024  # ~4x expansion of two 16 MiB ranges in flight
+ASSUMED_REMOTE_ROW_COST_MS = 0.1    # server-side insert cost per row when it cannot be measured
+
+
+def tuning_file_path(path: Optional[str] = None) -> Path:
+    """Tuning file location: explicit path, ETL_TUNING_FILE, or next to the scripts"""
+    return Path(path or os.getenv('ETL_TUNING_FILE') or DEFAULT_TUNING_FILE)
+
+
+def read_tuning_file(path: Optional[str] = None) -> Dict[str, Any]:
+    file_path = tuning_file_path(path)
+    try:
+        return json.loads(file_path.read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable tuning file {file_path}: {e}")
+        return {}
+
+
+def write_tuning_file(state: Dict[str, Any], path: Optional[str] = None):
+    """Write atomically so an importer starting meanwhile never reads half a file"""
+    file_path = tuning_file_path(path)
+    tmp_path = file_path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(state, indent=2, default=str), encoding='utf-8')
+    os.replace(tmp_path, file_path)
+
+
+def load_recommendations(importer: str, path: Optional[str] = None) -> Dict[str, int]:
+    """
+    Tuned settings for one importer ('enova' or 'nve'), or {} if not tuned
+
+    Recommendations written on another host are ignored, so a tuning file that
+    travels with a checkout does not mis-size a different machine.
+    """
+    state = read_tuning_file(path)
+    recommendations = state.get('recommendations', {}).get(importer)
+    if not recommendations:
+        return {}
+    if state.get('hostname') != socket.gethostname():
+        logger.warning(f"Ignoring tuning file from host {state.get('hostname')}; "
+                       f"run host_tuning.py on this host")
+        return {}
+    calibration = state.get('calibration', {})
+    if not calibration.get('upload_measured'):
+        logger.warning(f"Tuned settings assume a {calibration.get('rtt_ms')} ms round trip to Supabase; "
+                       f"re-run host_tuning.py with credentials to measure it")
+    logger.info(f"Using tuned settings from {tuning_file_path(path)} "
+                f"({state.get('tuned_at', 'unknown date')}): {recommendations}")
+    return recommendations
+
+
+# ----------------------------------------------------------------------
+# Probes
+# ----------------------------------------------------------------------
+
+def run_command(args: List[str]) -> Optional[str]:
+    """Run a command without a shell; None if it is missing or fails"""
+    if shutil.which(args[0]) is None:
+        return None
+    try:
+        result = subprocess.run(args, capture_output=True, text=True, check=True, timeout=COMMAND_TIMEOUT)
+        return result.stdout.strip()
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+        logger.debug(f"{' '.join(args)} failed: {e}")
+        return None
+
+
+def probe_hardware() -> Dict[str, Any]:
+    """CPU, RAM and disk; psutil is optional (RAM and physical cores need it)"""
+    disk = shutil.disk_usage('C:\\' if platform.system() == 'Windows' else '/')
+    hardware = {
+        'cpu': platform.processor() or platform.machine(),
+        'logical_cores': os.cpu_count() or 1,
+        'physical_cores': None,
+        'usable_cores': len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1,
+        'ram_total_gb': None,
+        'ram_available_gb': None,
+        'disk_free_gb': round(disk.free / (1024 ** 3), 1),
+        'os': f"{platform.system()} {platform.release()} ({platform.architecture()[0]})",
+    }
+    try:
+        import psutil
+        memory = psutil.virtual_memory()
+        hardware.update(
+            physical_cores=psutil.cpu_count(logical=False),
+            ram_total_gb=round(memory.total / (1024 ** 3), 1),
+            ram_available_gb=round(memory.available / (1024 ** 3), 1),
+        )
+    except ImportError:
+        logger.debug("psutil not installed; RAM and physical core count unavailable")
+    return hardware
+
+
+def probe_conda_packages() -> Dict[str, Any]:
+    output = run_command(['conda', 'list', '--json'])
+    if output is None:
+        return {'key_packages': {}, 'total_packages': 0}
+    try:
+        packages = json.loads(output)
+    except ValueError:
+        return {'error': 'Failed to parse conda list JSON', 'key_packages': {}, 'total_packages': 0}
+    return {
+        'key_packages': {p['name']: p['version'] for p in packages if p['name'] in KEY_PACKAGES},
+        'total_packages': len(packages),
+    }
+
+
+def probe_conda_version() -> Optional[str]:
+    output = run_command(['conda', '--version'])
+    return output.split()[-1] if output and output.startswith('conda') else None
+
+
+def probe_conda_envs() -> Optional[str]:
+    return run_command(['conda', 'env', 'list'])
+
+
+def probe_python_packages() -> Dict[str, str]:
+    """Versions of key packages importable by this interpreter (works without Conda)"""
+    versions = {'python': platform.python_version()}
+    for name in KEY_PACKAGES[1:]:
+        try:
+            versions[name] = importlib.metadata.version(name)
+        except importlib.metadata.PackageNotFoundError:
+            pass
+    return versions
+
+
+PROBES: Dict[str, Callable[[], Any]] = {
+    'hardware': probe_hardware,
+    'conda_packages': probe_conda_packages,
+    'conda_version': probe_conda_version,
+    'conda_envs': probe_conda_envs,
+    'python_packages': probe_python_packages,
+}
+
+
+def collect_system_info(refresh: bool = False, path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run all probes concurrently, or return the cached result if it is fresh
+
+    The Conda calls take seconds each; running them side by side and caching
+    them for PROBE_MAX_AGE keeps repeated reports and tuning runs quick.
+    """
+    state = read_tuning_file(path)
+    cached = state.get('system')
+    if cached and not refresh and state.get('hostname') == socket.gethostname():
+        probed_at = datetime.fromisoformat(cached['probed_at'])
+        if datetime.now() - probed_at < PROBE_MAX_AGE:
+            return cached
+
+    with ThreadPoolExecutor(max_workers=len(PROBES)) as executor:
+        futures = {name: executor.submit(probe) for name, probe in PROBES.items()}
+        system = {name: future.result() for name, future in futures.items()}
+
+    system['probed_at'] = datetime.now().isoformat()
+    system['active_env'] = os.environ.get('CONDA_DEFAULT_ENV', 'base')
+    system['python_version'] = platform.python_version()
+
+    state['hostname'] = socket.gethostname()
+    state['system'] = system
+    write_tuning_file(state, path)
+    return system
+
+
+# ----------------------------------------------------------------------
+# Calibration
+# ----------------------------------------------------------------------
+
+def _sample_records(data_path: Optional[str], work_dir: Path, sample_bytes: int) -> Dict[str, Any]:
+    """Time one process transforming the first sample_bytes of the Enova CSV"""
+    from csv_reader import CSVSource
+    from parallel_csv import parse_range
+    from migration_script import EnovaDataMigrator
+
+    csv_file = Path(data_path) / 'enova_energimerker_2024.csv' if data_path else None
+    synthetic = csv_file is None or not csv_file.exists()
+    if synthetic:
+        from fake_postgrest_harness import LoadHarness
+        csv_file = LoadHarness(work_dir).generate_enova_data(20000) / 'enova_energimerker_2024.csv'
+
+    with CSVSource(csv_file) as source:
+        encoding = source.encoding
+        delimiter = source.dialect.delimiter
+        start, end = source.split_ranges(sample_bytes)[0]
+
+    started = time.perf_counter()
+    records, row_count, _ = parse_range(str(csv_file), encoding, delimiter, start, end,
+                                        EnovaDataMigrator.record_transformer())
+    elapsed = time.perf_counter() - started
+
+    return {
+        'records': records,
+        'parse_rows_per_s': round(row_count / elapsed, 1) if elapsed else None,
+        'avg_row_bytes': round((end - start) / max(row_count, 1), 1),
+        'sample_rows': row_count,
+        'synthetic_sample': synthetic,
+    }
+
+
+def _client_row_cost_ms(records: List[Dict[str, Any]], batch_size: int = 500) -> float:
+    """Per-row cost of encoding and sending inserts, against the in-process stand-in"""
+    from fake_postgrest import FakePostgREST, FakePostgRESTTransport
+    from supabase_transport import create_supabase_client
+
+    backend = FakePostgREST()
+    client, transport = create_supabase_client('http://fake-postgrest.local', 'calibration',
+                                               inner=FakePostgRESTTransport(backend))
+    sent = 0
+    started = time.perf_counter()
+    for start in range(0, len(records), batch_size):
+        batch = [{k: v for k, v in record.items() if v is not None and v != ''}
+                 for record in records[start:start + batch_size]]
+        client.table('energy_certificates').insert(batch).execute()
+        sent += len(batch)
+    elapsed = time.perf_counter() - started
+    transport.close()
+    backend.close()
+    return elapsed * 1000 / max(sent, 1)
+
+
+def _remote_costs_ms(supabase_url: str, supabase_key: str, probes: int = 5,
+                     read_rows: int = 500) -> Dict[str, float]:
+    """Round trip and per-row transfer cost against Supabase, using reads only"""
+    from supabase_transport import create_supabase_client
+
+    client, transport = create_supabase_client(supabase_url, supabase_key, max_retries=1)
+    try:
+        round_trips = []
+        for _ in range(probes):
+            started = time.perf_counter()
+            client.table('energy_certificates').select('id').limit(1).execute()
+            round_trips.append((time.perf_counter() - started) * 1000)
+        rtt_ms = sorted(round_trips)[len(round_trips) // 2]
+
+        started = time.perf_counter()
+        rows = client.table('energy_certificates').select('*').limit(read_rows).execute().data or []
+        read_ms = (time.perf_counter() - started) * 1000
+        row_cost_ms = max(read_ms - rtt_ms, 0) / len(rows) if rows else 0.0
+    finally:
+        transport.close()
+    return {'rtt_ms': round(rtt_ms, 1), 'remote_row_cost_ms': round(row_cost_ms, 4)}
+
+
+def calibrate(data_path: Optional[str] = None, supabase_url: Optional[str] = None,
+              supabase_key: Optional[str] = None, assume_rtt_ms: float = 60.0,
+              sample_bytes: int = 4 * 1024 * 1024) -> Dict[str, Any]:
+    """
+    Measure parse and upload rates on this host
+
+    Returns:
+        Calibration dictionary (rates, row size, round trip, cost per row)
+    """
+    with tempfile.TemporaryDirectory(prefix='host_tuning_') as work_dir:
+        sample = _sample_records(data_path, Path(work_dir), sample_bytes)
+
+    records = sample.pop('records')
+    client_row_cost_ms = _client_row_cost_ms(records[:5000])
+
+    remote = None
+    if supabase_url and supabase_key:
+        try:
+            remote = _remote_costs_ms(supabase_url, supabase_key)
+        except Exception as e:
+            logger.warning(f"Could not reach Supabase for calibration, assuming {assume_rtt_ms} ms RTT: {e}")
+
+    calibration = dict(sample)
+    calibration.update(
+        client_row_cost_ms=round(client_row_cost_ms, 4),
+        rtt_ms=remote['rtt_ms'] if remote else assume_rtt_ms,
+        remote_row_cost_ms=remote['remote_row_cost_ms'] if remote else ASSUMED_REMOTE_ROW_COST_MS,
+        upload_measured=remote is not None,
+    )
+    calibration['row_cost_ms'] = round(calibration['client_row_cost_ms'] + calibration['remote_row_cost_ms'], 4)
+    return calibration
+
+
+def recommend(system: Dict[str, Any], calibration: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    """
+    Derive importer settings from the host and the calibration
+
+    batch_size: smallest batch where the round trip is at most
+        REQUEST_OVERHEAD_SHARE of the request, capped by MAX_BATCH_BYTES
+    concurrency: upload streams needed to keep up with parsing on all but one
+        core, capped at MAX_CONCURRENCY
+    workers: parse processes needed to feed those streams, capped by cores and
+        by available memory
+    """
+    hardware = system['hardware']
+    cores = hardware.get('physical_cores') or hardware['usable_cores']
+    cores = max(1, min(cores, hardware['usable_cores']))
+    rtt_ms = calibration['rtt_ms']
+    row_cost_ms = max(calibration['row_cost_ms'], 0.001)
+
+    batch_size = rtt_ms * (1 - REQUEST_OVERHEAD_SHARE) / (REQUEST_OVERHEAD_SHARE * row_cost_ms)
+    batch_size = min(batch_size, MAX_BATCH_BYTES / max(calibration['avg_row_bytes'], 1))
+    batch_size = int(max(MIN_BATCH_SIZE, min(MAX_BATCH_SIZE, round(batch_size / 100) * 100)))
+
+    stream_rows_per_s = batch_size / ((rtt_ms + batch_size * row_cost_ms) / 1000)
+    parse_rows_per_s = calibration['parse_rows_per_s'] or stream_rows_per_s
+    max_parse_workers = max(1, cores - 1)
+    if hardware.get('ram_available_gb'):
+        max_parse_workers = max(1, min(max_parse_workers,
+                                       int(hardware['ram_available_gb'] * 1024 ** 3 / 2 // PARSE_MEMORY_PER_WORKER)))
+
+    concurrency = math.ceil(parse_rows_per_s * max_parse_workers / stream_rows_per_s)
+    concurrency = max(1, min(MAX_CONCURRENCY, concurrency))
+    workers = math.ceil(concurrency * stream_rows_per_s / parse_rows_per_s)
+    workers = max(1, min(max_parse_workers, workers))
+
+    return {
+        'enova': {'workers': workers, 'concurrency': concurrency, 'batch_size': batch_size},
+        # A few hundred weekly prices: one process, one stream, few requests
+        'nve': {'batch_size': min(batch_size, 500)},
+    }
+
+
+def tune(data_path: Optional[str] = None, supabase_url: Optional[str] = None,
+         supabase_key: Optional[str] = None, assume_rtt_ms: float = 60.0,
+         refresh: bool = False, path: Optional[str] = None) -> Dict[str, Any]:
+    """Probe, calibrate and write the tuning file; returns its contents"""
+    system = collect_system_info(refresh=refresh, path=path)
+    calibration = calibrate(data_path, supabase_url, supabase_key, assume_rtt_ms)
+
+    state = read_tuning_file(path)
+    state.update(
+        hostname=socket.gethostname(),
+        tuned_at=datetime.now().isoformat(),
+        calibration=calibration,
+        recommendations=recommend(system, calibration),
+    )
+    write_tuning_file(state, path)
+    return state
+
+
+def main():
+    """Main tuning function"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    parser = argparse.ArgumentParser(description='Calibrate this host and write importer settings')
+    parser.add_argument('--data-path', help='Path to production_data folder (or set PRODUCTION_DATA_PATH env var)')
+    parser.add_argument('--supabase-url', help='Supabase project URL for round-trip calibration (or SUPABASE_URL)')
+    parser.add_argument('--supabase-key', help='Supabase key (or SUPABASE_KEY)')
+    parser.add_argument('--offline', action='store_true', help='Do not contact Supabase; use --assume-rtt-ms')
+    parser.add_argument('--assume-rtt-ms', type=float, default=60.0, help='Round trip used when not measured')
+    parser.add_argument('--tuning-file', help=f'Output file (or ETL_TUNING_FILE, default {DEFAULT_TUNING_FILE.name})')
+    parser.add_argument('--refresh', action='store_true', help='Re-run the host probes even if cached')
+    parser.add_argument('--show', action='store_true', help='Print the current tuning file and exit')
+
+    args = parser.parse_args()
+
+    if args.show:
+        print(json.dumps(read_tuning_file(args.tuning_file), indent=2))
+        return
+
+    supabase_url = None if args.offline else args.supabase_url or os.getenv('SUPABASE_URL')
+    supabase_key = None if args.offline else args.supabase_key or os.getenv('SUPABASE_KEY')
+    data_path = args.data_path or os.getenv('PRODUCTION_DATA_PATH')
+
+    state = tune(data_path, supabase_url, supabase_key, args.assume_rtt_ms, args.refresh, args.tuning_file)
+
+    calibration = state['calibration']
+    logger.info(f"Parse: {calibration['parse_rows_per_s']} rows/s per process "
+                f"({'synthetic' if calibration['synthetic_sample'] else 'Enova'} sample)")
+    logger.info(f"Upload: {calibration['rtt_ms']} ms round trip "
+                f"({'measured' if calibration['upload_measured'] else 'assumed'}), "
+                f"{calibration['row_cost_ms']} ms per row")
+    for importer, settings in state['recommendations'].items():
+        logger.info(f"{importer}: {settings}")
+    logger.info(f"Wrote {tuning_file_path(args.tuning_file)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,22 +9,34 @@ Usage:
 
 import os
 import sys
-import csv
 import json
 import sqlite3
+import importlib.util
 import argparse
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Iterator, Optional
 import logging
 from pathlib import Path
 
+from csv_reader import CSVSource, get_field
+from parallel_csv import parse_parallel, DEFAULT_CHUNK_BYTES
+from reconciliation import MigrationReconciler
+from current_certificates import CurrentCertificateResolver, publish_current_certificates
+from address_index import AddressIndex
+
 # Try to import required packages
 try:
-    from supabase import create_client, Client
+    from supabase import Client
 except ImportError:
     print("Please install supabase-py: pip install supabase")
     sys.exit(1)
 
+from supabase_transport import CIRCUIT_WAIT, CircuitOpenError, ResilientTransport, create_supabase_client
+from host_tuning import load_recommendations
+
 try:
     from dotenv import load_dotenv
     # Load .env file from same directory
@@ -40,10 +52,33 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# enova_fast_lookup.db column -> energy_certificates column
+SQLITE_COLUMN_MAP = [
+    ('original_address', 'address'),
+    ('postal_code', 'postal_code'),
+    ('building_category', 'building_category'),
+    ('energy_consumption', 'energy_consumption'),
+    ('energy_class', 'energy_class'),
+    ('construction_year', 'construction_year'),
+    ('heating_type', 'heating_class'),
+    ('fossil_percentage', 'fossil_percentage'),
+    ('certificate_id', 'certificate_id'),
+    ('organization_number', 'organization_number'),
+    ('building_number', 'building_number'),
+]
+SQLITE_RECORD_FIELDS = [target for _, target in SQLITE_COLUMN_MAP]
+SQLITE_RANGE_QUERY = (
+    f"SELECT {', '.join(source for source, _ in SQLITE_COLUMN_MAP)} "
+    "FROM buildings WHERE rowid BETWEEN ? AND ? ORDER BY rowid"
+)
+SQLITE_MMAP_SIZE = 1024 * 1024 * 1024  # bytes
+SQLITE_CACHE_KIB = 64 * 1024
+
 class EnovaDataMigrator:
     """Handles migration of Enova energy certificate data to Supabase"""
 
-    def __init__(self, supabase_url: str, supabase_key: str, data_path: str):
+    def __init__(self, supabase_url: str, supabase_key: str, data_path: str,
+                 transport_options: Optional[Dict[str, Any]] = None, concurrency: int = 1):
         """
         Initialize migrator with Supabase credentials
 
@@ -51,11 +86,30 @@ class EnovaDataMigrator:
             supabase_url: Supabase project URL
             supabase_key: Supabase anon/service key
             data_path: Path to production_data folder
+            transport_options: Retry, rate limit and pool settings for ResilientTransport
+            concurrency: Batches uploaded at the same time (1 keeps source order)
         """
-        self.supabase: Client = create_client(supabase_url, supabase_key)
+        self.supabase: Client
+        self.transport: ResilientTransport
+        self.supabase, self.transport = create_supabase_client(
+            supabase_url, supabase_key, **(transport_options or {})
+        )
         self.data_path = Path(data_path)
         self.csv_file = self.data_path / "enova_energimerker_2024.csv"
         self.db_file = self.data_path / "enova_fast_lookup.db"
+        self._postal_cities: Optional[Dict[str, str]] = None
+        # Reader connections, one per SQLite worker thread, closed after each migration
+        self._sqlite_local = threading.local()
+        self._sqlite_connections: List[sqlite3.Connection] = []
+        self.concurrency = max(1, concurrency)
+        self._upload_pool: Optional[ThreadPoolExecutor] = None
+        self._upload_pending: deque = deque()
+        # Records that could not be inserted, taken by _wait_for_uploads()
+        self._failed_records = 0
+        self._failed_lock = threading.Lock()
+        # Set by track_current_certificates(); fed every inserted CSV/cache record
+        self.current_certificates: Optional[CurrentCertificateResolver] = None
+        self._current_lock = threading.Lock()
 
         # Verify files exist
         if not self.csv_file.exists():
@@ -63,6 +117,25 @@ class EnovaDataMigrator:
         if not self.db_file.exists():
             raise FileNotFoundError(f"Database file not found: {self.db_file}")
 
+    @classmethod
+    def record_transformer(cls) -> Callable[[List[str], Dict[str, int]], Dict[str, Any]]:
+        """CSV row transform usable without Supabase credentials (e.g. for cache builds)"""
+        return cls.__new__(cls).transform_csv_row
+
+    def __getstate__(self):
+        """Pickle without the Supabase client so transforms can run in worker processes"""
+        state = self.__dict__.copy()
+        state['supabase'] = None
+        state['transport'] = None
+        state['_sqlite_local'] = None
+        state['_sqlite_connections'] = []
+        state['_upload_pool'] = None
+        state['_upload_pending'] = deque()
+        state['_failed_lock'] = None
+        state['current_certificates'] = None
+        state['_current_lock'] = None
+        return state
+
     def parse_norwegian_date(self, date_str: str) -> Optional[str]:
         """Parse Norwegian date format to ISO format"""
         if not date_str:
@@ -104,43 +177,58 @@ class EnovaDataMigrator:
         """Parse boolean value"""
         return value.lower() in ['true', '1', 'yes', 'ja']
 
-    def transform_csv_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
-        """Transform CSV row to database format"""
+    def transform_csv_row(self, row: List[str], columns: Dict[str, int]) -> Dict[str, Any]:
+        """
+        Transform CSV row to database format
+
+        Args:
+            row: Raw CSV record as a list of fields
+            columns: Header name -> field index map from CSVSource
+        """
+        def get(name: str, default: Optional[str] = None) -> Optional[str]:
+            return get_field(row, columns, name, default)
+
         return {
-            'knr': self.parse_int(row.get('Knr')),
-            'gnr': self.parse_int(row.get('Gnr')),
-            'bnr': self.parse_int(row.get('Bnr')),
-            'snr': self.parse_int(row.get('Snr')),
-            'fnr': self.parse_int(row.get('Fnr')),
-            'andelsnummer': row.get('Andelsnummer') if row.get('Andelsnummer') else None,
-            'building_number': row.get('Bygningsnummer'),
-            'address': row.get('GateAdresse'),
-            'postal_code': row.get('Postnummer'),
-            'city': row.get('Poststed'),
-            'unit_number': row.get('BruksEnhetsNummer'),
-            'organization_number': row.get('Organisasjonsnummer') if row.get('Organisasjonsnummer') else None,
-            'building_category': row.get('Bygningskategori'),
-            'construction_year': self.parse_int(row.get('Byggear')),
-            'energy_class': row.get('Energikarakter') if row.get('Energikarakter') else None,
-            'heating_class': row.get('Oppvarmingskarakter') if row.get('Oppvarmingskarakter') else None,
-            'issue_date': self.parse_norwegian_date(row.get('Utstedelsesdato')),
-            'certificate_type': row.get('TypeRegistrering'),
-            'certificate_id': row.get('Attestnummer'),
-            'energy_consumption': self.parse_float(row.get('BeregnetLevertEnergiTotaltkWhm2')),
-            'fossil_percentage': self.parse_float(row.get('BeregnetFossilandel'), divide_by_100=True),
-            'material_type': row.get('Materialvalg') if row.get('Materialvalg') else None,
-            'has_energy_evaluation': self.parse_boolean(row.get('HarEnergiVurdering', 'False')),
-            'energy_evaluation_date': self.parse_norwegian_date(row.get('EnergiVurderingDato'))
+            'knr': self.parse_int(get('Knr')),
+            'gnr': self.parse_int(get('Gnr')),
+            'bnr': self.parse_int(get('Bnr')),
+            'snr': self.parse_int(get('Snr')),
+            'fnr': self.parse_int(get('Fnr')),
+            'andelsnummer': get('Andelsnummer') or None,
+            'building_number': get('Bygningsnummer'),
+            'address': get('GateAdresse'),
+            'postal_code': get('Postnummer'),
+            'city': get('Poststed'),
+            'unit_number': get('BruksEnhetsNummer'),
+            'organization_number': get('Organisasjonsnummer') or None,
+            'building_category': get('Bygningskategori'),
+            'construction_year': self.parse_int(get('Byggear')),
+            'energy_class': get('Energikarakter') or None,
+            'heating_class': get('Oppvarmingskarakter') or None,
+            'issue_date': self.parse_norwegian_date(get('Utstedelsesdato')),
+            'certificate_type': get('TypeRegistrering'),
+            'certificate_id': get('Attestnummer'),
+            'energy_consumption': self.parse_float(get('BeregnetLevertEnergiTotaltkWhm2')),
+            'fossil_percentage': self.parse_float(get('BeregnetFossilandel'), divide_by_100=True),
+            'material_type': get('Materialvalg') or None,
+            'has_energy_evaluation': self.parse_boolean(get('HarEnergiVurdering') or 'False'),
+            'energy_evaluation_date': self.parse_norwegian_date(get('EnergiVurderingDato'))
         }
 
-    def migrate_from_csv(self, batch_size: int = 1000, limit: Optional[int] = None):
+    def migrate_from_csv(self, batch_size: int = 1000, limit: Optional[int] = None,
+                         workers: int = 1, chunk_bytes: int = DEFAULT_CHUNK_BYTES):
         """
         Migrate data from CSV file to Supabase
 
         Args:
             batch_size: Number of records to insert per batch
             limit: Optional limit for testing (None for all records)
+            workers: Parse processes; above 1 the file is split into byte ranges
+            chunk_bytes: Target byte range size for parallel parsing
         """
+        if workers > 1:
+            return self._migrate_from_csv_parallel(batch_size, limit, workers, chunk_bytes)
+
         logger.info(f"Starting CSV migration from {self.csv_file}")
 
         total_rows = 0
@@ -148,21 +236,21 @@ class EnovaDataMigrator:
         error_count = 0
         batch = []
 
-        with open(self.csv_file, 'r', encoding='utf-8-sig') as file:
-            reader = csv.DictReader(file)
+        with CSVSource(self.csv_file) as source:
+            columns = source.columns
 
-            for row_num, row in enumerate(reader, 1):
+            for row_num, row in enumerate(source.rows(), 1):
                 if limit and row_num > limit:
                     break
 
                 try:
                     # Transform row
-                    transformed = self.transform_csv_row(row)
+                    transformed = self.transform_csv_row(row, columns)
                     batch.append(transformed)
 
                     # Insert batch when full
                     if len(batch) >= batch_size:
-                        self._insert_batch(batch)
+                        self._upload_batch(batch)
                         success_count += len(batch)
                         logger.info(f"Inserted batch: {success_count}/{row_num} records")
                         batch = []
@@ -178,84 +266,316 @@ class EnovaDataMigrator:
 
             # Insert remaining batch
             if batch:
-                self._insert_batch(batch)
+                self._upload_batch(batch)
                 success_count += len(batch)
 
+        failed = self._wait_for_uploads()
+        success_count -= failed
+        error_count += failed
         logger.info(f"Migration complete: {success_count} inserted, {error_count} errors")
         return success_count, error_count
 
-    def migrate_from_sqlite(self, batch_size: int = 1000, limit: Optional[int] = None):
+    def _migrate_from_csv_parallel(self, batch_size: int, limit: Optional[int],
+                                   workers: int, chunk_bytes: int):
+        """
+        Parse the CSV in worker processes and upload from this process in file order
+
+        Only a few byte ranges are parsed ahead of the upload, so memory stays
+        bounded regardless of file size.
+        """
+        logger.info(f"Starting parallel CSV migration from {self.csv_file} with {workers} workers")
+
+        success_count = 0
+        error_count = 0
+        batch = []
+        stop = False
+
+        for first_row, records, errors in parse_parallel(self.csv_file, self.transform_csv_row,
+                                                         workers=workers, chunk_bytes=chunk_bytes):
+            # Walk the range row by row, as the serial path does, so --limit
+            # and the error cap stop at the same row. transform_csv_row never
+            # returns None, so every row is either a record or an error.
+            error_rows = dict(errors)
+            range_records = iter(records)
+            for row_num in range(first_row, first_row + len(records) + len(errors)):
+                if limit and row_num > limit:
+                    stop = True
+                    break
+
+                if row_num in error_rows:
+                    error_count += 1
+                    logger.error(f"Error processing row {row_num}: {error_rows[row_num]}")
+                    if error_count > 100:
+                        logger.error("Too many errors, aborting")
+                        stop = True
+                        break
+                    continue
+
+                batch.append(next(range_records))
+                if len(batch) >= batch_size:
+                    self._upload_batch(batch)
+                    success_count += len(batch)
+                    logger.info(f"Inserted batch: {success_count}/{row_num} records")
+                    batch = []
+
+            if stop:
+                break
+
+        if batch:
+            self._upload_batch(batch)
+            success_count += len(batch)
+
+        failed = self._wait_for_uploads()
+        success_count -= failed
+        error_count += failed
+        logger.info(f"Migration complete: {success_count} inserted, {error_count} errors")
+        return success_count, error_count
+
+    def _open_sqlite(self) -> sqlite3.Connection:
+        """
+        Open enova_fast_lookup.db read-only
+
+        immutable=1 tells SQLite the file cannot change, so it skips locking and
+        change detection; mmap lets page reads bypass the read() syscall path.
+        """
+        uri = f"{self.db_file.resolve().as_uri()}?mode=ro&immutable=1"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_KIB}")
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def postal_city_lookup(self) -> Dict[str, str]:
+        """
+        Build a postal code -> city map from the CSV (once per migrator)
+
+        The SQLite lookup database has no city column; the CSV's Poststed is the
+        authoritative source. The pairs are counted from the columnar cache when
+        it is current, so only a CSV without a cache is parsed. When a postal
+        code maps to several spellings the most frequent one wins.
+        """
+        if self._postal_cities is not None:
+            return self._postal_cities
+
+        pairs = None
+        if importlib.util.find_spec('numpy') is not None:
+            from columnar_cache import ColumnarCache
+            cache = ColumnarCache.open_if_valid(self.csv_file)
+            if cache is not None:
+                pairs = cache.value_counts('postal_code', 'city')
+
+        if pairs is None:
+            pairs = Counter()
+            with CSVSource(self.csv_file) as source:
+                if 'Postnummer' in source.columns and 'Poststed' in source.columns:
+                    for _, chunk in source.column_chunks(columns=['Postnummer', 'Poststed']):
+                        pairs.update(zip(chunk['Postnummer'], chunk['Poststed']))
+
+        counts: Dict[str, Counter] = {}
+        for (postal_code, city), count in pairs.items():
+            if postal_code and city:
+                counts.setdefault(postal_code, Counter())[city] += count
+
+        self._postal_cities = {postal_code: cities.most_common(1)[0][0]
+                               for postal_code, cities in counts.items()}
+        logger.info(f"Built postal code lookup with {len(self._postal_cities)} postal codes")
+        return self._postal_cities
+
+    def _read_sqlite_range(self, start_rowid: int, end_rowid: int) -> List[tuple]:
+        """Read the mapped columns for one rowid range (runs in a worker thread)"""
+        conn = getattr(self._sqlite_local, 'conn', None)
+        if conn is None:
+            conn = self._sqlite_local.conn = self._open_sqlite()
+            self._sqlite_connections.append(conn)
+        return conn.execute(SQLITE_RANGE_QUERY, (start_rowid, end_rowid)).fetchall()
+
+    def _close_sqlite_readers(self):
+        """Close the reader threads' connections once their executor has shut down"""
+        while self._sqlite_connections:
+            self._sqlite_connections.pop().close()
+        self._sqlite_local = threading.local()
+
+    def migrate_from_cache(self, batch_size: int = 1000, limit: Optional[int] = None,
+                           workers: int = 1):
+        """
+        Migrate data from the columnar cache of the CSV to Supabase
+
+        The cache is built on first use and rebuilt whenever the CSV changes
+        (see columnar_cache.py); later runs skip text parsing entirely.
+
+        Args:
+            batch_size: Number of records to insert per batch
+            limit: Optional limit for testing
+            workers: Parse processes used if the cache has to be (re)built
+        """
+        # numpy is only needed for the cache, so import it on demand
+        from columnar_cache import ColumnarCache
+
+        cache = ColumnarCache.load_or_build(self.csv_file, self.record_transformer(), workers=workers)
+        logger.info(f"Starting cache migration from {cache.directory} ({cache.row_count} records)")
+
+        success_count = 0
+        for batch in cache.iter_records(batch_size=batch_size, limit=limit):
+            self._upload_batch(batch)
+            success_count += len(batch)
+            logger.info(f"Inserted batch: {success_count}/{cache.row_count} records")
+
+        failed = self._wait_for_uploads()
+        success_count -= failed
+        skipped = cache.manifest.get('error_count', 0)
+        logger.info(f"Cache migration complete: {success_count} inserted, {failed} failed, "
+                    f"{skipped} rows skipped at build")
+        return success_count, skipped + failed
+
+    def migrate_from_sqlite(self, batch_size: int = 1000, limit: Optional[int] = None,
+                            workers: int = 4):
         """
         Migrate data from SQLite database to Supabase
 
+        Rowid ranges of batch_size are read by a pool of worker threads (SQLite
+        releases the GIL while stepping) and uploaded in rowid order.
+
         Args:
             batch_size: Number of records to insert per batch
             limit: Optional limit for testing
+            workers: Parallel SQLite reader threads
         """
         logger.info(f"Starting SQLite migration from {self.db_file}")
 
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        postal_cities = self.postal_city_lookup()
 
-        # Get total count
-        cursor.execute("SELECT COUNT(*) FROM buildings")
-        total_count = cursor.fetchone()[0]
+        conn = self._open_sqlite()
+        total_count, min_rowid, max_rowid = conn.execute(
+            "SELECT COUNT(*), MIN(rowid), MAX(rowid) FROM buildings"
+        ).fetchone()
+        conn.close()
         logger.info(f"Found {total_count} records in SQLite database")
 
-        # Fetch data in batches
-        query = "SELECT * FROM buildings"
-        if limit:
-            query += f" LIMIT {limit}"
+        if not total_count:
+            return 0, 0
 
-        cursor.execute(query)
+        ranges = iter([(start, min(start + batch_size - 1, max_rowid))
+                       for start in range(min_rowid, max_rowid + 1, batch_size)])
 
         success_count = 0
         error_count = 0
-        batch = []
+        unknown_cities = 0
+        pending = deque()
 
-        while True:
-            rows = cursor.fetchmany(batch_size)
-            if not rows:
-                break
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                def submit_next():
+                    rowid_range = next(ranges, None)
+                    if rowid_range is not None:
+                        pending.append(executor.submit(self._read_sqlite_range, *rowid_range))
+
+                for _ in range(workers * 2):
+                    submit_next()
+
+                while pending:
+                    rows = pending.popleft().result()
+                    submit_next()
+
+                    if limit:
+                        rows = rows[:limit - success_count - error_count]
+
+                    batch = []
+                    for row in rows:
+                        try:
+                            # Map SQLite columns to Supabase schema
+                            record = dict(zip(SQLITE_RECORD_FIELDS, row))
+                            city = postal_cities.get(record['postal_code'])
+                            if city is None:
+                                unknown_cities += 1
+                            # city is NOT NULL in energy_certificates
+                            record['city'] = city or 'Unknown'
+                            batch.append(record)
+
+                        except Exception as e:
+                            error_count += 1
+                            logger.error(f"Error processing SQLite row: {e}")
+
+                    # Insert batch
+                    if batch:
+                        # SQLite rows carry no issue_date and repeat the CSV
+                        # certificates, so they never feed current_certificates
+                        self._upload_batch(batch, track_current=False)
+                        success_count += len(batch)
+                        logger.info(f"Inserted {success_count}/{total_count} records")
 
-            for row in rows:
-                try:
-                    # Map SQLite columns to Supabase schema
-                    record = {
-                        'address': row['original_address'],
-                        'postal_code': row['postal_code'],
-                        'building_category': row['building_category'],
-                        'energy_consumption': row['energy_consumption'],
-                        'energy_class': row['energy_class'],
-                        'construction_year': row['construction_year'],
-                        'heating_class': row['heating_type'],
-                        'fossil_percentage': row['fossil_percentage'],
-                        'certificate_id': row['certificate_id'],
-                        'organization_number': row['organization_number'],
-                        'building_number': row['building_number'],
-                        # Set required fields with defaults if missing
-                        'city': 'Unknown',  # Would need to parse from address
-                    }
-                    batch.append(record)
+                    if limit and success_count + error_count >= limit:
+                        for future in pending:
+                            future.cancel()
+                        break
+        finally:
+            self._close_sqlite_readers()
+
+        failed = self._wait_for_uploads()
+        success_count -= failed
+        error_count += failed
+        if unknown_cities:
+            logger.warning(f"{unknown_cities} records had a postal code missing from the CSV lookup")
+        logger.info(f"SQLite migration complete: {success_count} inserted, {error_count} errors")
+        return success_count, error_count
 
-                except Exception as e:
-                    error_count += 1
-                    logger.error(f"Error processing SQLite row: {e}")
+    def _upload_batch(self, batch: List[Dict[str, Any]], track_current: bool = True):
+        """
+        Insert a batch, on a pool of `concurrency` upload threads when above 1
 
-            # Insert batch
-            if batch:
-                self._insert_batch(batch)
-                success_count += len(batch)
-                logger.info(f"Inserted {success_count}/{total_count} records")
-                batch = []
+        At most two batches per thread are queued, so a slow API applies
+        backpressure to the reader instead of buffering the whole source.
 
-        conn.close()
-        logger.info(f"SQLite migration complete: {success_count} inserted, {error_count} errors")
-        return success_count, error_count
+        Args:
+            batch: Transformed energy_certificates records
+            track_current: Feed inserted records to current_certificates when tracking
+        """
+        if self.concurrency <= 1:
+            self._insert_batch(batch, track_current)
+            return
+
+        if self._upload_pool is None:
+            self._upload_pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='upload')
+        self._upload_pending.append(self._upload_pool.submit(self._insert_batch, batch, track_current))
+        while len(self._upload_pending) > self.concurrency * 2:
+            self._upload_pending.popleft().result()
 
-    def _insert_batch(self, batch: List[Dict[str, Any]]):
-        """Insert a batch of records to Supabase"""
+    def _wait_for_uploads(self) -> int:
+        """
+        Block until every queued batch has been inserted
+
+        Returns:
+            Records that failed to insert since the last call
+        """
+        try:
+            while self._upload_pending:
+                self._upload_pending.popleft().result()
+        finally:
+            if self._upload_pool is not None:
+                self._upload_pool.shutdown(wait=True, cancel_futures=True)
+                self._upload_pool = None
+                self._upload_pending.clear()
+        with self._failed_lock:
+            failed, self._failed_records = self._failed_records, 0
+        return failed
+
+    def _record_failures(self, count: int):
+        with self._failed_lock:
+            self._failed_records += count
+
+    def _track_inserted(self, records: List[Dict[str, Any]]):
+        """Feed records that reached energy_certificates to current_certificates (any upload thread)"""
+        if self.current_certificates is not None and records:
+            with self._current_lock:
+                self.current_certificates.add_batch(records)
+
+    def _insert_batch(self, batch: List[Dict[str, Any]], track_current: bool = True):
+        """
+        Insert a batch of records to Supabase
+
+        Failed records are counted for _wait_for_uploads(); only inserted ones
+        are fed to current_certificates.
+        """
         try:
             # Clean None values and empty strings
             cleaned_batch = []
@@ -266,16 +586,28 @@ class EnovaDataMigrator:
 
             # Insert to Supabase
             result = self.supabase.table('energy_certificates').insert(cleaned_batch).execute()
+            if track_current:
+                self._track_inserted(batch)
+
+        except CircuitOpenError as e:
+            # The API is down: single inserts would be rejected the same way
+            logger.error(f"Failed to insert batch of {len(batch)}: {e}")
+            self._record_failures(len(batch))
 
         except Exception as e:
             logger.error(f"Failed to insert batch: {e}")
             # Try inserting one by one to identify problem records
+            inserted = []
             for i, record in enumerate(batch):
                 try:
                     self.supabase.table('energy_certificates').insert(record).execute()
+                    inserted.append(record)
                 except Exception as individual_error:
+                    self._record_failures(1)
                     logger.error(f"Failed record {i}: {individual_error}")
                     logger.debug(f"Problem record: {record}")
+            if track_current:
+                self._track_inserted(inserted)
 
     def verify_migration(self):
         """Verify migration by checking record counts"""
@@ -285,8 +617,17 @@ class EnovaDataMigrator:
         result = self.supabase.table('energy_certificates').select('count', count='exact').execute()
         supabase_count = result.count if hasattr(result, 'count') else 0
 
-        # Count records in CSV
-        csv_count = sum(1 for _ in open(self.csv_file, 'r', encoding='utf-8-sig')) - 1
+        # Count records in CSV, from the columnar cache when it is current
+        csv_count = None
+        if importlib.util.find_spec('numpy') is not None:
+            from columnar_cache import ColumnarCache
+            cache = ColumnarCache.open_if_valid(self.csv_file)
+            if cache is not None:
+                csv_count = cache.source_row_count
+
+        if csv_count is None:
+            with CSVSource(self.csv_file) as source:
+                csv_count = source.count_rows()
 
         logger.info(f"Supabase records: {supabase_count}")
         logger.info(f"CSV records: {csv_count}")
@@ -294,6 +635,92 @@ class EnovaDataMigrator:
 
         return supabase_count, csv_count
 
+    def iter_source_records(self) -> Iterator[Dict[str, Any]]:
+        """Yield transformed CSV records, from the columnar cache when it is current"""
+        return self.iter_csv_records(self.csv_file)
+
+    @classmethod
+    def iter_csv_records(cls, csv_file: Path) -> Iterator[Dict[str, Any]]:
+        """iter_source_records for any CSV path, usable without Supabase credentials"""
+        if importlib.util.find_spec('numpy') is not None:
+            from columnar_cache import ColumnarCache
+            cache = ColumnarCache.open_if_valid(csv_file)
+            if cache is not None:
+                for batch in cache.iter_records(batch_size=10000):
+                    yield from batch
+                return
+
+        transform = cls.record_transformer()
+        with CSVSource(csv_file) as source:
+            columns = source.columns
+            for row_num, row in enumerate(source.rows(), 1):
+                try:
+                    yield transform(row, columns)
+                except Exception as e:
+                    logger.error(f"Error processing row {row_num}: {e}")
+
+    def track_current_certificates(self):
+        """Resolve the latest certificate per building and address while migrating"""
+        self.current_certificates = CurrentCertificateResolver()
+
+    def publish_current_certificates(self, prune: bool = True) -> Dict[str, int]:
+        """
+        Publish the latest certificate per building and address (requires 11_current_certificates.sql)
+
+        Uses the records seen during migration when tracking was enabled,
+        otherwise resolves them in one pass over the source.
+
+        Args:
+            prune: Remove keys not present in this run; disable for partial runs
+        """
+        resolver = self.current_certificates
+        if resolver is None:
+            logger.info("Resolving current certificates from source...")
+            resolver = CurrentCertificateResolver()
+            resolver.add_batch(self.iter_source_records())
+
+        summary = resolver.summary()
+        logger.info(f"Current certificates: {summary['buildings']} buildings "
+                    f"({summary['buildings_with_history']} with history), "
+                    f"{summary['addresses']} addresses from {summary['records_seen']} records")
+        return publish_current_certificates(self.supabase, resolver, prune=prune)
+
+    def build_address_index(self) -> AddressIndex:
+        """Write the local address search index (enova_address_index.db) from the source"""
+        logger.info("Building local address index...")
+        return AddressIndex.build(self.iter_source_records(), AddressIndex.default_path(self.data_path),
+                                  source=AddressIndex.source_signature(self.csv_file))
+
+    def reconcile_migration(self, partition: str = 'knr', prefix_length: int = 2) -> Dict[str, Any]:
+        """
+        Verify migration with partitioned checksums (requires 10_reconciliation.sql)
+
+        Unlike verify_migration, this detects wrong and duplicated rows and
+        lists the exact certificate_ids that differ.
+
+        Args:
+            partition: 'knr' or 'postal' (postal code prefix)
+            prefix_length: Postal code prefix length for 'postal'
+        """
+        logger.info(f"Reconciling migration by {partition}...")
+
+        reconciler = MigrationReconciler(self.supabase, self.iter_source_records,
+                                         partition=partition, prefix_length=prefix_length)
+        report = reconciler.reconcile()
+
+        logger.info(f"Source records: {report['source_rows']}")
+        logger.info(f"Supabase records: {report['database_rows']}")
+        logger.info(f"Partitions differing: {len(report['mismatched_partitions'])}/{report['partitions_checked']}")
+        for category in ('missing_in_database', 'unexpected_in_database',
+                         'duplicated_in_database', 'content_mismatch'):
+            ids = report[category]
+            if ids:
+                preview = ', '.join(str(certificate_id) for certificate_id in ids[:20])
+                logger.warning(f"{category}: {len(ids)} ({preview}{', ...' if len(ids) > 20 else ''})")
+        logger.info(f"Reconciliation used {report['query_count']} queries")
+
+        return report
+
     def create_sample_searches(self):
         """Create sample search data for testing"""
         sample_searches = [
@@ -316,16 +743,42 @@ def main():
     parser.add_argument('--supabase-url', help='Supabase project URL (or set SUPABASE_URL env var)')
     parser.add_argument('--supabase-key', help='Supabase service key (or set SUPABASE_KEY env var)')
     parser.add_argument('--data-path', help='Path to production_data folder (or set PRODUCTION_DATA_PATH env var)')
-    parser.add_argument('--source', choices=['csv', 'sqlite', 'both'], default='csv',
+    parser.add_argument('--source', choices=['csv', 'cache', 'sqlite', 'both'], default='csv',
                        help='Data source to migrate from')
-    parser.add_argument('--batch-size', type=int, default=1000,
-                       help='Batch size for inserts')
+    parser.add_argument('--batch-size', type=int, default=None,
+                       help='Batch size for inserts (default 1000, or tuned with --use-tuning)')
+    parser.add_argument('--use-tuning', action='store_true',
+                       help='Fill unset --batch-size/--workers/--concurrency from host_tuning.py results')
     parser.add_argument('--limit', type=int, default=None,
                        help='Limit records for testing')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Parallel CSV parse processes (default 1, or tuned) / SQLite reader threads (default 4)')
+    parser.add_argument('--concurrency', type=int, default=None,
+                       help='Batches uploaded in parallel (default 1, or tuned with --use-tuning)')
     parser.add_argument('--verify', action='store_true',
                        help='Verify migration after completion')
+    parser.add_argument('--verify-mode', choices=['count', 'checksum'], default='count',
+                       help='Verify by total count, or by partitioned checksums (needs 10_reconciliation.sql)')
+    parser.add_argument('--partition', choices=['knr', 'postal'], default='knr',
+                       help='Partitioning for checksum verification')
+    parser.add_argument('--prefix-length', type=int, default=2,
+                       help='Postal code prefix length for --partition postal')
     parser.add_argument('--create-samples', action='store_true',
                        help='Create sample search data')
+    parser.add_argument('--current-certificates', action='store_true',
+                       help='Publish the latest certificate per building and address after migrating')
+    parser.add_argument('--current-only', action='store_true',
+                       help='Only rebuild current_certificates from the source, without migrating')
+    parser.add_argument('--address-index', action='store_true',
+                       help='Also build the local SQLite address search index next to the source data')
+    parser.add_argument('--rate-limit', type=float, default=None,
+                       help='Max Supabase requests per second (default unlimited)')
+    parser.add_argument('--max-retries', type=int, default=5,
+                       help='Retries per request on 429/5xx and connection errors')
+    parser.add_argument('--max-connections', type=int, default=20,
+                       help='Pooled keep-alive HTTP connections')
+    parser.add_argument('--circuit-wait', type=float, default=CIRCUIT_WAIT,
+                       help='Seconds a request waits for an open circuit breaker before failing')
 
     args = parser.parse_args()
 
@@ -346,39 +799,88 @@ def main():
     logger.info(f"Using Supabase URL: {supabase_url}")
     logger.info(f"Using data path: {data_path}")
 
+    # Explicit flags win over settings written by host_tuning.py, which are opt-in
+    tuned = load_recommendations('enova') if args.use_tuning else {}
+    batch_size = args.batch_size or tuned.get('batch_size') or 1000
+    parse_workers = args.workers or tuned.get('workers') or 1
+    concurrency = args.concurrency or tuned.get('concurrency') or 1
+    logger.info(f"Batch size {batch_size}, workers {parse_workers}, concurrency {concurrency}"
+                f"{' (tuned where not given)' if tuned else ''}")
+
     try:
         # Initialize migrator
         migrator = EnovaDataMigrator(
             supabase_url=supabase_url,
             supabase_key=supabase_key,
-            data_path=data_path
+            data_path=data_path,
+            transport_options={
+                'rate_limit': args.rate_limit,
+                'max_retries': args.max_retries,
+                'max_connections': args.max_connections,
+                'circuit_wait': args.circuit_wait,
+            },
+            concurrency=concurrency
         )
 
+        # Track while migrating CSV/cache records; otherwise publish resolves
+        # from the source in its own pass
+        tracking = args.current_certificates and not args.current_only and args.source != 'sqlite'
+        if tracking:
+            migrator.track_current_certificates()
+
         # Run migration
-        if args.source in ['csv', 'both']:
+        if args.current_only:
+            logger.info("Skipping migration, rebuilding current certificates only")
+        elif args.source in ['csv', 'both']:
             logger.info("Starting CSV migration...")
             success, errors = migrator.migrate_from_csv(
-                batch_size=args.batch_size,
-                limit=args.limit
+                batch_size=batch_size,
+                limit=args.limit,
+                workers=parse_workers
             )
             logger.info(f"CSV migration: {success} success, {errors} errors")
 
-        if args.source in ['sqlite', 'both']:
+        if args.source == 'cache' and not args.current_only:
+            logger.info("Starting columnar cache migration...")
+            success, errors = migrator.migrate_from_cache(
+                batch_size=batch_size,
+                limit=args.limit,
+                workers=parse_workers
+            )
+            logger.info(f"Cache migration: {success} success, {errors} errors")
+
+        if args.source in ['sqlite', 'both'] and not args.current_only:
             logger.info("Starting SQLite migration...")
             success, errors = migrator.migrate_from_sqlite(
-                batch_size=args.batch_size,
-                limit=args.limit
+                batch_size=batch_size,
+                limit=args.limit,
+                workers=args.workers or 4
             )
             logger.info(f"SQLite migration: {success} success, {errors} errors")
 
+        if args.current_certificates or args.current_only:
+            if args.limit and tracking:
+                logger.warning("--limit set: publishing current certificates without removing stale keys")
+            migrator.publish_current_certificates(prune=not (args.limit and tracking))
+
+        if args.address_index:
+            migrator.build_address_index()
+
         # Verify if requested
         if args.verify:
-            migrator.verify_migration()
+            if args.verify_mode == 'checksum':
+                migrator.reconcile_migration(partition=args.partition, prefix_length=args.prefix_length)
+            else:
+                migrator.verify_migration()
 
         # Create sample data if requested
         if args.create_samples:
             migrator.create_sample_searches()
 
+        logger.info("Transport summary:")
+        for key, value in migrator.transport.stats.summary().items():
+            logger.info(f"  {key}: {value}")
+
         logger.info("Migration complete!")
 
     except Exception as e:
@@ -12,7 +12,6 @@ Usage:
 
 import os
 import sys
-import csv
 import re
 import argparse
 from datetime import datetime
@@ -20,13 +19,18 @@ from typing import List, Dict, Any, Optional
 import logging
 from pathlib import Path
 
+from csv_reader import CSVSource, get_field
+
 # Try to import required packages
 try:
-    from supabase import create_client, Client
+    from supabase import Client
 except ImportError:
     print("Please install supabase-py: pip install supabase")
     sys.exit(1)
 
+from supabase_transport import CIRCUIT_WAIT, CircuitOpenError, ResilientTransport, create_supabase_client
+from host_tuning import load_recommendations
+
 try:
     from dotenv import load_dotenv
     # Load .env file from same directory
@@ -45,15 +49,21 @@ logger = logging.getLogger(__name__)
 class NVEPricingImporter:
     """Handles import of NVE electricity pricing data to Supabase"""
 
-    def __init__(self, supabase_url: str, supabase_key: str):
+    def __init__(self, supabase_url: str, supabase_key: str,
+                 transport_options: Optional[Dict[str, Any]] = None):
         """
         Initialize importer with Supabase credentials
 
         Args:
             supabase_url: Supabase project URL
             supabase_key: Supabase service key
+            transport_options: Retry, rate limit and pool settings for ResilientTransport
         """
-        self.supabase: Client = create_client(supabase_url, supabase_key)
+        self.supabase: Client
+        self.transport: ResilientTransport
+        self.supabase, self.transport = create_supabase_client(
+            supabase_url, supabase_key, **(transport_options or {})
+        )
 
     def parse_week_identifier(self, week_str: str) -> tuple[int, int]:
         """
@@ -117,21 +127,22 @@ class NVEPricingImporter:
             logger.error(f"Error parsing price '{price_str}': {e}")
             return None
 
-    def transform_csv_row(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def transform_csv_row(self, row: List[str], columns: Dict[str, int]) -> Optional[Dict[str, Any]]:
         """
         Transform CSV row to database format
 
         Args:
-            row: Raw CSV row dictionary
+            row: Raw CSV record as a list of fields
+            columns: Header name -> field index map from CSVSource
 
         Returns:
             Transformed row for database insertion or None if invalid
         """
         try:
             # Extract fields from CSV
-            week = row.get('Uke', '').strip()
-            price_str = row.get('Gjennomsnitt Pris (øre/kWh)', '')
-            zone = row.get('Område slicer', '').strip()
+            week = (get_field(row, columns, 'Uke') or '').strip()
+            price_str = get_field(row, columns, 'Gjennomsnitt Pris (øre/kWh)') or ''
+            zone = (get_field(row, columns, 'Område slicer') or '').strip()
 
             # Validate required fields
             if not week or not zone:
@@ -184,33 +195,21 @@ class NVEPricingImporter:
         """
         logger.info(f"Starting NVE pricing import from {csv_path}")
 
-        if not os.path.exists(csv_path):
-            raise FileNotFoundError(f"CSV file not found: {csv_path}")
-
         total_rows = 0
         success_count = 0
         error_count = 0
         batch = []
 
-        # Detect file encoding
-        encoding = 'utf-8-sig'  # Handle BOM if present
-        try:
-            with open(csv_path, 'r', encoding=encoding) as file:
-                # Test if file can be read
-                file.read(100)
-        except UnicodeDecodeError:
-            encoding = 'latin1'  # Fallback encoding
-            logger.info(f"Using fallback encoding: {encoding}")
+        # Encoding (BOM or Latin-1 fallback) and delimiter are detected once by the reader
+        with CSVSource(csv_path) as source:
+            columns = source.columns
 
-        with open(csv_path, 'r', encoding=encoding) as file:
-            reader = csv.DictReader(file)
-
-            for row_num, row in enumerate(reader, 1):
+            for row_num, row in enumerate(source.rows(), 1):
                 total_rows += 1
 
                 try:
                     # Transform row
-                    transformed = self.transform_csv_row(row)
+                    transformed = self.transform_csv_row(row, columns)
                     if transformed:
                         batch.append(transformed)
 
@@ -256,6 +255,11 @@ class NVEPricingImporter:
 
             return len(batch), 0
 
+        except CircuitOpenError as e:
+            # The API is down: single upserts would be rejected the same way
+            logger.error(f"Failed to insert batch of {len(batch)}: {e}")
+            return 0, len(batch)
+
         except Exception as e:
             logger.error(f"Failed to insert batch: {e}")
 
@@ -320,7 +324,8 @@ class NVEPricingImporter:
                 'earliest_data': earliest,
                 'latest_data': latest,
                 'zones_covered': sorted(list(unique_zones)),
-                'zone_count': len(unique_zones)
+                'zone_count': len(unique_zones),
+                'transport': self.transport.stats.summary()
             }
 
         except Exception as e:
@@ -370,9 +375,14 @@ def main():
                        help='Path to NVE CSV file')
     parser.add_argument('--supabase-url', help='Supabase project URL (or set SUPABASE_URL env var)')
     parser.add_argument('--supabase-key', help='Supabase service key (or set SUPABASE_KEY env var)')
-    parser.add_argument('--batch-size', type=int, default=100, help='Batch size for inserts')
+    parser.add_argument('--batch-size', type=int, default=None, help='Batch size for inserts (default 100, or tuned with --use-tuning)')
+    parser.add_argument('--use-tuning', action='store_true', help='Use the batch size from host_tuning.py if --batch-size is not given')
     parser.add_argument('--validate', action='store_true', help='Validate import after completion')
     parser.add_argument('--summary', action='store_true', help='Show import summary')
+    parser.add_argument('--rate-limit', type=float, default=None, help='Max Supabase requests per second')
+    parser.add_argument('--max-retries', type=int, default=5, help='Retries per request on 429/5xx')
+    parser.add_argument('--max-connections', type=int, default=20, help='Pooled keep-alive HTTP connections')
+    parser.add_argument('--circuit-wait', type=float, default=CIRCUIT_WAIT, help='Seconds to wait for an open circuit breaker')
 
     args = parser.parse_args()
 
@@ -392,20 +402,32 @@ def main():
     logger.info(f"Using Supabase URL: {supabase_url}")
     logger.info(f"Using CSV file: {args.csv_path}")
 
+    # Explicit flags win over settings written by host_tuning.py, which are opt-in
+    tuned = load_recommendations('nve') if args.use_tuning else {}
+    batch_size = args.batch_size or tuned.get('batch_size') or 100
+    logger.info(f"Batch size {batch_size}{' (tuned)' if tuned and not args.batch_size else ''}")
+
     try:
         # Initialize importer
         importer = NVEPricingImporter(
             supabase_url=supabase_url,
-            supabase_key=supabase_key
+            supabase_key=supabase_key,
+            transport_options={
+                'rate_limit': args.rate_limit,
+                'max_retries': args.max_retries,
+                'max_connections': args.max_connections,
+                'circuit_wait': args.circuit_wait,
+            }
         )
 
         # Run import
         success_count, error_count = importer.import_from_csv(
             csv_path=args.csv_path,
-            batch_size=args.batch_size
+            batch_size=batch_size
         )
 
         logger.info(f"Import completed: {success_count} success, {error_count} errors")
+        logger.info(f"Transport: {importer.transport.stats.summary()}")
 
         # Validate if requested
         if args.validate:
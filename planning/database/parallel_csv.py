@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Parallel Byte-Range CSV Parsing
+Splits a CSV file into record-aligned byte ranges (see CSVSource.split_ranges)
+and parses + transforms each range in its own process.
+
+Results come back in file order with a bounded number of ranges in flight, so
+the upload stage sees the same sequence as a serial read and row numbers used
+for error reporting stay globally correct.
+
+Usage:
+    for first_row, records, errors in parse_parallel(path, transform, workers=8):
+        upload(records)
+"""
+
+import os
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple, Union
+
+from csv_reader import CSVSource
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_BYTES = 16 * 1024 * 1024
+
+# (records, row_count, [(row number within range, error message)])
+RangeResult = Tuple[List[Any], int, List[Tuple[int, str]]]
+
+
+def parse_range(csv_path: str, encoding: str, delimiter: str, start: int, end: int,
+                transform: Callable[[List[str], Dict[str, int]], Any]) -> RangeResult:
+    """
+    Parse and transform one byte range of a CSV file (runs in a worker process)
+
+    Transform errors are collected per row instead of failing the whole range.
+    A transform returning None is counted as a row but produces no record.
+    """
+    records = []
+    errors = []
+    row_count = 0
+
+    with CSVSource(csv_path, encoding=encoding, delimiter=delimiter) as source:
+        columns = source.columns
+        for row_count, row in enumerate(source.rows(start, end), 1):
+            try:
+                record = transform(row, columns)
+                if record is not None:
+                    records.append(record)
+            except Exception as e:
+                errors.append((row_count, str(e)))
+
+    return records, row_count, errors
+
+
+def parse_parallel(csv_path: Union[str, Path],
+                   transform: Callable[[List[str], Dict[str, int]], Any],
+                   workers: Optional[int] = None,
+                   chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+                   max_pending: Optional[int] = None) -> Iterator[Tuple[int, List[Any], List[Tuple[int, str]]]]:
+    """
+    Parse a CSV file across processes, yielding results in file order
+
+    Args:
+        csv_path: Path to CSV file
+        transform: Picklable callable (row, columns) -> record, run in the workers
+        workers: Worker processes (defaults to the CPU count)
+        chunk_bytes: Target byte size of each range
+        max_pending: Ranges parsed ahead of the consumer (defaults to 2 per worker);
+            bounds memory to roughly max_pending * chunk_bytes of parsed records
+
+    Yields:
+        Tuple of (global row number of the range's first record, records,
+        [(global row number, error message)])
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+
+    with CSVSource(csv_path) as source:
+        encoding = source.encoding
+        delimiter = source.dialect.delimiter
+        ranges = source.split_ranges(chunk_bytes)
+
+    logger.info(f"Parsing {Path(csv_path).name} in {len(ranges)} ranges with {workers} workers")
+
+    next_row = 1
+    pending = deque()
+    remaining = iter(ranges)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        def submit_next() -> bool:
+            byte_range = next(remaining, None)
+            if byte_range is None:
+                return False
+            pending.append(executor.submit(
+                parse_range, str(csv_path), encoding, delimiter, byte_range[0], byte_range[1], transform
+            ))
+            return True
+
+        for _ in range(max_pending):
+            if not submit_next():
+                break
+
+        try:
+            while pending:
+                records, row_count, errors = pending.popleft().result()
+                submit_next()
+
+                first_row = next_row
+                next_row += row_count
+                yield first_row, records, [(first_row + local_row - 1, message) for local_row, message in errors]
+        finally:
+            # Consumer stopped early (e.g. --limit): don't parse ranges nobody will read
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Partitioned Checksum Reconciliation for energy_certificates
+Compares the migration source with Supabase using per-partition row counts and
+order-independent content digests (see 10_reconciliation.sql), then drills
+down Merkle-style only into partitions and buckets that differ:
+
+    1. partition digests (knr or postal code prefix)  - one aggregate query
+    2. bucket digests inside each differing partition - one query per partition
+    3. row hashes of differing buckets only           - paged queries
+
+The result lists the exact certificate_ids that are missing, unexpected,
+duplicated or have different content.
+
+Usage:
+    reconciler = MigrationReconciler(supabase, records=migrator.iter_source_records)
+    report = reconciler.reconcile()
+"""
+
+import math
+import hashlib
+import logging
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from decimal import Context, Decimal, ROUND_HALF_UP
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Must match certificate_row_hash() in 10_reconciliation.sql, in this order
+DIGEST_FIELDS = [
+    'certificate_id', 'knr', 'gnr', 'bnr', 'snr', 'fnr', 'building_number',
+    'address', 'postal_code', 'city', 'building_category', 'construction_year',
+    'energy_class', 'heating_class', 'energy_consumption', 'fossil_percentage',
+]
+FIELD_SEPARATOR = '\x1f'
+DIGEST_MODULUS = 1 << 64
+MAX_BUCKETS = 1024
+# Floats are hashed as round(value::NUMERIC, FLOAT_DECIMALS)::TEXT (certificate_float_text)
+FLOAT_DECIMALS = 6
+FLOAT_QUANTUM = Decimal(1).scaleb(-FLOAT_DECIMALS)
+# Enough digits to quantize any finite float8 without rounding the integer part
+_FLOAT_CONTEXT = Context(prec=400, rounding=ROUND_HALF_UP)
+
+
+def format_float(value: float) -> str:
+    """
+    Render a float like certificate_float_text(): round(value::NUMERIC, 6)::TEXT
+
+    float8 -> NUMERIC goes through 15 significant digits (DBL_DIG) in
+    Postgres, and NUMERIC rounds half away from zero; the fixed number of
+    decimals avoids float8 output's exponent form ('1e+15').
+    """
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return 'Infinity' if value > 0 else '-Infinity'
+    rounded = Decimal('%.15g' % value).quantize(FLOAT_QUANTUM, context=_FLOAT_CONTEXT)
+    # NUMERIC has no negative zero
+    return f"{rounded.copy_abs() if rounded.is_zero() else rounded:f}"
+
+
+def format_value(value: Any) -> str:
+    """
+    Render a value the way 10_reconciliation.sql turns it into TEXT
+
+    None and '' are both '' because _insert_batch drops empty values before
+    insert. Booleans, dates and timestamps follow Postgres' TEXT casts;
+    floats use format_float().
+    """
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float):
+        return format_float(value)
+    if isinstance(value, datetime):
+        # TIMESTAMP::TEXT drops trailing zeros of the fractional seconds
+        text = value.isoformat(sep=' ')
+        return text.rstrip('0') if value.microsecond else text
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def row_hash(record: Dict[str, Any]) -> int:
+    """Signed 64-bit content hash, equal to certificate_row_hash() for the same row"""
+    canonical = FIELD_SEPARATOR.join(format_value(record.get(name)) for name in DIGEST_FIELDS)
+    value = int(hashlib.md5(canonical.encode('utf-8')).hexdigest()[:16], 16)
+    return value - DIGEST_MODULUS if value >= DIGEST_MODULUS // 2 else value
+
+
+def bucket_of(certificate_id: Optional[str], buckets: int) -> int:
+    """Bucket inside a partition, equal to certificate_bucket()"""
+    return int(hashlib.md5((certificate_id or '').encode('utf-8')).hexdigest()[:8], 16) % buckets
+
+
+def partition_key(record: Dict[str, Any], partition: str, prefix_length: int) -> str:
+    """Top-level partition, equal to certificate_partition_key()"""
+    if partition == 'knr':
+        return format_value(record.get('knr'))
+    return (record.get('postal_code') or '')[:prefix_length]
+
+
+class MigrationReconciler:
+    """Reconciles source records with energy_certificates via partitioned digests"""
+
+    def __init__(self, supabase, records: Callable[[], Iterable[Dict[str, Any]]],
+                 partition: str = 'knr', prefix_length: int = 2,
+                 rows_per_bucket: int = 32, page_size: int = 1000):
+        """
+        Initialize reconciler
+
+        Args:
+            supabase: Supabase client with access to the reconcile_* functions
+            records: Callable returning a fresh iterable of transformed source
+                records; it is called at most twice
+            partition: 'knr' or 'postal' (postal code prefix)
+            prefix_length: Postal code prefix length for 'postal' partitioning
+            rows_per_bucket: Target rows per level-2 bucket
+            page_size: Rows per request (keep at or below PostgREST max-rows)
+        """
+        if partition not in ('knr', 'postal'):
+            raise ValueError(f"Unknown partition scheme: {partition}")
+        self.supabase = supabase
+        self.records = records
+        self.partition = partition
+        self.prefix_length = prefix_length
+        self.rows_per_bucket = rows_per_bucket
+        self.page_size = page_size
+        self.query_count = 0
+
+    def _rpc(self, function: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Call a reconcile_* function, paging past PostgREST's max-rows limit"""
+        rows = []
+        start = 0
+        while True:
+            self.query_count += 1
+            page = self.supabase.rpc(function, params).range(start, start + self.page_size - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < self.page_size:
+                return rows
+            start += self.page_size
+
+    def _partition_params(self) -> Dict[str, Any]:
+        return {'p_partition': self.partition, 'p_prefix_length': self.prefix_length}
+
+    def _bucket_count(self, local_count: int, remote_count: int) -> int:
+        return max(1, min(MAX_BUCKETS, max(local_count, remote_count) // self.rows_per_bucket))
+
+    def _local_partitions(self) -> Dict[str, List[int]]:
+        """First pass over the source: {partition: [row_count, digest]}"""
+        partitions: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        for record in self.records():
+            entry = partitions[partition_key(record, self.partition, self.prefix_length)]
+            entry[0] += 1
+            entry[1] = (entry[1] + row_hash(record)) % DIGEST_MODULUS
+        return dict(partitions)
+
+    def _remote_partitions(self) -> Dict[str, List[int]]:
+        rows = self._rpc('reconcile_partition_digests', self._partition_params())
+        return {row['partition_key']: [row['row_count'], int(row['digest'])] for row in rows}
+
+    def _local_rows(self, bucket_counts: Dict[str, int]) -> Dict[str, List[Tuple[int, str, int]]]:
+        """Second pass: (bucket, certificate_id, row_hash) for rows in differing partitions"""
+        rows = defaultdict(list)
+        for record in self.records():
+            key = partition_key(record, self.partition, self.prefix_length)
+            buckets = bucket_counts.get(key)
+            if buckets is not None:
+                certificate_id = record.get('certificate_id')
+                rows[key].append((bucket_of(certificate_id, buckets), certificate_id, row_hash(record)))
+        return rows
+
+    def _remote_buckets(self, key: str, buckets: int) -> Dict[int, List[int]]:
+        rows = self._rpc('reconcile_bucket_digests',
+                         dict(self._partition_params(), p_partition_key=key, p_buckets=buckets))
+        return {row['bucket']: [row['row_count'], int(row['digest'])] for row in rows}
+
+    def _remote_rows(self, key: str, buckets: int, bucket_list: List[int]) -> List[Tuple[str, int]]:
+        rows = self._rpc('reconcile_bucket_rows',
+                         dict(self._partition_params(), p_partition_key=key, p_buckets=buckets,
+                              p_bucket_list=bucket_list))
+        return [(row['certificate_id'], row['row_hash']) for row in rows]
+
+    @staticmethod
+    def _diff_rows(local: List[Tuple[str, int]], remote: List[Tuple[str, int]],
+                   report: Dict[str, Any]):
+        """Classify differences between two multisets of (certificate_id, row_hash)"""
+        local_by_id = defaultdict(Counter)
+        remote_by_id = defaultdict(Counter)
+        for certificate_id, hash_value in local:
+            local_by_id[certificate_id][hash_value] += 1
+        for certificate_id, hash_value in remote:
+            remote_by_id[certificate_id][hash_value] += 1
+
+        for certificate_id in set(local_by_id) | set(remote_by_id):
+            local_hashes = local_by_id.get(certificate_id, Counter())
+            remote_hashes = remote_by_id.get(certificate_id, Counter())
+            if local_hashes == remote_hashes:
+                continue
+            if not remote_hashes:
+                report['missing_in_database'].append(certificate_id)
+            elif not local_hashes:
+                report['unexpected_in_database'].append(certificate_id)
+            elif sum(remote_hashes.values()) > sum(local_hashes.values()):
+                report['duplicated_in_database'].append(certificate_id)
+            else:
+                report['content_mismatch'].append(certificate_id)
+
+    def reconcile(self) -> Dict[str, Any]:
+        """
+        Run the reconciliation
+
+        Returns:
+            Report dictionary with totals, mismatched partitions and the
+            certificate_ids in each mismatch category
+        """
+        local_partitions = self._local_partitions()
+        remote_partitions = self._remote_partitions()
+
+        report = {
+            'partition_scheme': self.partition,
+            'partitions_checked': len(set(local_partitions) | set(remote_partitions)),
+            'source_rows': sum(count for count, _ in local_partitions.values()),
+            'database_rows': sum(count for count, _ in remote_partitions.values()),
+            'mismatched_partitions': [],
+            'missing_in_database': [],
+            'unexpected_in_database': [],
+            'duplicated_in_database': [],
+            'content_mismatch': [],
+        }
+
+        mismatched = sorted(key for key in set(local_partitions) | set(remote_partitions)
+                            if local_partitions.get(key) != remote_partitions.get(key))
+        report['mismatched_partitions'] = mismatched
+        logger.info(f"{len(mismatched)} of {report['partitions_checked']} partitions differ")
+
+        if mismatched:
+            bucket_counts = {
+                key: self._bucket_count(local_partitions.get(key, [0])[0], remote_partitions.get(key, [0])[0])
+                for key in mismatched
+            }
+            local_rows = self._local_rows(bucket_counts)
+
+            for key in mismatched:
+                buckets = bucket_counts[key]
+                rows = local_rows.get(key, [])
+
+                local_buckets: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+                for bucket, _, hash_value in rows:
+                    local_buckets[bucket][0] += 1
+                    local_buckets[bucket][1] = (local_buckets[bucket][1] + hash_value) % DIGEST_MODULUS
+
+                # A partition missing on one side needs no bucket comparison
+                if key in remote_partitions and key in local_partitions:
+                    remote_buckets = self._remote_buckets(key, buckets)
+                    differing = sorted(bucket for bucket in set(local_buckets) | set(remote_buckets)
+                                       if local_buckets.get(bucket) != remote_buckets.get(bucket))
+                else:
+                    differing = sorted(local_buckets) if key in local_partitions else list(range(buckets))
+
+                differing_set = set(differing)
+                local = [(certificate_id, hash_value) for bucket, certificate_id, hash_value in rows
+                         if bucket in differing_set]
+                remote = self._remote_rows(key, buckets, differing) if key in remote_partitions else []
+                self._diff_rows(local, remote, report)
+
+        for category in ('missing_in_database', 'unexpected_in_database',
+                         'duplicated_in_database', 'content_mismatch'):
+            report[category].sort(key=lambda value: value or '')
+        report['query_count'] = self.query_count
+        return report
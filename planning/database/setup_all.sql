@@ -24,7 +24,8 @@ CREATE EXTENSION IF NOT EXISTS unaccent;
 -- DROP TABLE IF EXISTS user_searches CASCADE;
 -- DROP TABLE IF EXISTS energy_certificates CASCADE;
 -- DROP TABLE IF EXISTS audit_log CASCADE;
--- DROP MATERIALIZED VIEW IF EXISTS mv_daily_stats CASCADE;
+-- DROP TABLE IF EXISTS daily_search_stats CASCADE;
+-- DROP TABLE IF EXISTS current_certificates CASCADE;
 
 -- ============================================
 -- STEP 3: TABLES (from 01_tables.sql)
@@ -234,7 +235,20 @@ GRANT INSERT ON conversion_events TO anon;
 GRANT USAGE, SELECT ON ALL SEQUENCES IN SCHEMA public TO anon;
 
 -- ============================================
--- STEP 10: INITIAL DATA (Optional)
+-- STEP 10: ROLLUPS AND MIGRATION SUPPORT
+-- ============================================
+
+-- Incremental daily search stats (replaces mv_daily_stats)
+\i 09_daily_stats_rollup.sql
+
+-- Checksum reconciliation used by migration_script.py --verify-mode checksum
+\i 10_reconciliation.sql
+
+-- Latest certificate per building and address
+\i 11_current_certificates.sql
+
+-- ============================================
+-- STEP 11: INITIAL DATA (Optional)
 -- ============================================
 
 -- Add test data or initial configuration here if needed
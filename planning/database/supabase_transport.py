@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Resilient HTTP Transport for Supabase Calls
+Builds a Supabase client on a pooled, keep-alive httpx transport that adds:
+
+    - jittered exponential backoff for retryable statuses (honours Retry-After)
+    - a token-bucket rate limiter shared by all requests
+    - a circuit breaker that holds requests back while the API keeps erroring,
+      releasing them once a trial request succeeds (fails after circuit_wait)
+    - retry and latency statistics for the run summary
+
+Plain inserts are only retried when the server cannot have applied them
+(429, 503, connection failures); reads and upserts are retried on any
+retryable status because repeating them is harmless.
+
+Usage:
+    supabase, transport = create_supabase_client(url, key, rate_limit=20)
+    ...
+    logger.info(transport.stats.summary())
+"""
+
+import sys
+import time
+import random
+import threading
+import importlib.util
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+
+# Try to import required packages
+try:
+    import httpx
+    from supabase import create_client, Client
+    from supabase.lib.client_options import SyncClientOptions
+except ImportError:
+    print("Please install supabase-py: pip install supabase")
+    sys.exit(1)
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# Statuses where the request was rejected before any write happened
+NOT_APPLIED_STATUSES = {429, 503}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+CIRCUIT_POLL_INTERVAL = 0.1  # seconds
+CIRCUIT_WAIT = 300.0  # seconds
+# Latencies kept for percentiles; a uniform sample once more requests are made
+LATENCY_SAMPLE_SIZE = 10000
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised when the circuit breaker stays open for longer than circuit_wait"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second with bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects requests
+    for `reset_timeout` seconds, then lets one trial request through (half-open)
+    """
+
+    def __init__(self, failure_threshold: int = 10, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def wait_time(self) -> float:
+        """Seconds until allow() may succeed again (0 while closed)"""
+        with self.lock:
+            if self.opened_at is None:
+                return 0.0
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            # Past the timeout with a trial in flight: poll for its outcome
+            return max(remaining, CIRCUIT_POLL_INTERVAL)
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if this failure opened the circuit"""
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                newly_opened = self.opened_at is None
+                self.opened_at = time.monotonic()
+                return newly_opened
+            return False
+
+
+class TransportStats:
+    """
+    Counters and latencies collected by ResilientTransport
+
+    Latencies are a reservoir sample of at most LATENCY_SAMPLE_SIZE
+    attempts, so memory stays flat over multi-million-row migrations.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected_by_circuit = 0
+        self.circuit_opened = 0
+        self.circuit_wait_s = 0.0
+        self.rate_limit_wait_s = 0.0
+        self.backoff_wait_s = 0.0
+        self.status_counts: Dict[int, int] = {}
+        self.retries_by_reason: Dict[str, int] = {}
+        self.latencies_ms: List[float] = []
+        self.latency_count = 0
+        self.latency_max_ms: Optional[float] = None
+        self._sampler = random.Random(0)
+        self.lock = threading.Lock()
+
+    def record_latency(self, elapsed_ms: float):
+        """Add one attempt's latency to the reservoir (call with lock held)"""
+        self.latency_count += 1
+        if self.latency_max_ms is None or elapsed_ms > self.latency_max_ms:
+            self.latency_max_ms = elapsed_ms
+        if len(self.latencies_ms) < LATENCY_SAMPLE_SIZE:
+            self.latencies_ms.append(elapsed_ms)
+        else:
+            slot = self._sampler.randrange(self.latency_count)
+            if slot < LATENCY_SAMPLE_SIZE:
+                self.latencies_ms[slot] = elapsed_ms
+
+    @staticmethod
+    def _percentile(values: List[float], fraction: float) -> Optional[float]:
+        if not values:
+            return None
+        ordered = sorted(values)
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 1)
+
+    def summary(self) -> Dict[str, Any]:
+        """Snapshot suitable for logging or the import summary"""
+        with self.lock:
+            latencies = list(self.latencies_ms)
+            return {
+                'requests': self.requests,
+                'attempts': self.attempts,
+                'retries': self.retries,
+                'failures': self.failures,
+                'retries_by_reason': dict(self.retries_by_reason),
+                'status_counts': dict(self.status_counts),
+                'circuit_opened': self.circuit_opened,
+                'rejected_by_circuit': self.rejected_by_circuit,
+                'circuit_wait_s': round(self.circuit_wait_s, 2),
+                'rate_limit_wait_s': round(self.rate_limit_wait_s, 2),
+                'backoff_wait_s': round(self.backoff_wait_s, 2),
+                'latency_ms_p50': self._percentile(latencies, 0.50),
+                'latency_ms_p95': self._percentile(latencies, 0.95),
+                'latency_ms_max': round(self.latency_max_ms, 1) if self.latency_max_ms is not None else None,
+            }
+
+
+class ResilientTransport(httpx.BaseTransport):
+    """httpx transport adding rate limiting, retries and a circuit breaker to a pooled transport"""
+
+    def __init__(self, max_connections: int = 20, keepalive_expiry: float = 30.0,
+                 max_retries: int = 5, backoff_base: float = 0.5, backoff_cap: float = 30.0,
+                 rate_limit: Optional[float] = None, burst: Optional[float] = None,
+                 failure_threshold: int = 10, reset_timeout: float = 30.0,
+                 circuit_wait: float = CIRCUIT_WAIT, inner: Optional[httpx.BaseTransport] = None):
+        """
+        Args:
+            max_connections: Pooled connections (all kept alive between requests)
+            keepalive_expiry: Seconds an idle connection stays open
+            max_retries: Retries per request after the first attempt
+            backoff_base: First backoff ceiling in seconds, doubled per retry
+            backoff_cap: Largest backoff ceiling in seconds
+            rate_limit: Requests per second across all threads (None = unlimited)
+            burst: Token bucket capacity (defaults to one second of requests)
+            failure_threshold: Consecutive failed requests that open the circuit
+            reset_timeout: Seconds the circuit stays open before a trial request
+            circuit_wait: Seconds a request waits for an open circuit to close
+                before CircuitOpenError (0 fails fast)
+            inner: Transport to wrap (defaults to a pooled httpx.HTTPTransport)
+        """
+        self.inner = inner or httpx.HTTPTransport(
+            http2=importlib.util.find_spec('h2') is not None,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.bucket = TokenBucket(rate_limit, burst) if rate_limit else None
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.circuit_wait = circuit_wait
+        self.stats = TransportStats()
+
+    @staticmethod
+    def _is_replay_safe(request: httpx.Request) -> bool:
+        """True if sending the request twice cannot write twice"""
+        if request.method in IDEMPOTENT_METHODS:
+            return True
+        # PostgREST upserts: repeating them converges to the same row
+        return 'resolution=' in request.headers.get('prefer', '')
+
+    def _retry_reason(self, request: httpx.Request, response: Optional[httpx.Response],
+                      error: Optional[Exception]) -> Optional[str]:
+        """Why this attempt should be retried, or None"""
+        if error is not None:
+            if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+                return type(error).__name__
+            # The request may have reached the server
+            return type(error).__name__ if self._is_replay_safe(request) else None
+        if response.status_code in NOT_APPLIED_STATUSES:
+            return str(response.status_code)
+        if response.status_code in RETRYABLE_STATUSES and self._is_replay_safe(request):
+            return str(response.status_code)
+        return None
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Full-jitter exponential backoff, never shorter than Retry-After"""
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+        if response is not None:
+            retry_after = response.headers.get('retry-after')
+            if retry_after:
+                try:
+                    delay = max(delay, min(float(retry_after), self.backoff_cap))
+                except ValueError:
+                    pass
+        return delay
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        stats = self.stats
+        with stats.lock:
+            stats.requests += 1
+
+        # Hold the request while the circuit is open instead of failing it
+        waited = 0.0
+        while not self.breaker.allow():
+            delay = self.breaker.wait_time()
+            if waited + delay > self.circuit_wait:
+                with stats.lock:
+                    stats.rejected_by_circuit += 1
+                    stats.circuit_wait_s += waited
+                raise CircuitOpenError(f"Circuit open for {waited:.0f}s, not sending "
+                                       f"{request.method} {request.url.path}")
+            time.sleep(delay)
+            waited += delay
+        if waited:
+            with stats.lock:
+                stats.circuit_wait_s += waited
+
+        # Make the body replayable across attempts
+        request.read()
+
+        attempt = 0
+        while True:
+            if self.bucket:
+                waited = self.bucket.acquire()
+                with stats.lock:
+                    stats.rate_limit_wait_s += waited
+
+            response = None
+            error = None
+            started = time.perf_counter()
+            try:
+                response = self.inner.handle_request(request)
+            except httpx.TransportError as e:
+                error = e
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            with stats.lock:
+                stats.attempts += 1
+                stats.record_latency(elapsed_ms)
+                if response is not None:
+                    stats.status_counts[response.status_code] = stats.status_counts.get(response.status_code, 0) + 1
+
+            reason = self._retry_reason(request, response, error)
+            if reason is None or attempt >= self.max_retries:
+                failed = error is not None or response.status_code in RETRYABLE_STATUSES
+                if failed:
+                    with stats.lock:
+                        stats.failures += 1
+                    if self.breaker.record_failure():
+                        with stats.lock:
+                            stats.circuit_opened += 1
+                        logger.warning(f"Circuit opened after {self.breaker.failures} consecutive failures")
+                else:
+                    self.breaker.record_success()
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self._backoff(attempt, response)
+            if response is not None:
+                response.close()
+            with stats.lock:
+                stats.retries += 1
+                stats.retries_by_reason[reason] = stats.retries_by_reason.get(reason, 0) + 1
+                stats.backoff_wait_s += delay
+            logger.debug(f"Retrying {request.method} {request.url.path} after {reason} in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        self.inner.close()
+
+
+def create_supabase_client(supabase_url: str, supabase_key: str, timeout: float = 120.0,
+                           **transport_options) -> Tuple[Client, ResilientTransport]:
+    """
+    Create a Supabase client whose requests all go through one ResilientTransport
+
+    Args:
+        supabase_url: Supabase project URL
+        supabase_key: Supabase anon/service key
+        timeout: Per-attempt request timeout in seconds
+        **transport_options: Passed to ResilientTransport
+
+    Returns:
+        Tuple of (client, transport); read transport.stats for the run summary
+    """
+    transport = ResilientTransport(**transport_options)
+    http_client = httpx.Client(transport=transport, timeout=timeout, follow_redirects=True)
+    client = create_client(supabase_url, supabase_key, options=SyncClientOptions(httpx_client=http_client))
+    return client, transport
@@ -0,0 +1,89 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The import scripts import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class StubResult:
+    def __init__(self, data=None, count=None):
+        self.data = data or []
+        self.count = count
+
+
+class StubQuery:
+    """One supabase-py query chain; records its steps and runs on execute()"""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.steps = []
+
+    def __getattr__(self, name):
+        def step(*args, **kwargs):
+            self.steps.append((name, args, kwargs))
+            return self
+        return step
+
+    def execute(self):
+        method, args, _ = self.steps[0]
+        payload = args[0] if args else None
+        rows = payload if isinstance(payload, list) else [payload]
+        self.client.calls.append((self.table, method, self.steps))
+        if method in ('insert', 'upsert'):
+            if any(row.get('certificate_id') in self.client.fail_ids for row in rows):
+                raise RuntimeError('rejected by stub')
+            self.client.rows.setdefault(self.table, []).extend(rows)
+            return StubResult(rows)
+        if method == 'delete':
+            return StubResult(count=0)
+        return StubResult()
+
+
+class StubClient:
+    """Supabase client stand-in; inserts of certificate_ids in fail_ids raise"""
+
+    def __init__(self):
+        self.calls = []
+        self.rows = {}
+        self.fail_ids = set()
+
+    def table(self, name):
+        return StubQuery(self, name)
+
+    def rpc(self, name, params=None):
+        query = StubQuery(self, name)
+        query.steps.append(('rpc', (params,), {}))
+        return query
+
+    def methods(self, table):
+        return [method for name, method, _ in self.calls if name == table]
+
+
+@pytest.fixture
+def stub_client():
+    return StubClient()
+
+
+@pytest.fixture
+def enova_data(tmp_path):
+    """production_data folder with a synthetic Enova CSV and SQLite lookup"""
+    from fake_postgrest_harness import LoadHarness
+
+    def generate(rows=300):
+        return LoadHarness(tmp_path).generate_enova_data(rows)
+    return generate
+
+
+@pytest.fixture
+def make_migrator(monkeypatch, stub_client, enova_data):
+    """Build an EnovaDataMigrator (or subclass) talking to stub_client"""
+    import migration_script
+
+    monkeypatch.setattr(migration_script, 'create_supabase_client', lambda *args, **kwargs: (stub_client, None))
+
+    def build(cls=migration_script.EnovaDataMigrator, rows=300, data_path=None, **kwargs):
+        return cls('http://stub', 'stub-key', str(data_path or enova_data(rows)), **kwargs)
+    return build
@@ -0,0 +1,131 @@
+import os
+
+import pytest
+
+import address_index
+from address_index import AddressIndex, normalize, similarity
+
+STREETS = ['Storgata', 'Stortingsgata', 'Storgate', 'Kirkegata', 'Kirkeveien', 'Kongens gate',
+           'Dronningens gate', 'Øvre Slottsgate', 'Ovre Slottsgate', 'Ågata', 'Bgata', 'Åsveien', 'Gata']
+
+
+def record(i, address, postal_code='0155', city='OSLO'):
+    return {'certificate_id': f'C-{i:04d}', 'address': address, 'postal_code': postal_code, 'city': city,
+            'building_number': str(1000 + i), 'energy_class': 'ABCDEFG'[i % 7], 'energy_consumption': 100.0 + i}
+
+
+def records():
+    rows = [record(i, f'{street} {number}', postal_code=f'{7000 + j * 10}', city='TRONDHEIM' if j % 2 else 'OSLO')
+            for i, (j, street, number) in enumerate((j, street, number) for j, street in enumerate(STREETS)
+                                                   for number in (1, 2, 10, 12, 21))]
+    # Same address twice, and one that differs only in case
+    rows.append(record(len(rows), 'Storgata 1', postal_code='7000'))
+    rows.append(record(len(rows), 'STORGATA 1', postal_code='7000'))
+    rows.append(record(len(rows), 'Nedre gata 3', postal_code='5003', city='BERGEN'))
+    return rows
+
+
+@pytest.fixture(scope='module')
+def index(tmp_path_factory):
+    index = AddressIndex.build(records(), tmp_path_factory.mktemp('address_index') / 'index.db')
+    yield index
+    index.close()
+
+
+def reference_search(query, limit_count=10, min_similarity=0.3):
+    """search_addresses() from 04_functions.sql evaluated over every row"""
+    query = normalize(query)
+    scored = [(similarity(normalize(row['address']), query), row) for row in records()]
+    # % operator (pg_trgm.similarity_threshold = 0.3) AND similarity >= min_similarity
+    matches = [(value, row) for value, row in scored if value >= 0.3 and value >= min_similarity]
+    matches.sort(key=lambda match: (-match[0], match[1]['address']))
+    return [(row['address'], row['certificate_id'], value) for value, row in matches[:limit_count]]
+
+
+def search(index, query, **kwargs):
+    return [(row['address'], row['certificate_id'], row['similarity_score'])
+            for row in index.search_addresses(query, **kwargs)]
+
+
+def test_similarity_matches_pg_trgm():
+    # Values from the pg_trgm documentation and SELECT similarity(...) in Postgres
+    assert similarity('word', 'two words') == pytest.approx(0.36363637)
+    assert similarity('storgata 1', 'storgata 1') == 1.0
+    assert similarity('abc', 'xyz') == 0.0
+    assert similarity('', 'storgata') == 0.0
+
+
+@pytest.fixture
+def every_trigram(monkeypatch):
+    # Candidates from every query trigram, so results depend only on scoring, threshold and order
+    monkeypatch.setattr(address_index, 'RARE_TRIGRAMS', 1000)
+
+
+@pytest.mark.parametrize('query', ['storgata 1', 'Storgata', 'kirke gata 12', 'øvre slottsgate', 'gata 1',
+                                   'dronning', 'xyz'])
+@pytest.mark.parametrize('limit_count', [3, 10, 50])
+def test_search_matches_postgres_function(index, every_trigram, query, limit_count):
+    assert search(index, query, limit_count=limit_count) == reference_search(query, limit_count)
+
+
+def test_default_candidates_find_the_top_results(index):
+    assert search(index, 'storgata 1') == reference_search('storgata 1')
+
+
+def test_ties_are_ordered_by_address(index, every_trigram):
+    # 'Bgata 1' and 'Ågata 1' score the same; Postgres orders ties by address, not by the normalized text
+    results = [address for address, _, value in search(index, 'gata 1', limit_count=50) if value == 0.5]
+    assert results.index('Bgata 1') < results.index('Ågata 1')
+    assert results == sorted(results)
+
+
+def test_threshold_never_drops_below_pg_trgm_default(index, every_trigram):
+    assert search(index, 'storgata 1', limit_count=100, min_similarity=0.1) == reference_search('storgata 1', 100)
+    assert all(value >= 0.3 for _, _, value in search(index, 'kirkegata', limit_count=100, min_similarity=0.0))
+    strict = search(index, 'storgata 1', limit_count=100, min_similarity=0.6)
+    assert strict and all(value >= 0.6 for _, _, value in strict)
+
+
+def test_autocomplete_starts_with_prefix_first(index):
+    addresses = [row['address'] for row in index.autocomplete('storg', limit_count=8)]
+    # Starts-with matches, by normalized text then address
+    assert addresses[:7] == ['STORGATA 1', 'Storgata 1', 'Storgata 1', 'Storgata 10', 'Storgata 12',
+                             'Storgata 2', 'Storgata 21']
+    assert addresses[7].startswith('Storgate')
+
+
+def test_autocomplete_word_prefixes_without_starts_with_match(index):
+    # Nothing starts with '12 storg', so the prefix index is queried with an empty NOT IN list
+    rows = index.autocomplete('12 storg', limit_count=10)
+    assert sorted(row['address'] for row in rows) == ['Storgata 12', 'Storgate 12']
+
+    rows = index.autocomplete('kirk 2 trondheim', limit_count=10)
+    assert {row['address'] for row in rows} == {'Kirkegata 2', 'Kirkegata 21'}
+
+
+def test_autocomplete_does_not_repeat_starts_with_rows(index):
+    # The prefix index matches the five 'Gata ...' rows again, plus 'Nedre gata 3'
+    rows = index.autocomplete('gata', limit_count=20)
+    ids = [row['certificate_id'] for row in rows]
+    assert len(ids) == len(set(ids)) == 6
+    assert [row['address'] for row in rows] == ['Gata 1', 'Gata 10', 'Gata 12', 'Gata 2', 'Gata 21', 'Nedre gata 3']
+
+    # A full starts-with page skips the prefix index
+    rows = index.autocomplete('gata', limit_count=3)
+    assert [row['address'] for row in rows] == ['Gata 1', 'Gata 10', 'Gata 12']
+
+
+def test_index_is_rebuilt_when_csv_content_changes(tmp_path):
+    csv_file = tmp_path / 'enova_energimerker_2024.csv'
+    csv_file.write_text('address\nStorgata 1\n', encoding='utf-8')
+    path = tmp_path / 'index.db'
+    assert not AddressIndex.is_current(path, csv_file)
+
+    AddressIndex.build(records(), path, source=AddressIndex.source_signature(csv_file)).close()
+    assert AddressIndex.is_current(path, csv_file)
+
+    # Same size and mtime, different content
+    stat = csv_file.stat()
+    csv_file.write_text('address\nStorgata 2\n', encoding='utf-8')
+    os.utime(csv_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert not AddressIndex.is_current(path, csv_file)
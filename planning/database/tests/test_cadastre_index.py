@@ -0,0 +1,115 @@
+import pytest
+
+from cadastre_index import KEY_FIELDS, KEY_LIMITS, CadastreIndex, pack_key, prefix_bounds, unpack_key
+from columnar_cache import ColumnarCache, ColumnarCacheWriter
+
+
+@pytest.mark.parametrize('identity', [
+    (1, 0, 0, 0, 0),
+    (301, 12, 345, 4, 2),
+    tuple(KEY_LIMITS[name] for name in KEY_FIELDS),
+    (KEY_LIMITS['knr'], 0, KEY_LIMITS['bnr'], 0, KEY_LIMITS['fnr']),
+])
+def test_pack_key_round_trips(identity):
+    assert unpack_key(pack_key(*identity)) == identity
+
+
+def test_pack_key_orders_like_tuples_and_treats_none_as_zero():
+    identities = [(301, 12, 345, 0, 0), (301, 12, 345, 0, 1), (301, 12, 345, 1, 0),
+                  (301, 12, 346, 0, 0), (301, 13, 0, 0, 0), (302, 0, 0, 0, 0)]
+    keys = [pack_key(*identity) for identity in identities]
+    assert keys == sorted(keys) and len(set(keys)) == len(keys)
+    assert pack_key(301, 12, 345) == pack_key(301, 12, 345, None, None) == pack_key(301, 12, 345, 0, 0)
+
+
+@pytest.mark.parametrize('name', KEY_FIELDS)
+def test_pack_key_rejects_values_outside_their_bits(name):
+    identity = dict.fromkeys(KEY_FIELDS, 1)
+    identity[name] = KEY_LIMITS[name] + 1
+    with pytest.raises(ValueError, match=name):
+        pack_key(*identity.values())
+    identity[name] = -1
+    with pytest.raises(ValueError, match=name):
+        pack_key(*identity.values())
+    with pytest.raises(ValueError):
+        pack_key(1, 2, 3, 4, 5, 6)
+
+
+def test_prefix_bounds_cover_exactly_the_prefix():
+    low, high = prefix_bounds(301, 12, 345)
+    assert unpack_key(low) == (301, 12, 345, 0, 0)
+    assert unpack_key(high) == (301, 12, 345, KEY_LIMITS['snr'], KEY_LIMITS['fnr'])
+    assert high + 1 == pack_key(301, 12, 346)
+
+    low, high = prefix_bounds(301)
+    assert unpack_key(high) == (301,) + tuple(KEY_LIMITS[name] for name in KEY_FIELDS[1:])
+    assert high + 1 == pack_key(302)
+    assert prefix_bounds(301, 12, 345, 4, 2) == (pack_key(301, 12, 345, 4, 2),) * 2
+    assert prefix_bounds() == (0, (1 << 64) - 1)
+
+
+IDENTITIES = [
+    (301, 12, 345, None, None),
+    (301, 12, 345, 4, None),
+    (301, 12, 345, 4, 2),
+    (301, 12, 345, 4, None),     # second certificate for the same unit
+    (301, 12, 346, None, None),
+    (301, 13, 1, None, None),
+    (4601, 12, 345, None, None),
+    (None, 12, 345, None, None),  # no knr
+    (301, 12, 345, 1024, None),  # snr too large
+    (301, 12, 345, 1, 512),      # fnr too large
+    (301, 12, 345, 1023, 511),   # largest values that fit
+]
+
+
+@pytest.fixture
+def cadastre(tmp_path):
+    writer = ColumnarCacheWriter(['certificate_id'] + KEY_FIELDS)
+    for i, identity in enumerate(IDENTITIES):
+        writer.append(dict(zip(KEY_FIELDS, identity), certificate_id=f'C-{i}'))
+    writer.write(tmp_path, {})
+    cache = ColumnarCache(tmp_path)
+    return cache, CadastreIndex.build(cache)
+
+
+def test_build_counts_skipped_rows_per_field(cadastre):
+    _, index = cadastre
+    assert len(index) == 8
+    assert index.manifest['skipped_no_knr'] == 1
+    assert index.manifest['skipped_out_of_range'] == 2
+    assert index.manifest['out_of_range_by_field'] == {'snr': 1, 'fnr': 1}
+
+
+def test_lookup_units_and_range(cadastre):
+    cache, index = cadastre
+
+    def ids(rows):
+        return index.certificate_ids(cache, rows)
+
+    assert ids(index.lookup(301, 12, 345)) == ['C-0']
+    # Same identity keeps file order
+    assert ids(index.lookup(301, 12, 345, 4)) == ['C-1', 'C-3']
+    assert ids(index.lookup(301, 12, 345, 4, 2)) == ['C-2']
+    assert ids(index.lookup(301, 12, 345, 1023, 511)) == ['C-10']
+    assert ids(index.lookup(301, 12, 347)) == []
+
+    assert ids(index.units(301, 12, 345)) == ['C-0', 'C-1', 'C-3', 'C-2', 'C-10']
+    assert ids(index.range(301, 12)) == ['C-0', 'C-1', 'C-3', 'C-2', 'C-10', 'C-4']
+    assert ids(index.range(301)) == ['C-0', 'C-1', 'C-3', 'C-2', 'C-10', 'C-4', 'C-5']
+    assert ids(index.range(4601)) == ['C-6']
+
+    keys, rows = index.entries(*prefix_bounds(301, 12, 345))
+    assert [unpack_key(key) for key in keys.tolist()] == [
+        (301, 12, 345, 0, 0), (301, 12, 345, 4, 0), (301, 12, 345, 4, 0),
+        (301, 12, 345, 4, 2), (301, 12, 345, 1023, 511)]
+    assert ids(rows) == ids(index.units(301, 12, 345))
+
+
+def test_lookup_many_matches_single_lookups(cadastre):
+    _, index = cadastre
+    identities = [(301, 12, 345, 4, 0), (301, 12, 346, 0, 0), (301, 12, 345, 1024, 0), (9, 9, 9, 9, 9)]
+    results = index.lookup_many(identities)
+    assert [rows.tolist() for rows in results[:2]] == [index.lookup(*identities[0]).tolist(),
+                                                       index.lookup(*identities[1]).tolist()]
+    assert [len(rows) for rows in results[2:]] == [0, 0]
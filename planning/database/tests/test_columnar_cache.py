@@ -0,0 +1,73 @@
+import os
+
+from columnar_cache import ColumnarCache, ColumnarCacheWriter
+from csv_reader import CSVSource
+from migration_script import EnovaDataMigrator
+
+
+def build_cache(data_path):
+    csv_file = data_path / 'enova_energimerker_2024.csv'
+    return csv_file, ColumnarCache.build(csv_file, EnovaDataMigrator.record_transformer())
+
+
+def null_sentinels(record):
+    # Integer columns store NULL as 0, so a parsed 0 reads back as None
+    return {name: None if type(value) is int and value == 0 else value for name, value in record.items()}
+
+
+def test_records_round_trip_through_cache(enova_data):
+    csv_file, cache = build_cache(enova_data(1200))
+    transform = EnovaDataMigrator.record_transformer()
+    with CSVSource(csv_file) as source:
+        expected = [transform(row, source.columns) for row in source.rows()]
+
+    records = [record for batch in cache.iter_records(batch_size=500) for record in batch]
+    assert cache.row_count == len(expected) == 1200
+    assert [null_sentinels(record) for record in records] == [null_sentinels(record) for record in expected]
+    assert [len(batch) for batch in cache.iter_records(batch_size=500, limit=700)] == [500, 200]
+
+
+def test_cache_is_rebuilt_when_csv_changes(enova_data):
+    csv_file, cache = build_cache(enova_data(100))
+    assert ColumnarCache.open_if_valid(csv_file) is not None
+
+    # Same size and mtime, different content: caught by the sample hash
+    stat = csv_file.stat()
+    data = csv_file.read_bytes()
+    csv_file.write_bytes(data[:-3] + b'999')
+    os.utime(csv_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert ColumnarCache.open_if_valid(csv_file) is None
+
+
+def test_large_integers_and_nulls(tmp_path):
+    records = [
+        {'knr': 2 ** 40, 'energy_consumption': None, 'has_energy_evaluation': True, 'address': 'Gate 1'},
+        {'knr': None, 'energy_consumption': 1.5, 'has_energy_evaluation': False, 'address': None},
+        {'knr': 2 ** 70, 'energy_consumption': 0.0, 'has_energy_evaluation': False, 'address': 'Gate 1'},
+    ]
+    writer = ColumnarCacheWriter(list(records[0]))
+    for record in records:
+        writer.append(record)
+    writer.write(tmp_path, {})
+    assert writer.overflow_count == 1
+
+    cache = ColumnarCache(tmp_path)
+    assert cache.manifest['types']['knr'] == 'int64'
+    assert next(cache.iter_records()) == [
+        {'knr': 2 ** 40, 'energy_consumption': None, 'has_energy_evaluation': True, 'address': 'Gate 1'},
+        {'knr': None, 'energy_consumption': 1.5, 'has_energy_evaluation': False, 'address': None},
+        {'knr': None, 'energy_consumption': 0.0, 'has_energy_evaluation': False, 'address': 'Gate 1'},
+    ]
+
+
+def test_dictionary_decodes_only_requested_codes(tmp_path):
+    writer = ColumnarCacheWriter(['certificate_id', 'city'])
+    for i in range(5000):
+        writer.append({'certificate_id': f'ID-{i}', 'city': 'Tromsø' if i % 3 else None})
+    writer.write(tmp_path, {})
+
+    cache = ColumnarCache(tmp_path)
+    column = cache.column('certificate_id')
+    assert column.tolist(4998) == ['ID-4998', 'ID-4999']
+    assert column.decode([7, -1, 7]) == ['ID-7', None, 'ID-7']
+    assert cache.value_counts('city') == {('Tromsø',): 3333, (None,): 1667}
@@ -0,0 +1,47 @@
+import csv
+
+from csv_reader import CSVSource, SNIFF_SIZE
+
+
+def write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8-sig', newline='') as file:
+        csv.writer(file).writerows(rows)
+
+
+def test_escaped_quotes_in_multiline_fields_beyond_sniff_window(tmp_path):
+    path = tmp_path / 'data.csv'
+    rows = [['id', 'note', 'address']]
+    rows += [[str(i), f'multi\nline "q" {i}', f'Gate {i}'] for i in range(2000)]
+    rows += [['late', 'Borettslaget "Sol", blokk 2', 'x"']]
+    write_csv(path, rows)
+    assert path.stat().st_size > SNIFF_SIZE
+
+    with CSVSource(path) as source:
+        assert source.dialect.doublequote
+        parsed = list(source.rows())
+        assert source.count_rows() == len(rows) - 1
+
+    assert parsed == rows[1:]
+
+
+def test_semicolon_delimiter_is_detected(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_text('a;b\n"1;x";"say ""hi"""\n', encoding='latin1')
+
+    with CSVSource(path) as source:
+        assert source.dialect.delimiter == ';'
+        assert list(source.rows()) == [['1;x', 'say "hi"']]
+
+
+def test_utf16_and_utf32_files_with_bom(tmp_path):
+    rows = [['id', 'adresse\nlinje', 'by'], ['1', 'Storgata 1', 'Tromsø'], ['2', '"Nedre" vei', 'Ås']]
+    for encoding, expected in (('utf-16', 'utf-16-le'), ('utf-32', 'utf-32-le')):
+        path = tmp_path / f'{encoding}.csv'
+        with open(path, 'w', encoding=encoding, newline='') as file:
+            csv.writer(file, delimiter=';').writerows(rows)
+
+        with CSVSource(path) as source:
+            assert source.encoding == expected
+            assert source.dialect.delimiter == ';'
+            assert source.header == rows[0]
+            assert list(source.rows()) == rows[1:]
@@ -0,0 +1,96 @@
+from datetime import datetime
+
+import pytest
+
+from current_certificates import CurrentCertificateResolver, parse_issue_date, publish_current_certificates
+
+
+def certificate(certificate_id, issue_date, building_number='1'):
+    return {'certificate_id': certificate_id, 'issue_date': issue_date, 'building_number': building_number,
+            'address': 'Storgata  1', 'postal_code': '0155'}
+
+
+def winners(records):
+    resolver = CurrentCertificateResolver()
+    resolver.add_batch(records)
+    return {(row['lookup_type'], row['lookup_key']): row for row in resolver.rows()}
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2023-01-15', datetime(2023, 1, 15)),
+    ('2023-01-15T10:30:00', datetime(2023, 1, 15, 10, 30)),
+    ('2023-01-15T10:30:00Z', datetime(2023, 1, 15, 10, 30)),
+    ('2023-01-15T12:30:00+02:00', datetime(2023, 1, 15, 10, 30)),
+    ('15.01.2023', datetime(2023, 1, 15)),
+    (' 15.01.2023 10:30 ', datetime(2023, 1, 15, 10, 30)),
+    ('', None),
+    (None, None),
+    ('ukjent', None),
+    ('31.02.2023', None),
+])
+def test_parse_issue_date(value, expected):
+    assert parse_issue_date(value) == expected
+
+
+@pytest.mark.parametrize('records', [
+    [certificate('A1', '2020-01-01'), certificate('A2', '2023-01-01')],
+    [certificate('A2', '2023-01-01'), certificate('A1', '2020-01-01')],
+])
+def test_latest_certificate_wins_in_any_order(records):
+    rows = winners(records)
+    assert rows[('building', '1')]['certificate_id'] == 'A2'
+    assert rows[('address', '0155|STORGATA 1')]['certificate_id'] == 'A2'
+    assert rows[('building', '1')]['certificate_count'] == 2
+
+
+def test_dates_are_compared_as_dates_across_formats():
+    # As strings '2020-06-01' > '15.06.2023', but the Norwegian date is later
+    rows = winners([certificate('A1', '2020-06-01T00:00:00'), certificate('A2', '15.06.2023')])
+    assert rows[('building', '1')]['certificate_id'] == 'A2'
+    assert rows[('building', '1')]['issue_date'] == '2023-06-15T00:00:00'
+
+    rows = winners([certificate('A1', '01.02.2023'), certificate('A2', '2023-01-31')])
+    assert rows[('building', '1')]['certificate_id'] == 'A1'
+
+
+@pytest.mark.parametrize('undated', [None, '', 'ukjent'])
+def test_missing_or_unparseable_date_loses_to_any_date(undated):
+    rows = winners([certificate('A1', '01.01.1990'), certificate('Z9', undated)])
+    assert rows[('building', '1')]['certificate_id'] == 'A1'
+
+    # Among undated certificates the greater certificate_id wins
+    rows = winners([certificate('Z9', undated), certificate('A1', None)])
+    assert rows[('building', '1')]['certificate_id'] == 'Z9'
+    assert rows[('building', '1')]['issue_date'] is None
+
+
+def test_publish_tags_rows_with_run_id_and_prunes_other_runs(stub_client):
+    resolver = CurrentCertificateResolver()
+    resolver.add_batch([certificate('A1', '2020-01-01'), certificate('A2', '2023-01-01')])
+
+    assert publish_current_certificates(stub_client, resolver)['published'] == 2
+    assert stub_client.methods('current_certificates') == ['upsert', 'delete']
+
+    rows = stub_client.rows['current_certificates']
+    run_ids = {row['run_id'] for row in rows}
+    assert len(run_ids) == 1 and not any('refreshed_at' in row for row in rows)
+    _, _, steps = stub_client.calls[-1]
+    assert steps[1] == ('or_', (f'run_id.is.null,run_id.neq.{run_ids.pop()}',), {})
+
+
+def test_empty_resolver_never_prunes(stub_client):
+    publish_current_certificates(stub_client, CurrentCertificateResolver(), prune=True)
+    assert stub_client.calls == []
+
+
+@pytest.mark.parametrize('concurrency', [1, 4])
+def test_only_inserted_records_are_tracked(make_migrator, stub_client, concurrency):
+    migrator = make_migrator(rows=300, concurrency=concurrency)
+    migrator.track_current_certificates()
+    stub_client.fail_ids = {'HARNESS-00000007', 'HARNESS-00000120'}
+
+    assert migrator.migrate_from_csv(batch_size=50) == (298, 2)
+    resolver = migrator.current_certificates
+    assert resolver.records_seen == 298
+    published = {row['certificate_id'] for row in resolver.rows()}
+    assert published and not published & stub_client.fail_ids
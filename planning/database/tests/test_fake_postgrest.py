@@ -0,0 +1,175 @@
+import argparse
+import json
+
+import httpx
+import pytest
+
+from fake_postgrest import FakePostgREST, FakePostgRESTTransport, add_fault_arguments, fault_options
+
+CERTIFICATES = '/rest/v1/energy_certificates'
+PRICES = '/rest/v1/electricity_prices_nve'
+
+
+def certificate(i, **overrides):
+    row = {'certificate_id': f'C-{i:05d}', 'address': f'Gate {i}', 'postal_code': f'{i % 90 + 10:02d}00',
+           'city': 'Oslo', 'knr': 301 + i % 3, 'energy_class': 'ABCDEFG'[i % 7], 'has_energy_evaluation': i % 2 == 0}
+    row.update(overrides)
+    return row
+
+
+def post(backend, path, rows, params=(), prefer=''):
+    return backend.handle('POST', path, list(params), {'prefer': prefer}, json.dumps(rows).encode('utf-8'))
+
+
+def get(backend, path, params, prefer='', range_header=None):
+    status, headers, body = backend.handle('GET', path, list(params), {'prefer': prefer, 'range': range_header}, b'')
+    return status, headers, json.loads(body)
+
+
+@pytest.fixture
+def backend():
+    backend = FakePostgREST()
+    yield backend
+    backend.close()
+
+
+def test_insert_and_constraint_errors(backend):
+    status, _, body = post(backend, CERTIFICATES, [certificate(i) for i in range(10)])
+    assert status == 201 and body == b''
+    assert backend.row_count('energy_certificates') == 10
+
+    # A failing batch is rolled back as a whole
+    status, _, body = post(backend, CERTIFICATES, [certificate(10), certificate(3)])
+    assert status == 409 and json.loads(body)['code'] == '23505'
+    status, _, body = post(backend, CERTIFICATES, [certificate(11, address=None)])
+    assert status == 400 and json.loads(body)['code'] == '23502'
+    status, _, body = post(backend, PRICES, {'week': '2024-01', 'year': 2024, 'week_number': 1,
+                                             'zone': 'NO9', 'spot_price_ore_kwh': 50.0})
+    assert status == 400 and json.loads(body)['code'] == '23514'
+    status, _, body = post(backend, CERTIFICATES, [certificate(12, colour='red')])
+    assert status == 400 and json.loads(body)['code'] == 'PGRST204'
+    assert backend.row_count('energy_certificates') == 10
+
+
+def test_upsert_resolutions(backend):
+    price = {'week': '2024-01', 'year': 2024, 'week_number': 1, 'zone': 'NO1', 'spot_price_ore_kwh': 50.0}
+    post(backend, PRICES, [price])
+    params = [('on_conflict', 'week,zone')]
+
+    status, _, _ = post(backend, PRICES, [dict(price, spot_price_ore_kwh=80.0)], params,
+                        prefer='resolution=ignore-duplicates')
+    assert status == 201
+    _, _, rows = get(backend, PRICES, [('select', 'spot_price_ore_kwh,spot_price_kr_kwh')])
+    assert rows == [{'spot_price_ore_kwh': 50.0, 'spot_price_kr_kwh': 0.5}]
+
+    post(backend, PRICES, [dict(price, spot_price_ore_kwh=80.0)], params, prefer='resolution=merge-duplicates')
+    _, _, rows = get(backend, PRICES, [('select', 'spot_price_ore_kwh')])
+    assert rows == [{'spot_price_ore_kwh': 80.0}]
+
+    status, _, body = post(backend, PRICES, [price, price], params, prefer='resolution=merge-duplicates')
+    assert status == 500 and json.loads(body)['code'] == '21000'
+
+
+def test_select_filters_order_and_paging(backend):
+    post(backend, CERTIFICATES, [certificate(i) for i in range(30)])
+
+    _, headers, rows = get(backend, CERTIFICATES, [
+        ('select', 'certificate_id,has_energy_evaluation'), ('knr', 'eq.301'), ('certificate_id', 'gte.C-00010'),
+        ('energy_class', 'not.in.(A,B)'), ('order', 'certificate_id.desc'), ('limit', '3'),
+    ], prefer='count=exact')
+    expected = [i for i in range(29, 9, -1) if i % 3 == 0 and i % 7 not in (0, 1)]
+    assert [row['certificate_id'] for row in rows] == [f'C-{i:05d}' for i in expected[:3]]
+    assert [row['has_energy_evaluation'] for row in rows] == [i % 2 == 0 for i in expected[:3]]
+    assert headers['Content-Range'] == f'0-2/{len(expected)}'
+
+    _, headers, rows = get(backend, CERTIFICATES, [('select', 'certificate_id'), ('order', 'certificate_id')],
+                           range_header='25-99')
+    assert [row['certificate_id'] for row in rows] == [f'C-{i:05d}' for i in range(25, 30)]
+    assert headers['Content-Range'] == '25-29/*'
+
+    _, _, rows = get(backend, CERTIFICATES, [('select', 'count'), ('address', 'like.Gate 2*')])
+    assert rows == [{'count': 11}]
+
+    status, _, body = get(backend, CERTIFICATES, [('select', 'certificate_id'), ('colour', 'eq.red')])
+    assert status == 400 and body['code'] == '42703'
+
+
+def test_max_rows_caps_selects():
+    backend = FakePostgREST(max_rows=5)
+    post(backend, CERTIFICATES, [certificate(i) for i in range(12)])
+    _, headers, rows = get(backend, CERTIFICATES, [('select', 'certificate_id'), ('limit', '100')],
+                           prefer='count=exact')
+    assert len(rows) == 5 and headers['Content-Range'] == '0-4/12'
+
+
+def test_injected_errors_write_nothing_and_lost_responses_write():
+    backend = FakePostgREST(error_rate=1.0, error_status=502)
+    status, _, body = post(backend, CERTIFICATES, [certificate(1)])
+    assert status == 502 and json.loads(body)['code'] == 'PGRST000'
+    assert backend.row_count('energy_certificates') == 0
+
+    backend = FakePostgREST(lost_response_rate=1.0)
+    status, _, _ = post(backend, CERTIFICATES, [certificate(1)])
+    assert status == 504
+    assert backend.row_count('energy_certificates') == 1
+    # Reads are never lost
+    status, _, rows = get(backend, CERTIFICATES, [('select', 'certificate_id')])
+    assert status == 200 and rows == [{'certificate_id': 'C-00001'}]
+
+
+def test_rate_limit_and_payload_limit():
+    backend = FakePostgREST(rate_limit=1.0, burst=2)
+    statuses = [post(backend, CERTIFICATES, [certificate(i)]) for i in range(3)]
+    assert [status for status, _, _ in statuses] == [201, 201, 429]
+    assert 0 < float(statuses[2][1]['Retry-After']) <= 1.0
+
+    backend = FakePostgREST(max_payload_bytes=200)
+    status, _, _ = post(backend, CERTIFICATES, [certificate(i) for i in range(5)])
+    assert status == 413 and backend.row_count('energy_certificates') == 0
+
+
+def test_fault_sequence_is_seeded():
+    def statuses(seed):
+        backend = FakePostgREST(error_rate=0.3, lost_response_rate=0.2, seed=seed)
+        return [post(backend, CERTIFICATES, [certificate(i)])[0] for i in range(40)]
+
+    assert statuses(7) == statuses(7)
+    assert statuses(7) != statuses(8)
+    assert set(statuses(7)) == {201, 503, 504}
+
+
+def test_summary_counts_requests_rows_and_faults():
+    backend = FakePostgREST(rate_limit=1.0, burst=2)
+    post(backend, CERTIFICATES, [certificate(i) for i in range(4)])
+    get(backend, CERTIFICATES, [('select', 'certificate_id')])
+    post(backend, CERTIFICATES, [certificate(9)])
+
+    summary = backend.summary()
+    assert summary['requests'] == 3
+    assert summary['rows_written'] == 4 and summary['rows_read'] == 4
+    assert summary['throttled'] == 1 and summary['injected_error'] == 0
+    assert summary['status_counts'] == {200: 1, 201: 1, 429: 1}
+    assert summary['bytes_received'] > 0
+
+
+def test_transport_serves_httpx_client(backend):
+    with httpx.Client(transport=FakePostgRESTTransport(backend), base_url='http://fake') as client:
+        response = client.post(CERTIFICATES, json=[certificate(1), certificate(2)],
+                               headers={'Prefer': 'return=representation'})
+        assert response.status_code == 201
+        assert [row['certificate_id'] for row in response.json()] == ['C-00001', 'C-00002']
+
+        response = client.head(CERTIFICATES, params={'select': 'certificate_id'}, headers={'Prefer': 'count=exact'})
+        assert response.status_code == 200 and response.content == b''
+        assert response.headers['Content-Range'] == '0-1/2'
+
+        response = client.get('/rest/v1/unknown_table')
+        assert response.status_code == 404 and response.json()['code'] == 'PGRST205'
+
+
+def test_fault_options_only_include_given_arguments():
+    parser = argparse.ArgumentParser()
+    add_fault_arguments(parser)
+    args = parser.parse_args(['--latency-ms', '40', '--error-rate', '0.02', '--max-payload-bytes', '1024'])
+    assert fault_options(args) == {'latency_ms': 40.0, 'error_rate': 0.02, 'max_payload_bytes': 1024}
+    assert fault_options(parser.parse_args([])) == {}
@@ -0,0 +1,70 @@
+import sqlite3
+import threading
+
+import pytest
+
+from csv_reader import CSVSource
+from migration_script import EnovaDataMigrator
+
+
+class FlakyTransformMigrator(EnovaDataMigrator):
+    """Every seventh certificate fails to transform"""
+
+    def transform_csv_row(self, row, columns):
+        record = super().transform_csv_row(row, columns)
+        if int(record['certificate_id'].rsplit('-', 1)[1]) % 7 == 3:
+            raise ValueError('bad certificate')
+        return record
+
+
+def inserted_ids(client):
+    return [row['certificate_id'] for row in client.rows.get('energy_certificates', [])]
+
+
+def test_parallel_limit_counts_rows_like_serial(make_migrator, enova_data, stub_client):
+    data_path = enova_data(800)
+    # 800 rows hold 114 errors, so limit=None stops at the 101st error
+    for limit in (None, 1, 3, 4, 150, 700):
+        serial = make_migrator(FlakyTransformMigrator, data_path=data_path)
+        serial_counts = serial.migrate_from_csv(batch_size=50, limit=limit)
+        serial_ids = inserted_ids(stub_client)
+        stub_client.rows.clear()
+
+        parallel = make_migrator(FlakyTransformMigrator, data_path=data_path)
+        parallel_counts = parallel.migrate_from_csv(batch_size=50, limit=limit, workers=2, chunk_bytes=2048)
+        assert parallel_counts == serial_counts
+        assert inserted_ids(stub_client) == serial_ids
+        stub_client.rows.clear()
+
+
+def test_sqlite_readers_are_closed_after_migration(make_migrator, stub_client):
+    migrator = make_migrator(rows=500)
+    opened = []
+    open_sqlite = migrator._open_sqlite
+    migrator._open_sqlite = lambda: opened.append(open_sqlite()) or opened[-1]
+
+    assert migrator.migrate_from_sqlite(batch_size=50, workers=3) == (500, 0)
+    assert len(opened) > 1 and not migrator._sqlite_connections
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
+
+
+def test_upload_pool_is_shut_down_after_migration(make_migrator, stub_client):
+    migrator = make_migrator(rows=500, concurrency=4)
+    assert migrator.migrate_from_csv(batch_size=50) == (500, 0)
+    assert migrator._upload_pool is None
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith('upload')]
+    assert sorted(inserted_ids(stub_client)) == [f'HARNESS-{i:08d}' for i in range(500)]
+
+
+def test_postal_city_lookup_from_cache_matches_csv(make_migrator, monkeypatch):
+    from columnar_cache import ColumnarCache
+
+    migrator = make_migrator(rows=500)
+    from_csv = migrator.postal_city_lookup()
+
+    ColumnarCache.build(migrator.csv_file, migrator.record_transformer())
+    monkeypatch.setattr(CSVSource, 'column_chunks', lambda *args, **kwargs: pytest.fail('CSV was parsed'))
+    migrator._postal_cities = None
+    assert migrator.postal_city_lookup() == from_csv
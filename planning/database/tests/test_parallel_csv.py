@@ -0,0 +1,50 @@
+import csv
+
+from csv_reader import CSVSource
+from parallel_csv import parse_parallel
+
+
+def keep_row(row, columns):
+    return row
+
+
+def parse_serial(path):
+    with CSVSource(path) as source:
+        return list(source.rows())
+
+
+def parse_ranges(path, chunk_bytes):
+    return [record for _, records, _ in parse_parallel(path, keep_row, workers=2, chunk_bytes=chunk_bytes)
+            for record in records]
+
+
+def test_stray_quote_in_unquoted_field_keeps_ranges_aligned(tmp_path):
+    path = tmp_path / 'data.csv'
+    lines = ['id,note,flag']
+    for i in range(3000):
+        if i == 5:
+            lines.append('5,Rør 12" stål,x')
+        elif i % 100 == 0:
+            lines.append(f'{i},"two\nlines ""q""",y')
+        else:
+            lines.append(f'{i},plain {i},z')
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+    serial = parse_serial(path)
+    assert len(serial) == 3000
+    assert serial[5] == ['5', 'Rør 12" stål', 'x']
+    for chunk_bytes in (256, 2048, 10000):
+        assert parse_ranges(path, chunk_bytes) == serial
+
+
+def test_ranges_match_csv_writer_output(tmp_path):
+    path = tmp_path / 'data.csv'
+    rows = [['id', 'address', 'note']]
+    rows += [[str(i), f'Gate "{i}"' if i % 7 else f'Vei {i}\r\nblokk', 'a,b' if i % 3 else 'x"y'] for i in range(2000)]
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        csv.writer(file).writerows(rows)
+
+    with CSVSource(path) as source:
+        ranges = source.split_ranges(1024)
+    assert len(ranges) > 10
+    assert parse_ranges(path, 1024) == parse_serial(path) == rows[1:]
@@ -0,0 +1,120 @@
+from collections import defaultdict
+from datetime import date, datetime
+
+import pytest
+
+from reconciliation import (DIGEST_MODULUS, MigrationReconciler, bucket_of, format_value,
+                            partition_key, row_hash)
+
+
+@pytest.mark.parametrize('value, postgres_text', [
+    # COALESCE(x::TEXT, '')
+    (None, ''),
+    ('', ''),
+    (5301, '5301'),
+    # BOOLEAN::TEXT
+    (True, 'true'),
+    (False, 'false'),
+    # round(x::NUMERIC, 6)::TEXT; float8::TEXT would give '1e+15' and '1e-07'
+    (1e15, '1000000000000000.000000'),
+    (1e16, '10000000000000000.000000'),
+    (100.0, '100.000000'),
+    (0.1 + 0.2, '0.300000'),
+    (1e-7, '0.000000'),
+    (-0.0, '0.000000'),
+    (2.5e-6, '0.000003'),
+    (-2.5e-6, '-0.000003'),
+    (187.123456789, '187.123457'),
+    (float('nan'), 'NaN'),
+    # DATE::TEXT and TIMESTAMP::TEXT
+    (date(2023, 1, 5), '2023-01-05'),
+    (datetime(2023, 1, 5, 14, 30), '2023-01-05 14:30:00'),
+    (datetime(2023, 1, 5, 14, 30, 0, 500000), '2023-01-05 14:30:00.5'),
+])
+def test_format_value_matches_postgres_text(value, postgres_text):
+    assert format_value(value) == postgres_text
+
+
+class ReconcileDatabase:
+    """In-memory stand-in for the reconcile_* functions of 10_reconciliation.sql"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def rpc(self, function, params):
+        return ReconcileCall(getattr(self, function)(**params))
+
+    def _partition(self, p_partition, p_prefix_length, p_partition_key=None):
+        return [row for row in self.rows
+                if p_partition_key is None or partition_key(row, p_partition, p_prefix_length) == p_partition_key]
+
+    @staticmethod
+    def _digests(rows, key):
+        groups = defaultdict(lambda: [0, 0])
+        for row in rows:
+            group = groups[key(row)]
+            group[0] += 1
+            group[1] = (group[1] + row_hash(row)) % DIGEST_MODULUS
+        return groups
+
+    def reconcile_partition_digests(self, p_partition, p_prefix_length):
+        groups = self._digests(self.rows, lambda row: partition_key(row, p_partition, p_prefix_length))
+        return [{'partition_key': key, 'row_count': count, 'digest': str(digest)}
+                for key, (count, digest) in sorted(groups.items())]
+
+    def reconcile_bucket_digests(self, p_partition, p_prefix_length, p_partition_key, p_buckets):
+        rows = self._partition(p_partition, p_prefix_length, p_partition_key)
+        groups = self._digests(rows, lambda row: bucket_of(row['certificate_id'], p_buckets))
+        return [{'bucket': bucket, 'row_count': count, 'digest': str(digest)}
+                for bucket, (count, digest) in sorted(groups.items())]
+
+    def reconcile_bucket_rows(self, p_partition, p_prefix_length, p_partition_key, p_buckets, p_bucket_list):
+        rows = self._partition(p_partition, p_prefix_length, p_partition_key)
+        return sorted(({'certificate_id': row['certificate_id'], 'row_hash': row_hash(row)} for row in rows
+                       if bucket_of(row['certificate_id'], p_buckets) in p_bucket_list),
+                      key=lambda row: (row['certificate_id'], row['row_hash']))
+
+
+class ReconcileCall:
+    def __init__(self, rows):
+        self.rows = rows
+        self.start = self.end = None
+
+    def range(self, start, end):
+        self.start, self.end = start, end
+        return self
+
+    def execute(self):
+        return type('Result', (), {'data': self.rows[self.start:self.end + 1]})()
+
+
+def source_records(count=2000):
+    return [{'certificate_id': f'C-{i:05d}', 'knr': 301 + i % 7, 'postal_code': f'{i % 90 + 10:02d}00',
+             'address': f'Gate {i}', 'energy_consumption': i * 1.5e12, 'fossil_percentage': None}
+            for i in range(count)]
+
+
+@pytest.mark.parametrize('partition, prefix_length', [('knr', 2), ('postal', 1), ('postal', 3)])
+def test_reconcile_finds_each_kind_of_difference(partition, prefix_length):
+    source = source_records()
+    database = [dict(row) for row in source if row['certificate_id'] != 'C-00010']
+    database.append(dict(source[20]))
+    next(row for row in database if row['certificate_id'] == 'C-00030')['address'] = 'Feil gate 30'
+    database.append({'certificate_id': 'X-00001', 'knr': 999, 'postal_code': '9999'})
+
+    reconciler = MigrationReconciler(ReconcileDatabase(database), records=lambda: source,
+                                     partition=partition, prefix_length=prefix_length, page_size=100)
+    report = reconciler.reconcile()
+
+    assert report['missing_in_database'] == ['C-00010']
+    assert report['duplicated_in_database'] == ['C-00020']
+    assert report['content_mismatch'] == ['C-00030']
+    assert report['unexpected_in_database'] == ['X-00001']
+    assert report['source_rows'] == 2000 and report['database_rows'] == 2001
+
+
+def test_matching_source_needs_one_query():
+    source = source_records()
+    reconciler = MigrationReconciler(ReconcileDatabase([dict(row) for row in source]), records=lambda: source)
+    report = reconciler.reconcile()
+    assert report['mismatched_partitions'] == [] and report['query_count'] == 1
@@ -0,0 +1,57 @@
+import httpx
+import pytest
+
+from supabase_transport import LATENCY_SAMPLE_SIZE, CircuitOpenError, ResilientTransport, TransportStats
+
+
+class FailingTransport(httpx.BaseTransport):
+    """Answers 503 to the first `failures` requests, then 200"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def handle_request(self, request):
+        self.calls += 1
+        return httpx.Response(503 if self.calls <= self.failures else 200, request=request)
+
+
+def send(transport):
+    return transport.handle_request(httpx.Request('POST', 'http://fake/rest/v1/energy_certificates'))
+
+
+def test_open_circuit_holds_requests_until_trial_succeeds():
+    transport = ResilientTransport(max_retries=0, failure_threshold=2, reset_timeout=0.2,
+                                   inner=FailingTransport(failures=2))
+    assert send(transport).status_code == 503
+    assert send(transport).status_code == 503
+
+    # Circuit is open: the request waits for the trial instead of being dropped
+    assert send(transport).status_code == 200
+    stats = transport.stats.summary()
+    assert stats['circuit_opened'] == 1
+    assert stats['rejected_by_circuit'] == 0
+    assert stats['circuit_wait_s'] >= 0.15
+
+
+def test_circuit_wait_is_bounded():
+    transport = ResilientTransport(max_retries=0, failure_threshold=1, reset_timeout=10,
+                                   circuit_wait=0.1, inner=FailingTransport(failures=1))
+    send(transport)
+    with pytest.raises(CircuitOpenError):
+        send(transport)
+    assert transport.stats.summary()['rejected_by_circuit'] == 1
+
+
+def test_latency_samples_stay_bounded():
+    stats = TransportStats()
+    with stats.lock:
+        for i in range(LATENCY_SAMPLE_SIZE * 3):
+            stats.record_latency(float(i % 1000))
+        stats.record_latency(5000.0)
+
+    summary = stats.summary()
+    assert len(stats.latencies_ms) == LATENCY_SAMPLE_SIZE
+    assert stats.latency_count == LATENCY_SAMPLE_SIZE * 3 + 1
+    assert summary['latency_ms_max'] == 5000.0
+    assert 400 <= summary['latency_ms_p50'] <= 600
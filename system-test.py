@@ -1,109 +1,87 @@
 #!/usr/bin/env python3
 """
 System Info Extractor for Programming Optimization
-Run in your active Conda env: python extract_system_info.py > system_report.txt
-Requires: psutil (conda install psutil if missing)
+Run in your active Conda env: python system-test.py > system_report.txt
+Probes run in parallel and are cached for a day by planning/database/host_tuning.py
+(use --refresh to re-probe). psutil is optional but needed for RAM figures.
+
+Add --tune to also calibrate parse/upload rates and write the --workers,
+--concurrency and --batch-size settings the importers read at startup.
 """
 
 import sys
 import os
-import platform
-import subprocess
 import json
+import argparse
 from datetime import datetime
-import psutil  # For hardware stats
-
-def run_command(cmd):
-    """Run shell command and return output."""
-    try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, check=True)
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        return f"Error: {e.stderr.strip()}"
+from pathlib import Path
 
-def get_conda_envs():
-    """List all Conda envs."""
-    return run_command("conda env list")
-
-def get_conda_info():
-    """Get Conda details in active env."""
-    active_env = os.environ.get("CONDA_DEFAULT_ENV", "base")
-    pkgs = run_command("conda list --json")
-    try:
-        pkgs_json = json.loads(pkgs) if pkgs else []
-        key_pkgs = {p['name']: p['version'] for p in pkgs_json if p['name'] in 
-                    ['python', 'ifcopenshell', 'pandas', 'openpyxl', 'supabase', 'streamlit', 'fastapi']}
-        return {
-            "active_env": active_env,
-            "conda_version": run_command("conda --version").split()[-1] if "conda" in run_command("conda --version") else "N/A",
-            "python_version": platform.python_version(),
-            "key_packages": key_pkgs,
-            "total_packages": len(pkgs_json)
-        }
-    except json.JSONDecodeError:
-        return {"error": "Failed to parse conda list JSON"}
-
-def get_hardware():
-    """Get CPU, RAM, disk info."""
-    cpu = platform.processor()
-    cores = psutil.cpu_count(logical=True)
-    ram_total = psutil.virtual_memory().total / (1024**3)  # GB
-    ram_available = psutil.virtual_memory().available / (1024**3)  # GB
-    disk = psutil.disk_usage('C:\\') if platform.system() == 'Windows' else psutil.disk_usage('/')
-    disk_free_gb = disk.free / (1024**3)
-    return {
-        "cpu": f"{cpu} ({cores} cores)",
-        "ram_total_gb": round(ram_total, 1),
-        "ram_available_gb": round(ram_available, 1),
-        "disk_free_gb": round(disk_free_gb, 1),
-        "os": f"{platform.system()} {platform.release()} ({platform.architecture()[0]})"
-    }
+sys.path.insert(0, str(Path(__file__).parent / 'planning' / 'database'))
+import host_tuning  # noqa: E402
 
 def main():
+    parser = argparse.ArgumentParser(description='System report for optimization')
+    parser.add_argument('--refresh', action='store_true', help='Re-run probes instead of using the cache')
+    parser.add_argument('--tune', action='store_true', help='Calibrate and write importer settings')
+    parser.add_argument('--data-path', help='production_data folder used by --tune')
+    args = parser.parse_args()
+
+    system = host_tuning.collect_system_info(refresh=args.refresh)
     report = {
         "timestamp": datetime.now().isoformat(),
         "current_dir": os.getcwd(),
         "username": os.environ.get("USERNAME", os.environ.get("USER", "N/A")),
-        "hardware": get_hardware(),
-        "conda": get_conda_info(),
-        "envs": get_conda_envs(),
+        "system": system,
         "path": os.environ.get("PATH", "N/A")  # Truncated if too long
     }
-    
+
     # Pretty-print
     print("=== SYSTEM REPORT FOR OPTIMIZATION ===\n")
-    print(f"Generated: {report['timestamp']}")
+    print(f"Generated: {report['timestamp']} (probed {system['probed_at']})")
     print(f"User: {report['username']}")
     print(f"Current Dir: {report['current_dir']}\n")
-    
+
     print("=== HARDWARE & OS ===")
-    hw = report['hardware']
+    hw = system['hardware']
     print(f"OS: {hw['os']}")
-    print(f"CPU: {hw['cpu']}")
-    print(f"RAM: {hw['ram_total_gb']} GB total ({hw['ram_available_gb']} GB available)")
-    print(f"Disk (C:/): {hw['disk_free_gb']} GB free\n")
-    
+    print(f"CPU: {hw['cpu']} ({hw['logical_cores']} logical, {hw['physical_cores'] or '?'} physical, "
+          f"{hw['usable_cores']} usable cores)")
+    print(f"RAM: {hw['ram_total_gb'] or '?'} GB total ({hw['ram_available_gb'] or '?'} GB available)")
+    print(f"Disk: {hw['disk_free_gb']} GB free\n")
+
     print("=== CONDA & ENV DETAILS ===")
-    conda = report['conda']
-    print(f"Conda Version: {conda['conda_version']}")
-    print(f"Active Env: {conda['active_env']}")
-    print(f"Python Version: {conda['python_version']}")
+    conda = system['conda_packages']
+    print(f"Conda Version: {system['conda_version'] or 'N/A'}")
+    print(f"Active Env: {system['active_env']}")
+    print(f"Python Version: {system['python_version']}")
     print(f"Total Packages: {conda['total_packages']}")
     print("Key Packages:")
-    for pkg, ver in conda['key_packages'].items():
+    for pkg, ver in {**conda['key_packages'], **system['python_packages']}.items():
         print(f"  {pkg}: {ver}")
     if 'error' in conda:
         print(f"Error: {conda['error']}\n")
-    
+
     print("=== ALL CONDA ENVS ===")
-    print(report['envs'])
-    
+    print(system['conda_envs'] or "N/A")
+
     print("\n=== PATH (truncated) ===")
     print(report['path'][:500] + "..." if len(report['path']) > 500 else report['path'])
-    
+
+    if args.tune:
+        state = host_tuning.tune(data_path=args.data_path or os.getenv('PRODUCTION_DATA_PATH'),
+                                 supabase_url=os.getenv('SUPABASE_URL'),
+                                 supabase_key=os.getenv('SUPABASE_KEY'))
+        report["calibration"] = state['calibration']
+        report["recommendations"] = state['recommendations']
+
+        print("\n=== IMPORTER SETTINGS ===")
+        for importer, settings in state['recommendations'].items():
+            print(f"{importer}: " + ", ".join(f"--{k.replace('_', '-')} {v}" for k, v in settings.items()))
+        print(f"Written to {host_tuning.tuning_file_path()}")
+
     # JSON dump for easy parsing/sharing
     print("\n=== FULL JSON REPORT ===")
     print(json.dumps(report, indent=2))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()